@@ -0,0 +1,111 @@
+import numpy as np
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+import tolls
+
+# --- K ALTERNATIVE ROUTES (via-node method) ---
+# One Dijkstra from the start and one towards the end (on the reversed graph)
+# give, for every node v, the best route that passes through v:
+#   cost(v) = to_v[v] + from_v[v]
+# Nodes are tried in order of that cost. A via route is kept when it has no
+# loop, stays within max_stretch of the best cost, and shares at most
+# max_overlap of its length with every route already kept. All nodes of a
+# route that was tried are skipped from then on, because they would only
+# produce the same route again. The whole query is therefore two scipy
+# searches plus a few cheap path walks, not k full searches as in Yen's
+# algorithm.
+#
+# Routes are searched on a per-edge AED cost: fuel for its length, the value
+# of the driver's time and the Salik price of any gate on it. The cheapest
+# route under the full cost model is always the first alternative.
+
+K_ROUTES = 5
+MAX_OVERLAP = 0.7   # Shared share of a route's length with any kept route
+MAX_STRETCH = 1.5   # Cost limit relative to the best route
+MAX_TRIES = 40      # Via routes examined per wanted route
+
+
+def edge_costs(csr, gate_counts=None, salik_price=tolls.SALIK_PRICE, fuel_price=tolls.FUEL_PRICE,
+               efficiency=tolls.EFFICIENCY, hourly_wage=tolls.HOURLY_WAGE):
+    """ Full AED cost of every CSR edge; gate_counts = gates per edge (penalty_array with penalty=1) """
+    gates = gate_counts if gate_counts is not None else 0.0
+    return tolls.full_cost(csr.weights["length"].astype(np.float64) / 1000,
+                           csr.weights["travel_time"].astype(np.float64) / 60,
+                           gates, salik_price, fuel_price, efficiency, hourly_wage)
+
+
+def _walk(pred, start, stop):
+    nodes = [start]
+    while nodes[-1] != stop:
+        nxt = pred[nodes[-1]]
+        if nxt < 0:
+            return None
+        nodes.append(nxt)
+    return nodes
+
+
+def alternative_routes(csr, source, target, costs, k=K_ROUTES, max_overlap=MAX_OVERLAP, max_stretch=MAX_STRETCH):
+    """ Up to k distinct routes (osmid lists) between two osmids, cheapest first.
+
+    costs is one float per CSR edge, e.g. from edge_costs. Returns [] when
+    the target cannot be reached.
+    """
+    s, t = csr.index[source], csr.index[target]
+    graph = csr.matrix("length").copy()
+    graph.data = np.asarray(costs, dtype=np.float64)
+    to_v, pred_out = csgraph_dijkstra(graph, indices=s, return_predecessors=True)
+    if not np.isfinite(to_v[t]):
+        return []
+    if s == t:
+        return [[source]]
+    from_v, pred_in = csgraph_dijkstra(graph.T.tocsr(), indices=t, return_predecessors=True)
+    pred_out, pred_in = pred_out.tolist(), pred_in.tolist()
+
+    via = to_v + from_v
+    best = via[t]
+    order = np.flatnonzero(via <= best * max_stretch)
+    order = order[np.argsort(via[order], kind="stable")].tolist()
+
+    length = csr.weights["length"]
+    kept, kept_edges = [], []
+    tried = np.zeros(csr.n, dtype=bool)
+    tries = 0
+    for v in order:
+        if len(kept) == k or tries == k * MAX_TRIES:
+            break
+        if tried[v]:
+            continue
+        tries += 1
+        head = _walk(pred_out, v, s)
+        tail = _walk(pred_in, v, t)
+        if head is None or tail is None:
+            tried[v] = True
+            continue
+        route = head[::-1] + tail[1:]
+        tried[route] = True
+        if len(set(route)) != len(route):
+            continue  # Goes in and comes back out the same way
+
+        idx = np.array(route, dtype=np.int64)
+        edges = csr.edge_ids(idx[:-1], idx[1:])
+        total = float(length[edges].sum(dtype=np.float64)) or 1.0
+        edge_set = set(edges.tolist())
+        if any(float(length[list(edge_set & other)].sum(dtype=np.float64)) / total > max_overlap
+               for other in kept_edges):
+            continue
+        kept.append(route)
+        kept_edges.append(edge_set)
+
+    return [csr.node_osmid[route].tolist() for route in kept]
+
+
+def overlap(csr, route, other):
+    """ Share of route's length that also lies on other (both osmid lists) """
+    if len(route) < 2:
+        return 1.0
+    idx = [csr.index[n] for n in route]
+    ids = csr.edge_ids(idx[:-1], idx[1:])
+    shared = set(zip(route[:-1], route[1:])) & set(zip(other[:-1], other[1:]))
+    mask = np.array([pair in shared for pair in zip(route[:-1], route[1:])])
+    length = csr.weights["length"][ids]
+    return float(length[mask].sum(dtype=np.float64) / max(length.sum(dtype=np.float64), 1e-9))
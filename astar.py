@@ -12,6 +12,22 @@ class Node:
     def __lt__(self, other):
         return self.f < other.f
 
+class SearchStats:
+    """ Optional counters filled in by search_algorithm(..., stats=SearchStats()) """
+    def __init__(self):
+        self.pushes = 0            # heap pushes (every improvement pushes a new Node)
+        self.duplicate_pushes = 0  # pushes for a cell that already had an entry
+        self.pops = 0
+        self.stale_pops = 0        # popped cells that were already closed
+        self.relaxations = 0       # neighbours looked at (not wall / not closed)
+        self.peak_open = 0         # largest open list size
+        self.neighbor_time = 0.0   # ms spent generating and checking neighbours
+        self.heap_time = 0.0       # ms spent in heappush / heappop
+        self.path_time = 0.0       # ms spent rebuilding the path
+
+    def as_dict(self):
+        return dict(vars(self))
+
 def heuristic(current_pos, end_pos):
     # Manhattan distance for grid
     return abs(current_pos[0] - end_pos[0]) + abs(current_pos[1] - end_pos[1])
@@ -26,8 +42,13 @@ def get_neighbors(node, grid_size):
             neighbors.append((new_x, new_y))
     return neighbors
 
-def search_algorithm(start_pos, end_pos, walls, salik_gates, grid_size, algo_type="A*"):
+def search_algorithm(start_pos, end_pos, walls, salik_gates, grid_size, algo_type="A*", stats=None, tracer=None):
+    # stats: SearchStats to fill in. tracer: callback(event, position, g) for
+    # "push", "pop", "relax" and "goal" events. Both are off by default and
+    # then cost one boolean check per step.
     start_time = time.perf_counter()
+    instrumented = stats is not None or tracer is not None
+    if stats is None and tracer is not None: stats = SearchStats()
     
     start_node = Node(start_pos)
     end_node = Node(end_pos)
@@ -38,22 +59,39 @@ def search_algorithm(start_pos, end_pos, walls, salik_gates, grid_size, algo_typ
     
     heapq.heappush(open_list, start_node)
     g_costs = {start_pos: 0}
+    if instrumented:
+        stats.pushes += 1
+        stats.peak_open = 1
+        if tracer: tracer("push", start_pos, 0)
     
     while open_list:
-        current_node = heapq.heappop(open_list)
+        if instrumented:
+            t0 = time.perf_counter()
+            current_node = heapq.heappop(open_list)
+            stats.heap_time += (time.perf_counter() - t0) * 1000
+            stats.pops += 1
+            if current_node.position in closed_set: stats.stale_pops += 1
+            if tracer: tracer("pop", current_node.position, current_node.g)
+        else:
+            current_node = heapq.heappop(open_list)
         closed_set.add(current_node.position)
         visited_history.append(current_node.position) 
         
         # Goal Reached
         if current_node.position == end_node.position:
+            if instrumented:
+                t0 = time.perf_counter()
+                if tracer: tracer("goal", current_node.position, current_node.g)
             execution_time = (time.perf_counter() - start_time) * 1000 
             path = []
             while current_node:
                 path.append(current_node.position)
                 current_node = current_node.parent
+            if instrumented: stats.path_time += (time.perf_counter() - t0) * 1000
             # Return: Path, Cost, Visited Nodes, Time, Node Count
             return path[::-1], g_costs[end_node.position], visited_history, execution_time, len(visited_history)
         
+        if instrumented: t_neighbors = time.perf_counter()
         for neighbor_pos in get_neighbors(current_node, grid_size):
             if neighbor_pos in walls or neighbor_pos in closed_set:
                 continue
@@ -64,8 +102,12 @@ def search_algorithm(start_pos, end_pos, walls, salik_gates, grid_size, algo_typ
             move_cost = 10 if neighbor_pos in salik_gates else 1
             
             new_g = current_node.g + move_cost
+            if instrumented:
+                stats.relaxations += 1
+                if tracer: tracer("relax", neighbor_pos, new_g)
             
             if neighbor_pos not in g_costs or new_g < g_costs[neighbor_pos]:
+                if instrumented and neighbor_pos in g_costs: stats.duplicate_pushes += 1
                 g_costs[neighbor_pos] = new_g
                 neighbor_node = Node(neighbor_pos, current_node)
                 neighbor_node.g = new_g
@@ -77,6 +119,16 @@ def search_algorithm(start_pos, end_pos, walls, salik_gates, grid_size, algo_typ
                     neighbor_node.h = 0 # Dijkstra has no heuristic
                 
                 neighbor_node.f = neighbor_node.g + neighbor_node.h
-                heapq.heappush(open_list, neighbor_node)
+                if instrumented:
+                    t0 = time.perf_counter()
+                    heapq.heappush(open_list, neighbor_node)
+                    stats.heap_time += (time.perf_counter() - t0) * 1000
+                    stats.pushes += 1
+                    stats.peak_open = max(stats.peak_open, len(open_list))
+                    if tracer: tracer("push", neighbor_pos, new_g)
+                else:
+                    heapq.heappush(open_list, neighbor_node)
+        if instrumented:
+            stats.neighbor_time += (time.perf_counter() - t_neighbors) * 1000
                 
     return [], 0, visited_history, 0, len(visited_history)
\ No newline at end of file
@@ -0,0 +1,465 @@
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import landmarks
+import tolls
+from grid_engine import GridEngine, WALL, SALIK_COST
+from hierarchical import HierarchicalPlanner
+
+# --- HEADLESS BATCH ROUTING ---
+# python batch_route.py grid map.json pairs.csv -o results.csv
+# python batch_route.py road pairs.jsonl -o results.jsonl --region drive_25.1000_55.1500_25.2185_55.2685
+# cat pairs.csv | python batch_route.py grid map.json - -o - --format csv
+#
+# Every input row is one origin-destination pair: start_x,start_y,end_x,end_y
+# for grid maps, start_lat,start_lon,end_lat,end_lon for road graphs, plus an
+# optional id. Each pair gets the two Logistics-mode routes (pay Salik / avoid
+# Salik) and the same fuel + Salik + time-value verdict.
+#
+# The input is read and routed CHUNK_SIZE rows at a time. At most two chunks
+# per worker are in flight, and results are written in input order, so memory
+# stays flat whatever the input size. After every written chunk a small
+# checkpoint (rows done, output size) is saved next to the output; --resume
+# truncates the output to that size and skips the rows already done.
+
+CHUNK_SIZE = 500
+IN_FLIGHT = 2          # Chunks queued per worker
+PROGRESS_EVERY = 2.0   # Seconds between rows/s reports on stderr
+CELL_KM = 0.1          # Real distance of one grid cell
+GRID_SPEED_KPH = 40.0  # Driving speed assumed on the grid
+
+GRID_COLUMNS = ("start_x", "start_y", "end_x", "end_y")
+ROAD_COLUMNS = ("start_lat", "start_lon", "end_lat", "end_lon")
+OUTPUT_COLUMNS = ("id", "status", "pay_km", "pay_min", "pay_salik", "pay_cost",
+                  "avoid_km", "avoid_min", "avoid_salik", "avoid_cost",
+                  "money_saved", "value_lost", "recommendation")
+
+GRID_ALGORITHMS = ("A*", "Dijkstra", "JPS", "ALT", "HPA*")
+ROAD_ALGORITHMS = ("Dijkstra", "A*", "CH", "ALT")
+
+
+# --- INPUT ---
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_rows(stream, fmt):
+    """ Dict per input row, streamed (CSV with a header row, or JSON lines) """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = {}
+            # A broken line (or a list / number) is reported as a bad row
+            # rather than stopping the whole job
+            yield row if isinstance(row, dict) else {}
+
+
+def parse_pair(row, columns):
+    """ (start, end) tuples of floats from one input row; raises ValueError """
+    try:
+        a, b, c, d = (float(row[name]) for name in columns)
+    except KeyError as exc:
+        raise ValueError(f"missing {exc.args[0]}") from None
+    except (TypeError, ValueError):
+        raise ValueError("non-numeric coordinate") from None
+    return (a, b), (c, d)
+
+
+# --- ROUTERS (one per worker process) ---
+def _figures(pay, avoid, prices):
+    """ Output row values from two (km, min, salik hits) routes """
+    tradeoff = tolls.salik_tradeoff(pay, avoid, **prices)
+    return {"status": "ok",
+            "pay_km": pay[0], "pay_min": pay[1], "pay_salik": pay[2], "pay_cost": tradeoff["pay_cost"],
+            "avoid_km": avoid[0], "avoid_min": avoid[1], "avoid_salik": avoid[2],
+            "avoid_cost": tradeoff["avoid_cost"], "money_saved": tradeoff["money_saved"],
+            "value_lost": tradeoff["value_lost"], "recommendation": "AVOID" if tradeoff["avoid"] else "PAY"}
+
+
+class GridRouter:
+    """ Routes (x, y) cell pairs on one saved grid map.
+
+    The avoid route treats every gate as a wall; when that disconnects the
+    pair the driver has no choice, so the pay route is used for both.
+    """
+
+    def __init__(self, config):
+        size, walls, gates = config["size"], config["walls"], config["salik_gates"]
+        self.algo = config["algo"]
+        self.prices = config["prices"]
+        self.cell_km = config["cell_km"]
+        self.cell_min = config["cell_km"] / config["speed_kph"] * 60
+        engine = HierarchicalPlanner if self.algo == "HPA*" else GridEngine
+        self.pay = engine(size, walls, gates)
+        self.no_gates = engine(size, list(walls) + list(gates)) if gates else None
+
+    def _measure(self, engine, start, end):
+        path = engine.search(start, end, self.algo, track_visited=False)[0]
+        if not path:
+            return None
+        cost = self.pay.cost
+        hits = sum(1 for pos in path[1:] if cost[self.pay.cell_id(pos)] == SALIK_COST)
+        steps = len(path) - 1
+        return steps * self.cell_km, steps * self.cell_min, hits
+
+    def route(self, start, end):
+        size = self.pay.grid_size
+        for x, y in (start, end):
+            if not (0 <= x < size and 0 <= y < size) or self.pay.cost[self.pay.cell_id((x, y))] == WALL:
+                return {"status": f"bad cell ({x}, {y})"}
+        pay = self._measure(self.pay, start, end)
+        if pay is None:
+            return {"status": "no route"}
+        avoid = self._measure(self.no_gates, start, end) if self.no_gates else None
+        return _figures(pay, avoid or pay, self.prices)
+
+
+class RoadRouter:
+    """ Routes osmid pairs on one cached road graph (CSR arrays, memory-mapped).
+
+    The pay route minimises the chosen weight. The avoid route is found like
+    the Logistics mode finds it: travel_time plus the gate penalty (in
+    seconds), whatever the weight. It always runs Dijkstra, since neither A*,
+    the contraction hierarchy nor the ALT landmarks take per-edge extras.
+    """
+
+    def __init__(self, config):
+        import contraction
+        import csr_graph
+        import graph_store
+
+        self.algo = config["algo"]
+        self.weight = config["weight"]
+        self.prices = config["prices"]
+        self.gate_edges = config["gate_edges"]
+        self.csr = csr_graph.CSRGraph.from_arrays(graph_store.load_arrays(config["region"]))
+        self.extra = self.csr.penalty_array(config["penalties"]) if config["penalties"] else None
+        self.ch = self.landmarks = None
+        if self.algo == "CH":
+            self.ch = contraction.load_hierarchy(config["region"], self.weight)
+        elif self.algo == "ALT":
+            self.landmarks = landmarks.load_or_build(config["region"], self.csr, self.weight)
+
+    def _measure(self, route):
+        dist_km, time_min = self.csr.route_stats(route)
+        return dist_km, time_min, tolls.count_gate_hits(route, self.gate_edges)
+
+    def route(self, start, end):
+        if self.algo == "CH":
+            path, _ = self.ch.query(start, end)
+        elif self.algo == "ALT":
+            path, _, _ = landmarks.road_route(self.csr, self.landmarks, start, end)
+        elif self.algo == "A*":
+            path, _ = self.csr.astar(start, end, self.weight)
+        else:
+            path, _ = self.csr.dijkstra(start, end, self.weight)
+        if not path:
+            return {"status": "no route"}
+        pay = self._measure(path)
+        avoid = pay
+        if self.extra is not None and pay[2]:
+            detour, _ = self.csr.dijkstra(start, end, "travel_time", self.extra)
+            avoid = self._measure(detour)
+        return _figures(pay, avoid, self.prices)
+
+
+_router = None
+
+
+def _init_worker(config):
+    global _router
+    _router = (GridRouter if config["mode"] == "grid" else RoadRouter)(config)
+
+
+def route_chunk(tasks):
+    """ Output rows for [(id, start, end), ...]; start is None for bad rows, end the reason """
+    out = []
+    for row_id, start, end in tasks:
+        if start is None:
+            result = {"status": f"bad row: {end}"}
+        else:
+            result = _router.route(start, end)
+        result["id"] = row_id
+        out.append(result)
+    return out
+
+
+# --- OUTPUT ---
+def format_rows(results, fmt):
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, OUTPUT_COLUMNS, lineterminator="\n")
+        for row in results:
+            writer.writerow({k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()})
+    else:
+        for row in results:
+            buf.write(json.dumps({k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()}))
+            buf.write("\n")
+    return buf.getvalue().encode()
+
+
+def file_digest(path):
+    """ SHA-256 of a file's contents, so editing a map starts a new job """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_checkpoint(path, job):
+    with open(path) as f:
+        state = json.load(f)
+    if state["job"] != job:
+        raise SystemExit(f"{path} belongs to a different job; remove it or drop --resume")
+    return state
+
+
+def save_checkpoint(path, job, rows_done, output_bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"job": job, "rows_done": rows_done, "output_bytes": output_bytes}, f)
+    os.replace(tmp, path)
+
+
+# --- PIPELINE ---
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def grid_cells(pairs):
+    """ locate() for grid maps: coordinates must be whole cells """
+    cells = []
+    for pair in pairs:
+        if isinstance(pair, str):
+            cells.append(pair)
+        elif any(v != int(v) for v in pair[0] + pair[1]):
+            cells.append("grid coordinates must be whole cells")
+        else:
+            cells.append(tuple((int(x), int(y)) for x, y in pair))
+    return cells
+
+
+def make_tasks(locate, columns, first_row, chunk):
+    """ Parse one chunk of input rows and turn coordinates into routable endpoints.
+
+    locate maps a list of (start, end) pairs (or error strings) to endpoints
+    (or error strings) in one call, so road snapping is one batched query.
+    """
+    ids, pairs = [], []
+    for offset, row in enumerate(chunk):
+        row_id = row.get("id")
+        ids.append(str(first_row + offset) if row_id in (None, "") else row_id)
+        try:
+            pairs.append(parse_pair(row, columns))
+        except ValueError as exc:
+            pairs.append(str(exc))
+    return [(row_id, None, ends) if isinstance(ends, str) else (row_id,) + tuple(ends)
+            for row_id, ends in zip(ids, locate(pairs))]
+
+
+def run(config, rows, out_fmt, locate, workers, chunk_size, on_chunk):
+    """ Route every row; on_chunk(rows_in_chunk, encoded_results) is called in input order """
+    columns = GRID_COLUMNS if config["mode"] == "grid" else ROAD_COLUMNS
+    chunks = chunked(rows, chunk_size)
+    first_rows = itertools.count(config["first_row"], chunk_size)
+
+    if workers == 1:
+        _init_worker(config)
+        for chunk in chunks:
+            tasks = make_tasks(locate, columns, next(first_rows), chunk)
+            on_chunk(len(chunk), format_rows(route_chunk(tasks), out_fmt))
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as pool:
+        for chunk in chunks:
+            tasks = make_tasks(locate, columns, next(first_rows), chunk)
+            pending.append((len(chunk), pool.submit(route_chunk, tasks)))
+            if len(pending) >= workers * IN_FLIGHT:
+                count, future = pending.popleft()
+                on_chunk(count, format_rows(future.result(), out_fmt))
+        while pending:
+            count, future = pending.popleft()
+            on_chunk(count, format_rows(future.result(), out_fmt))
+
+
+# --- NETWORK SETUP ---
+def grid_config(path):
+    with open(path) as f:
+        data = json.load(f)
+    return {"size": int(data["size"]),
+            "walls": [tuple(p) for p in data.get("walls", [])],
+            "salik_gates": [tuple(p) for p in data.get("salik_gates", [])]}
+
+
+def road_setup(args):
+    """ Config for the workers plus a locate(pairs) function for the main process """
+    # Road-only imports: grid jobs run without osmnx / the graph cache
+    import contraction
+    import csr_graph
+    import graph_store
+    from spatial_index import SpatialIndex
+
+    if args.region:
+        G = graph_store.load_cached(args.region)
+    elif args.point:
+        lat, lon = (float(v) for v in args.point.split(","))
+        G = graph_store.load_graph((lat, lon), args.dist, network_type="drive")
+    else:
+        raise SystemExit("road mode needs --region KEY or --point LAT,LON")
+    key = G.graph["store_key"]
+    index = SpatialIndex(G)
+
+    gate_edges, penalties = [], {}
+    if args.gates:
+        with open(args.gates) as f:
+            gates = json.load(f)
+        if gates:
+            lats, lons = zip(*gates)
+            gate_edges = index.nearest_edges(lats, lons)
+            penalties = tolls.gate_edge_penalties(G, gate_edges)
+    # Build once here, not in every worker
+    if args.algo == "CH":
+        contraction.load_hierarchy(key, args.weight)
+    elif args.algo == "ALT":
+        landmarks.load_or_build(key, csr_graph.CSRGraph.from_arrays(graph_store.load_arrays(key)), args.weight)
+
+    def snap(pairs):
+        # One batched KD-tree query for every endpoint in the chunk
+        points = [p for pair in pairs if not isinstance(pair, str) for p in pair]
+        if not points:
+            return pairs
+        lats, lons = zip(*points)
+        nodes = iter(index.nearest_nodes(lats, lons))
+        return [pair if isinstance(pair, str) else (next(nodes), next(nodes)) for pair in pairs]
+
+    config = {"region": key, "gate_edges": gate_edges, "penalties": penalties}
+    return config, snap
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route origin-destination pairs from a CSV / JSONL stream")
+    parser.add_argument("mode", choices=("grid", "road"))
+    parser.add_argument("map", nargs="?", help="grid mode: JSON map {size, walls, salik_gates}")
+    parser.add_argument("input", help="CSV or JSONL file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="CSV or JSONL file, - for stdout")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="input format (default: from the extension)")
+    parser.add_argument("--output-format", choices=("csv", "jsonl"), help="default: from the extension")
+    parser.add_argument("--algo", help="grid: A*, Dijkstra, JPS, ALT, HPA*; road: Dijkstra, A*, CH, ALT")
+    parser.add_argument("--weight", choices=("length", "travel_time"), default="travel_time",
+                        help="road edge weight to minimise")
+    parser.add_argument("--region", help="road mode: graph_cache key")
+    parser.add_argument("--point", help="road mode: LAT,LON centre to load (downloads on a cache miss)")
+    parser.add_argument("--dist", type=float, default=3000, help="road mode: half-width in meters")
+    parser.add_argument("--gates", help="road mode: JSON list of [lat, lon] Salik gates")
+    parser.add_argument("--salik-price", type=float, default=tolls.SALIK_PRICE)
+    parser.add_argument("--fuel-price", type=float, default=tolls.FUEL_PRICE)
+    parser.add_argument("--efficiency", type=float, default=tolls.EFFICIENCY, help="km per litre")
+    parser.add_argument("--hourly-wage", type=float, default=tolls.HOURLY_WAGE, help="AED per hour")
+    parser.add_argument("--cell-km", type=float, default=CELL_KM, help="grid mode: km per cell")
+    parser.add_argument("--speed-kph", type=float, default=GRID_SPEED_KPH, help="grid mode: driving speed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--checkpoint", help="default: OUTPUT.checkpoint")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    args = parser.parse_args()
+
+    if args.mode == "grid" and not args.map:
+        parser.error("grid mode needs a map file")
+    if args.mode == "road" and args.map:
+        parser.error("road mode takes no map file (use --region or --point)")
+    algorithms = GRID_ALGORITHMS if args.mode == "grid" else ROAD_ALGORITHMS
+    args.algo = args.algo or algorithms[0]
+    if args.algo not in algorithms:
+        parser.error(f"{args.mode} algorithms: {', '.join(algorithms)}")
+    if args.output == "-" and (args.resume or args.checkpoint):
+        parser.error("checkpoints need an output file")
+
+    in_fmt = detect_format(args.input, args.format)
+    out_fmt = detect_format(args.output, args.output_format)
+    prices = {"salik_price": args.salik_price, "fuel_price": args.fuel_price,
+              "efficiency": args.efficiency, "hourly_wage": args.hourly_wage}
+    config = {"mode": args.mode, "algo": args.algo, "weight": args.weight, "prices": prices}
+    if args.mode == "grid":
+        config.update(grid_config(args.map), cell_km=args.cell_km, speed_kph=args.speed_kph)
+        locate = grid_cells
+    else:
+        extra, locate = road_setup(args)
+        config.update(extra)
+
+    # Everything that changes the results; a checkpoint only resumes the same job
+    job = {"input": os.path.abspath(args.input) if args.input != "-" else "-",
+           "output_format": out_fmt, "config": {k: v for k, v in config.items()
+                                               if k not in ("walls", "salik_gates", "gate_edges", "penalties")},
+           "map": os.path.abspath(args.map) if args.map else None, "gates": args.gates,
+           "map_sha256": file_digest(args.map) if args.map else None,
+           "gates_sha256": file_digest(args.gates) if args.gates else None}
+    checkpoint = None if args.output == "-" else (args.checkpoint or args.output + ".checkpoint")
+
+    rows_done = 0
+    if args.output == "-":
+        out = sys.stdout.buffer
+    elif args.resume and os.path.exists(checkpoint):
+        state = load_checkpoint(checkpoint, job)
+        rows_done = state["rows_done"]
+        out = open(args.output, "r+b")
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+    else:
+        out = open(args.output, "wb")
+    if rows_done == 0 and out_fmt == "csv":
+        out.write((",".join(OUTPUT_COLUMNS) + "\n").encode())
+
+    stream = sys.stdin if args.input == "-" else open(args.input, newline="" if in_fmt == "csv" else None)
+    rows = itertools.islice(read_rows(stream, in_fmt), rows_done, None)
+    config["first_row"] = rows_done
+
+    started = time.perf_counter()
+    progress = {"rows": 0, "reported": started}
+
+    def on_chunk(count, data):
+        out.write(data)
+        out.flush()
+        progress["rows"] += count
+        if checkpoint:
+            save_checkpoint(checkpoint, job, rows_done + progress["rows"], out.tell())
+        now = time.perf_counter()
+        if now - progress["reported"] >= PROGRESS_EVERY:
+            progress["reported"] = now
+            rate = progress["rows"] / (now - started)
+            print(f"{rows_done + progress['rows']} rows  {rate:.0f} rows/s", file=sys.stderr)
+
+    try:
+        run(config, rows, out_fmt, locate, max(1, args.workers), args.chunk_size, on_chunk)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout.buffer:
+            out.close()
+    elapsed = time.perf_counter() - started
+    rate = progress["rows"] / elapsed if elapsed > 0 else 0.0
+    print(f"Done: {progress['rows']} rows in {elapsed:.1f}s ({rate:.0f} rows/s), "
+          f"{rows_done + progress['rows']} total", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,583 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from astar import search_algorithm
+from grid_engine import grid_search
+from incremental import IncrementalPlanner
+from hierarchical import HierarchicalPlanner
+from od_matrix import grid_od_matrix
+
+# --- BENCHMARKS ---
+# python benchmark.py run --out results.json     Full suite -> JSON
+# python benchmark.py compare old.json new.json  Flag regressions between two runs
+# python benchmark.py engines [size ...]         Node A* vs GridEngine table
+# python benchmark.py incremental [size ...]     LPA* repair vs full replan per edit
+# python benchmark.py jps [size ...]             A* vs Jump Point Search per map type
+# python benchmark.py alt [size ...]             A* vs bidirectional ALT, grids and cached road graphs
+# python benchmark.py hpa [size ...]             HPA* build/update/query vs A*, path quality
+# python benchmark.py matrix [size ...]          Many-to-many matrix vs one search per pair
+# python benchmark.py geometry [zoom ...]        Route map payload: raw PolyLine vs simplified + encoded
+#
+# "run" is headless and seeded: the same command on the same machine always
+# builds the same grids and origin-destination pairs. Each (case, algorithm)
+# gets warmup runs, then timed repeats (p50/p95), then one extra run under
+# tracemalloc for peak memory, so tracing never inflates the latency numbers.
+
+WALL_DENSITY = 0.20
+GATE_DENSITY = 0.05
+SEED = 0
+
+
+def grid_search_no_history(*args):
+    return grid_search(*args, track_visited=False)
+
+
+ENGINES = (
+    ("Node A*", search_algorithm),
+    ("GridEngine", grid_search),
+    ("GridEngine-", grid_search_no_history),  # no visited history
+)
+
+# Every grid algorithm the suite runs. Each entry takes the usual
+# search_algorithm arguments and returns (path, cost, visited, time, count).
+GRID_ALGORITHMS = {
+    "search_algorithm A*": lambda s, e, w, g, n: search_algorithm(s, e, w, g, n, "A*"),
+    "search_algorithm Dijkstra": lambda s, e, w, g, n: search_algorithm(s, e, w, g, n, "Dijkstra"),
+    "grid_engine A*": lambda s, e, w, g, n: grid_search(s, e, w, g, n, "A*", track_visited=False),
+    "grid_engine Dijkstra": lambda s, e, w, g, n: grid_search(s, e, w, g, n, "Dijkstra", track_visited=False),
+    "grid_engine JPS": lambda s, e, w, g, n: grid_search(s, e, w, g, n, "JPS", track_visited=False),
+    "grid_engine ALT": lambda s, e, w, g, n: grid_search(s, e, w, g, n, "ALT", track_visited=False),
+    "LPA* (cold)": lambda s, e, w, g, n: IncrementalPlanner(n, w, g, s, e, "A*").plan(),
+}
+
+
+# --- GRID CASES ---
+def random_city(grid_size, seed=SEED, wall_density=WALL_DENSITY, gate_density=GATE_DENSITY):
+    rng = random.Random(seed)
+    walls = set()
+    gates = set()
+    for y in range(grid_size):
+        for x in range(grid_size):
+            roll = rng.random()
+            if roll < wall_density: walls.add((x, y))
+            elif roll < wall_density + gate_density: gates.add((x, y))
+    start, end = (0, 0), (grid_size - 1, grid_size - 1)
+    walls.discard(start); walls.discard(end)
+    gates.discard(start); gates.discard(end)
+    return start, end, walls, gates
+
+
+def maze_city(grid_size, seed=SEED):
+    """ Perfect maze (one corridor between any two cells): worst case for A* """
+    rng = random.Random(seed)
+    size = grid_size if grid_size % 2 else grid_size - 1
+    walls = {(x, y) for x in range(grid_size) for y in range(grid_size)}
+    stack = [(0, 0)]
+    walls.discard((0, 0))
+    while stack:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy, dx, dy) for dx, dy in ((0, 2), (0, -2), (2, 0), (-2, 0))
+                   if 0 <= x + dx < size and 0 <= y + dy < size and (x + dx, y + dy) in walls]
+        if not options:
+            stack.pop()
+            continue
+        nx_, ny, dx, dy = rng.choice(options)
+        walls.discard((x + dx // 2, y + dy // 2))
+        walls.discard((nx_, ny))
+        stack.append((nx_, ny))
+    return (0, 0), (size - 1, size - 1), walls, set()
+
+
+def grid_cases(sizes):
+    cases = []
+    for size in sizes:
+        # Open, gate-heavy, light and dense cities
+        for walls, gates in ((0.0, 0.0), (0.02, 0.20), (0.10, 0.02), (0.30, 0.10)):
+            name = f"grid {size}x{size} walls={walls:.0%} gates={gates:.0%}"
+            cases.append((name, size, random_city(size, SEED, walls, gates)))
+        cases.append((f"maze {size}x{size}", size, maze_city(size)))
+    return cases
+
+
+# --- MEASUREMENT ---
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def measure_case(run, warmup, repeats):
+    """ run() -> (cost, nodes). Returns a result dict without case/algorithm """
+    for _ in range(warmup):
+        run()
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        cost, nodes = run()
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"p50_ms": round(percentile(samples, 50), 4),
+            "p95_ms": round(percentile(samples, 95), 4),
+            "mean_ms": round(sum(samples) / len(samples), 4),
+            "nodes_expanded": nodes,
+            "peak_mb": round(peak / 1e6, 3),
+            "cost": cost,
+            "repeats": repeats}
+
+
+def run_grid_suite(sizes, warmup, repeats, algorithms=None):
+    results = []
+    for case, size, (start, end, walls, gates) in grid_cases(sizes):
+        for name, fn in GRID_ALGORITHMS.items():
+            if algorithms and name not in algorithms:
+                continue
+
+            def run():
+                result = fn(start, end, walls, gates, size)
+                return result[1], result[4]
+
+            print(f"  {case:<38} {name}", file=sys.stderr)
+            results.append({"case": case, "algorithm": name, **measure_case(run, warmup, repeats)})
+    return results
+
+
+# --- ROAD GRAPH CASES ---
+def road_algorithms(G):
+    """ Every road engine available for this cached graph """
+    import math
+    import os
+    import networkx as nx
+    import contraction
+    import csr_graph
+    import graph_store
+    import landmarks
+
+    key = G.graph["store_key"]
+    csr = csr_graph.CSRGraph.from_arrays(graph_store.load_arrays(key))
+
+    def meters(u, v):
+        a, b = G.nodes[u], G.nodes[v]
+        dx = (a["x"] - b["x"]) * math.cos(math.radians(a["y"]))
+        return 0.99 * 111_320 * math.hypot(dx, a["y"] - b["y"])
+
+    algorithms = {
+        "networkx Dijkstra": lambda s, t: nx.shortest_path_length(G, s, t, weight="length"),
+        "networkx A*": lambda s, t: nx.astar_path_length(G, s, t, heuristic=meters, weight="length"),
+        "CSR Dijkstra": lambda s, t: csr.dijkstra(s, t, "length")[1],
+        "CSR A*": lambda s, t: csr.astar(s, t, "length")[1],
+    }
+    # Hierarchies take a while to build, so only use ones that already exist
+    if os.path.exists(contraction._ch_path(key, "length", "rank")):
+        ch = contraction.load_or_build(G, "length")
+        algorithms["Contraction Hierarchy"] = lambda s, t: ch.query(s, t)[1]
+    if os.path.exists(landmarks._alt_path(key, "length", "from")):
+        table = landmarks.load_or_build(key, csr, "length")
+        algorithms["CSR ALT"] = lambda s, t: landmarks.road_route(csr, table, s, t)[1]
+    return algorithms
+
+
+def od_pairs(G, count, seed=SEED):
+    import networkx as nx
+    nodes = sorted(G.nodes)
+    rng = random.Random(seed)
+    pairs = []
+    while len(pairs) < count:
+        s, t = rng.choice(nodes), rng.choice(nodes)
+        if s != t and nx.has_path(G, s, t):
+            pairs.append((s, t))
+    return pairs
+
+
+def run_road_suite(od_count, warmup, repeats, algorithms=None):
+    import graph_store
+
+    results = []
+    for key in sorted(graph_store._read_index()):
+        G = graph_store.load_cached(key)
+        pairs = od_pairs(G, od_count)
+        for name, fn in road_algorithms(G).items():
+            if algorithms and name not in algorithms:
+                continue
+
+            def run():
+                # Latency is for the whole OD set; cost is the sum over it
+                return round(sum(fn(s, t) for s, t in pairs), 3), None
+
+            case = f"road {key} od={od_count}"
+            print(f"  {case:<38} {name}", file=sys.stderr)
+            results.append({"case": case, "algorithm": name, **measure_case(run, warmup, repeats)})
+    return results
+
+
+def run_suite(args):
+    results = []
+    if not args.skip_grid:
+        results += run_grid_suite(args.sizes, args.warmup, args.repeats, args.algorithms)
+    if not args.skip_road:
+        results += run_road_suite(args.od_pairs, args.warmup, args.repeats, args.algorithms)
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "machine": platform.machine(), "seed": SEED, "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                 "warmup": args.warmup, "repeats": args.repeats},
+        "results": results,
+    }
+    text = json.dumps(report, indent=1)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+        print(f"Wrote {len(results)} results to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+# --- REGRESSION CHECK ---
+def compare_reports(old_path, new_path, threshold, min_ms=1.0):
+    with open(old_path) as f:
+        old = {(r["case"], r["algorithm"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {(r["case"], r["algorithm"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"{'case':<52} {'algorithm':<26} {'old p50':>9} {'new p50':>9} {'change':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = after["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        flags = []
+        # Sub-millisecond jitter on tiny cases is not a regression
+        if change > threshold and after["p50_ms"] - before["p50_ms"] > min_ms: flags.append("SLOWER")
+        if after["cost"] != before["cost"]: flags.append("COST CHANGED")
+        if flags: regressions += 1
+        print(f"{key[0]:<52} {key[1]:<26} {before['p50_ms']:>9.2f} {after['p50_ms']:>9.2f} "
+              f"{change:>+7.1%} {' '.join(flags)}")
+    for key in sorted(old.keys() - new.keys()):
+        print(f"{key[0]:<52} {key[1]:<26} missing from new run")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+# --- QUICK TABLES ---
+def measure(fn, *args):
+    # Time first (tracemalloc slows Python code down a lot), then memory
+    t0 = time.perf_counter()
+    result = fn(*args)
+    elapsed = (time.perf_counter() - t0) * 1000
+
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def compare_engines(sizes, algos=("A*", "Dijkstra")):
+    print(f"{'size':>6} {'algo':>9} {'engine':>12} {'time ms':>10} {'peak MB':>9} {'cost':>7} {'nodes':>9}")
+    for size in sizes:
+        start, end, walls, gates = random_city(size)
+        for algo_type in algos:
+            for name, fn in ENGINES:
+                result, elapsed, peak = measure(fn, start, end, walls, gates, size, algo_type)
+                print(f"{size:>6} {algo_type:>9} {name:>12} {elapsed:>10.1f} {peak:>9.1f} {result[1]:>7} {result[4]:>9}")
+
+
+def compare_jps(sizes, maps=(("open", 0.0, 0.0), ("gate-heavy", 0.02, 0.20),
+                              ("light", 0.10, 0.02), ("dense", 0.30, 0.10))):
+    print(f"{'size':>6} {'map':>11} {'A* ms':>9} {'JPS ms':>9} {'A* nodes':>10} {'JPS nodes':>10} {'nodes saved':>12}")
+    for size in sizes:
+        for name, wall_density, gate_density in maps:
+            start, end, walls, gates = random_city(size, SEED, wall_density, gate_density)
+            astar, astar_ms, _ = measure(grid_search, start, end, walls, gates, size, "A*", False)
+            jps, jps_ms, _ = measure(grid_search, start, end, walls, gates, size, "JPS", False)
+            assert astar[1] == jps[1], "JPS and A* disagree"
+            saved = 1 - jps[4] / astar[4] if astar[4] else 0.0
+            print(f"{size:>6} {name:>11} {astar_ms:>9.1f} {jps_ms:>9.1f} {astar[4]:>10} {jps[4]:>10} {saved:>12.0%}")
+
+
+def compare_alt(sizes, queries=20, maps=(("open", 0.0, 0.0), ("light", 0.10, 0.02),
+                                         ("dense", 0.30, 0.10))):
+    import graph_store
+    import landmarks
+    from astar import SearchStats
+    from csr_graph import CSRGraph
+    from grid_engine import GridEngine
+
+    print(f"{'case':>22} {'build s':>8} {'A* ms':>8} {'ALT ms':>8} {'A* nodes':>10} {'ALT nodes':>10} {'nodes saved':>12}")
+
+    def row(case, build_s, astar_ms, alt_ms, astar_nodes, alt_nodes):
+        saved = 1 - alt_nodes / astar_nodes if astar_nodes else 0.0
+        print(f"{case:>22} {build_s:>8.2f} {astar_ms:>8.1f} {alt_ms:>8.1f} {astar_nodes:>10} {alt_nodes:>10} {saved:>12.0%}")
+
+    for size in sizes:
+        for name, wall_density, gate_density in maps:
+            _, _, walls, gates = random_city(size, SEED, wall_density, gate_density)
+            engine = GridEngine(size, walls, gates)
+            t0 = time.perf_counter()
+            landmarks.grid_landmarks(size, engine.cost)
+            build_s = time.perf_counter() - t0
+
+            rng = random.Random(SEED)
+            totals = [0.0, 0.0, 0, 0]
+            for _ in range(queries):
+                start, end = random_free_cell(rng, size, walls), random_free_cell(rng, size, walls)
+                astar, astar_ms, _ = measure(engine.search, start, end, "A*", False)
+                alt, alt_ms, _ = measure(engine.search, start, end, "ALT", False)
+                assert astar[1] == alt[1], "ALT and A* disagree"
+                totals = [totals[0] + astar_ms, totals[1] + alt_ms, totals[2] + astar[4], totals[3] + alt[4]]
+            row(f"{size}x{size} {name}", build_s, totals[0] / queries, totals[1] / queries, totals[2], totals[3])
+
+    for key in sorted(graph_store._read_index()):
+        csr = CSRGraph.from_arrays(graph_store.load_arrays(key))
+        t0 = time.perf_counter()
+        table = landmarks.load_or_build(key, csr, "length")
+        build_s = time.perf_counter() - t0
+        nodes = csr.node_osmid.tolist()
+        rng = random.Random(SEED)
+        totals = [0.0, 0.0, 0, 0]
+        for _ in range(queries):
+            s, t = rng.choice(nodes), rng.choice(nodes)
+            stats = SearchStats()
+            t0 = time.perf_counter()
+            _, astar_cost = csr.astar(s, t, "length", stats=stats)
+            astar_ms = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            _, alt_cost, expanded = landmarks.road_route(csr, table, s, t)
+            alt_ms = (time.perf_counter() - t0) * 1000
+            assert abs(astar_cost - alt_cost) <= 1e-3 * max(1.0, astar_cost), "ALT and A* disagree"
+            totals = [totals[0] + astar_ms, totals[1] + alt_ms,
+                      totals[2] + stats.pops - stats.stale_pops, totals[3] + expanded]
+        row(key[-22:], build_s, totals[0] / queries, totals[1] / queries, totals[2], totals[3])
+
+
+def compare_geometry(zooms, routes=5):
+    import folium
+    import graph_store
+    import route_geometry
+    from csr_graph import CSRGraph
+
+    print(f"{'case':>22} {'points':>7} {'coords ms':>10} {'route KB':>9} {'page KB':>8} {'render ms':>10}")
+    for key in sorted(graph_store._read_index()):
+        G = graph_store.load_cached(key)
+        csr = CSRGraph.from_arrays(graph_store.load_arrays(key))
+        # The longest of a few seeded routes, like a cross-city trip
+        nodes = csr.node_osmid.tolist()
+        rng = random.Random(SEED)
+        pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(50)]
+        found = [csr.dijkstra(s, t, "length") for s, t in pairs]
+        found = sorted((r for r in found if r[0]), key=lambda r: -r[1])[:routes]
+
+        def page(make_lines):
+            m = folium.Map(location=[float(csr.node_y.mean()), float(csr.node_x.mean())], zoom_start=12)
+            for line in make_lines():
+                line.add_to(m)
+            return m.get_root().render()
+
+        empty = len(page(list))
+
+        def row(case, coords_ms, points, make_lines):
+            html, render_ms, _ = measure(page, make_lines)
+            print(f"{case:>22} {points:>7} {coords_ms:>10.2f} {(len(html) - empty) / 1000:>9.1f} "
+                  f"{len(html) / 1000:>8.1f} {render_ms:>10.1f}")
+
+        # Before: networkx node lookups, written out as JSON floats
+        coords, coords_ms, _ = measure(lambda: [[(G.nodes[n]['y'], G.nodes[n]['x']) for n in route]
+                                                for route, _ in found])
+        row(f"{key[-14:]} raw", coords_ms, sum(map(len, coords)),
+            lambda: [folium.PolyLine(c) for c in coords])
+
+        # After: array lookup, then simplified for the map's zoom and encoded
+        coords, coords_ms, _ = measure(lambda: [csr.route_coords(route) for route, _ in found])
+        for zoom in zooms:
+            points = sum(len(route_geometry.simplify(c, zoom)) for c in coords)
+            row(f"{key[-14:]} z{zoom}", coords_ms, points,
+                lambda: [route_geometry.polyline(c, zoom) for c in coords])
+
+
+def random_free_cell(rng, grid_size, walls):
+    while True:
+        pos = (rng.randrange(grid_size), rng.randrange(grid_size))
+        if pos not in walls:
+            return pos
+
+
+def compare_hpa(sizes, queries=20, edits=20, maps=(("open", 0.0, 0.0), ("light", 0.10, 0.02),
+                                                   ("dense", 0.30, 0.10))):
+    print(f"{'size':>6} {'map':>6} {'build s':>8} {'edit ms':>8} {'HPA* ms':>8} {'A* ms':>8} "
+          f"{'speedup':>8} {'mean cost':>10} {'worst':>7}")
+    for size in sizes:
+        for name, wall_density, gate_density in maps:
+            _, _, walls, gates = random_city(size, SEED, wall_density, gate_density)
+            t0 = time.perf_counter()
+            planner = HierarchicalPlanner(size, walls, gates)
+            build_s = time.perf_counter() - t0
+
+            rng = random.Random(SEED)
+            hpa_ms = astar_ms = 0.0
+            ratios = []
+            for _ in range(queries):
+                start, end = random_free_cell(rng, size, walls), random_free_cell(rng, size, walls)
+                t0 = time.perf_counter()
+                hpa = planner.query(start, end)
+                hpa_ms += time.perf_counter() - t0
+                t0 = time.perf_counter()
+                best = grid_search(start, end, walls, gates, size, "A*", track_visited=False)
+                astar_ms += time.perf_counter() - t0
+                if best[0]:
+                    ratios.append(hpa[1] / best[1] if best[1] else 1.0)
+
+            t0 = time.perf_counter()
+            for kind, pos in random_edits(size, edits, None):
+                if kind == "wall": planner.add_wall(pos)
+                elif kind == "gate": planner.add_gate(pos)
+                else: planner.remove_cell(pos)  # "goal" edits clear the cell instead
+            edit_ms = (time.perf_counter() - t0) * 1000 / edits
+
+            hpa_ms, astar_ms = hpa_ms * 1000 / queries, astar_ms * 1000 / queries
+            mean = sum(ratios) / len(ratios) if ratios else 1.0
+            worst = max(ratios, default=1.0)
+            print(f"{size:>6} {name:>6} {build_s:>8.1f} {edit_ms:>8.2f} {hpa_ms:>8.1f} {astar_ms:>8.1f} "
+                  f"{astar_ms / hpa_ms:>7.1f}x {mean - 1:>+9.1%} {worst - 1:>+6.0%}")
+
+
+def compare_matrix(sizes, points=30, workers=(None, 1, 4)):
+    # workers=None is od_matrix's default: serial below POOL_MIN_WORK, a pool above
+    labels = [f"matrix x{w} ms" if w else "matrix auto ms" for w in workers]
+    print(f"{'size':>6} {'pairs':>6} {'pairwise ms':>12} " + " ".join(f"{label:>14}" for label in labels))
+    for size in sizes:
+        _, _, walls, gates = random_city(size)
+        rng = random.Random(SEED)
+        cells = [random_free_cell(rng, size, walls) for _ in range(points)]
+
+        t0 = time.perf_counter()
+        pairwise = [[grid_search(a, b, walls, gates, size, "A*", track_visited=False)[1] for b in cells] for a in cells]
+        pairwise_ms = (time.perf_counter() - t0) * 1000
+
+        timings = []
+        for count in workers:
+            t0 = time.perf_counter()
+            matrix = grid_od_matrix(size, walls, gates, cells, cells, layers=("steps", "tolls"), workers=count)
+            timings.append((time.perf_counter() - t0) * 1000)
+            reachable = [[c if row[j] or a == cells[j] else float("inf") for j, c in enumerate(row)]
+                         for a, row in zip(cells, pairwise)]
+            assert (matrix["cost"] == reachable).all(), "matrix and pairwise costs disagree"
+        print(f"{size:>6} {points * points:>6} {pairwise_ms:>12.0f} " + " ".join(f"{t:>14.0f}" for t in timings))
+
+
+def random_edits(grid_size, count, start, seed=1):
+    rng = random.Random(seed)
+    edits = []
+    for _ in range(count):
+        pos = (rng.randrange(grid_size), rng.randrange(grid_size))
+        if pos == start: continue
+        roll = rng.random()
+        if roll < 0.5: edits.append(("wall", pos))
+        elif roll < 0.8: edits.append(("gate", pos))
+        else: edits.append(("goal", pos))
+    return edits
+
+
+def compare_incremental(sizes, edit_count=100, algo_type="A*"):
+    print(f"{'size':>6} {'edits':>6} {'full ms/edit':>13} {'LPA* ms/edit':>13} {'speedup':>8}")
+    for size in sizes:
+        start, end, walls, gates = random_city(size)
+        planner = IncrementalPlanner(size, walls, gates, start, end, algo_type)
+        planner.plan()
+
+        full_ms = 0
+        lpa_ms = 0
+        applied = 0
+        for kind, pos in random_edits(size, edit_count, start):
+            if kind == "wall":
+                if pos == end: continue
+                walls.add(pos); gates.discard(pos)
+                t0 = time.perf_counter()
+                planner.add_wall(pos)
+            elif kind == "gate":
+                gates.add(pos); walls.discard(pos)
+                t0 = time.perf_counter()
+                planner.add_gate(pos)
+            else:
+                if pos in walls: continue
+                end = pos
+                t0 = time.perf_counter()
+                planner.move_goal(pos)
+            lpa = planner.plan()
+            lpa_ms += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            full = grid_search(start, end, walls, gates, size, algo_type, track_visited=False)
+            full_ms += time.perf_counter() - t0
+            assert lpa[1] == full[1], "LPA* and full search disagree"
+            applied += 1
+
+        full_ms = full_ms * 1000 / applied
+        lpa_ms = lpa_ms * 1000 / applied
+        print(f"{size:>6} {applied:>6} {full_ms:>13.2f} {lpa_ms:>13.2f} {full_ms / lpa_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MetroFlow benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="full seeded suite, JSON output")
+    run.add_argument("--out", help="write JSON here instead of stdout")
+    run.add_argument("--sizes", type=int, nargs="+", default=[100, 300])
+    run.add_argument("--od-pairs", type=int, default=20)
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--algorithms", nargs="+", help="only run these algorithm names")
+    run.add_argument("--skip-grid", action="store_true")
+    run.add_argument("--skip-road", action="store_true", help="skip cached road graphs")
+
+    cmp_ = sub.add_parser("compare", help="diff two JSON runs")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown that counts as a regression")
+    cmp_.add_argument("--min-ms", type=float, default=1.0, help="ignore slowdowns smaller than this many ms")
+
+    engines = sub.add_parser("engines", help="Node A* vs GridEngine table")
+    engines.add_argument("sizes", type=int, nargs="*", default=[500, 1000, 2000])
+    incremental = sub.add_parser("incremental", help="LPA* vs full replan per edit")
+    incremental.add_argument("sizes", type=int, nargs="*", default=[50, 100, 200])
+    jps = sub.add_parser("jps", help="A* vs Jump Point Search per map type")
+    jps.add_argument("sizes", type=int, nargs="*", default=[200, 500])
+    alt = sub.add_parser("alt", help="A* vs bidirectional ALT on grids and cached road graphs")
+    alt.add_argument("sizes", type=int, nargs="*", default=[200, 500])
+    hpa = sub.add_parser("hpa", help="HPA* vs A*: build, edit and query time, path quality")
+    hpa.add_argument("sizes", type=int, nargs="*", default=[256, 512])
+    matrix = sub.add_parser("matrix", help="OD matrix vs one search per pair")
+    matrix.add_argument("sizes", type=int, nargs="*", default=[100, 300])
+    geometry = sub.add_parser("geometry", help="route map payload and render time, raw vs encoded")
+    geometry.add_argument("zooms", type=int, nargs="*", default=[12, 14, 16])
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_suite(args)
+    elif args.command == "compare":
+        sys.exit(1 if compare_reports(args.old, args.new, args.threshold, args.min_ms) else 0)
+    elif args.command == "engines":
+        compare_engines(args.sizes)
+    elif args.command == "jps":
+        compare_jps(args.sizes)
+    elif args.command == "alt":
+        compare_alt(args.sizes)
+    elif args.command == "hpa":
+        compare_hpa(args.sizes)
+    elif args.command == "matrix":
+        compare_matrix(args.sizes)
+    elif args.command == "geometry":
+        compare_geometry(args.zooms)
+    else:
+        compare_incremental(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import osmnx as ox
 import networkx as nx
 import folium
+import graph_store
+import route_geometry
+from csr_graph import CSRGraph
 
 print("--- BONUS TASK: REAL WORLD MAP (LONG DISTANCE) ---")
 print("Generating path from Dubai Mall to UOWD...")
-print("Note: Since this is a long route (15km+), map download may take 30-60 seconds.")
+print("Note: Since this is a long route (15km+), the first map download may take 30-60 seconds.")
+print("      After that the map is loaded from the local graph_cache/ folder.")
 
 # 1. SETUP: Define Coordinates
 # Start: Dubai Mall (Grand Entrance)
@@ -20,7 +24,7 @@ mid_lon = (start_loc[1] + end_loc[1]) / 2
 
 # We need a radius of about 15km (15000m) to cover the highway between them
 print("Downloading Map Data for Sheikh Zayed Road area...")
-G = ox.graph_from_point((mid_lat, mid_lon), dist=15000, network_type='drive')
+G = graph_store.load_graph((mid_lat, mid_lon), dist=15000, network_type='drive')
 
 # 3. PATHFINDING
 print("Calculating Shortest Path...")
@@ -36,9 +40,10 @@ print("Drawing Map...")
 # Center map on the midpoint
 m = folium.Map(location=[mid_lat, mid_lon], zoom_start=12, tiles="cartodbpositron")
 
-# Draw Route
-route_coords = [(G.nodes[n]['y'], G.nodes[n]['x']) for n in route]
-folium.PolyLine(route_coords, color="blue", weight=5, opacity=0.7).add_to(m)
+# Draw Route (coordinates from the CSR arrays, simplified and encoded: see route_geometry.py)
+csr = CSRGraph.from_arrays(graph_store.load_arrays(G.graph['store_key']))
+route_coords = csr.route_coords(route)
+route_geometry.polyline(route_coords, route_geometry.DETAIL_ZOOM, color="blue", weight=5, opacity=0.7).add_to(m)
 
 # Add Markers
 folium.Marker(start_loc, popup="Dubai Mall", icon=folium.Icon(color='green', icon='shopping-bag', prefix='fa')).add_to(m)
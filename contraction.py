@@ -0,0 +1,235 @@
+import heapq
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+import graph_store
+
+# --- CONTRACTION HIERARCHIES ---
+# Preprocessing: contract nodes one by one (least important first) and add a
+# shortcut u -> w whenever the only shortest u -> w path ran through the node
+# being removed. Queries then only climb "upwards" in the hierarchy from both
+# ends, which touches a few hundred nodes instead of the whole city.
+#
+# The hierarchy is stored as two CSR arrays (upward edges for the forward
+# search, reversed downward edges for the backward search) in the region
+# folder of graph_store, e.g. graph_cache/<region>/ch_length_*.npy
+
+WITNESS_SETTLE_LIMIT = 400   # Nodes a witness search may settle while contracting
+ESTIMATE_SETTLE_LIMIT = 40   # Cheaper limit used when only estimating priority
+INF = float("inf")
+
+
+class ContractionHierarchy:
+    """ Point-to-point queries on a preprocessed hierarchy """
+
+    def __init__(self, arrays):
+        self.node_osmid = arrays["node_osmid"]
+        self.index = {int(n): i for i, n in enumerate(self.node_osmid.tolist())}
+        n = len(self.node_osmid)
+        # The stored CSR arrays are used as they are, so both upward searches
+        # run in scipy's C Dijkstra instead of a Python loop
+        self.up = csr_matrix((np.asarray(arrays["up_weights"]), np.asarray(arrays["up_targets"]),
+                              np.asarray(arrays["up_offsets"])), shape=(n, n))
+        self.down = csr_matrix((np.asarray(arrays["down_weights"]), np.asarray(arrays["down_targets"]),
+                                np.asarray(arrays["down_offsets"])), shape=(n, n))
+        self.middle = {(u, w): m for u, w, m in arrays["shortcuts"].tolist()}
+
+    def query(self, source, target):
+        """ Shortest path between two osmids. Returns (path, cost) or ([], inf) """
+        s = self.index[source]
+        t = self.index[target]
+        if s == t:
+            return [source], 0.0
+
+        # Upward search from both ends; they meet at the node with the
+        # smallest forward + backward distance
+        dist_s, pred_s = csgraph_dijkstra(self.up, indices=s, return_predecessors=True)
+        dist_t, pred_t = csgraph_dijkstra(self.down, indices=t, return_predecessors=True)
+        total = dist_s + dist_t
+        meet = int(total.argmin())
+        if total[meet] == INF:
+            return [], INF
+        return self._unpack_route((pred_s, pred_t), meet), float(total[meet])
+
+    def _unpack_route(self, parent, meet):
+        forward = []
+        v = meet
+        while v >= 0:  # scipy marks the search root with a negative predecessor
+            forward.append(v)
+            v = int(parent[0][v])
+        forward.reverse()
+        v = int(parent[1][meet])
+        while v >= 0:
+            forward.append(v)
+            v = int(parent[1][v])
+
+        path = [forward[0]]
+        for u, w in zip(forward[:-1], forward[1:]):
+            self._unpack_edge(u, w, path)
+        return self.node_osmid[path].tolist()
+
+    def _unpack_edge(self, u, w, path):
+        # Iterative so very deep shortcut chains can't hit the recursion limit
+        stack = [(u, w)]
+        while stack:
+            a, b = stack.pop()
+            m = self.middle.get((a, b))
+            if m is None:
+                path.append(b)
+            else:
+                stack.append((m, b))
+                stack.append((a, m))
+
+
+def _to_csr(n, edges):
+    """ edges: list of (row, col, weight) -> offsets, targets, weights """
+    edges.sort()
+    offsets = np.zeros(n + 1, dtype=np.int32)
+    for row, _, _ in edges:
+        offsets[row + 1] += 1
+    np.cumsum(offsets, out=offsets)
+    targets = np.array([e[1] for e in edges], dtype=np.int32)
+    weights = np.array([e[2] for e in edges], dtype=np.float64)
+    return offsets, targets, weights
+
+
+# --- PREPROCESSING ---
+def _witness_costs(source, out, skip, limit, settle_limit):
+    """ Bounded Dijkstra from source that never passes through skip """
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap and settled < settle_limit:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        for w, weight in out[v].items():
+            if w == skip:
+                continue
+            nd = d + weight
+            if nd < dist.get(w, INF):
+                dist[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return dist
+
+
+def _shortcuts_for(v, out, inn, settle_limit):
+    """ Shortcuts needed if v were contracted now: list of (u, w, weight) """
+    shortcuts = []
+    outgoing = out[v]
+    if not outgoing:
+        return shortcuts
+    max_out = max(outgoing.values())
+    for u, w_in in inn[v].items():
+        witness = _witness_costs(u, out, v, w_in + max_out, settle_limit)
+        for w, w_out in outgoing.items():
+            if w == u:
+                continue
+            via_v = w_in + w_out
+            if witness.get(w, INF) > via_v:
+                shortcuts.append((u, w, via_v))
+    return shortcuts
+
+
+def build_arrays(arrays, weight):
+    """ Build a hierarchy from graph_store arrays for one weight column """
+    n = len(arrays["node_osmid"])
+    column = graph_store.EDGE_FLOAT_COLUMNS.index(weight)
+    edge_uv = arrays["edge_uv"].tolist()
+    edge_w = arrays["edge_float"][:, column].tolist()
+
+    # Parallel edges collapse to the cheapest one, self-loops never help
+    out = [dict() for _ in range(n)]
+    inn = [dict() for _ in range(n)]
+    for (u, v), w in zip(edge_uv, edge_w):
+        if u != v and w < out[u].get(v, INF):
+            out[u][v] = w
+            inn[v][u] = w
+    all_edges = {(u, v): w for u in range(n) for v, w in out[u].items()}
+    middle = {}
+
+    def priority(v):
+        added = len(_shortcuts_for(v, out, inn, ESTIMATE_SETTLE_LIMIT))
+        return added - len(out[v]) - len(inn[v]) + deleted_neighbors[v]
+
+    deleted_neighbors = [0] * n
+    heap = [(priority(v), v) for v in range(n)]
+    heapq.heapify(heap)
+    rank = np.empty(n, dtype=np.int32)
+    order = 0
+
+    while heap:
+        _, v = heapq.heappop(heap)
+        # Lazy update: only contract v if it is still the cheapest choice
+        current = priority(v)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))
+            continue
+
+        for u, w, cost in _shortcuts_for(v, out, inn, WITNESS_SETTLE_LIMIT):
+            if cost < out[u].get(w, INF):
+                out[u][w] = cost
+                inn[w][u] = cost
+                all_edges[(u, w)] = cost
+                middle[(u, w)] = v
+
+        for u in inn[v]:
+            del out[u][v]
+            deleted_neighbors[u] += 1
+        for w in out[v]:
+            del inn[w][v]
+            deleted_neighbors[w] += 1
+        out[v] = {}
+        inn[v] = {}
+        rank[v] = order
+        order += 1
+
+    up, down = [], []
+    for (u, w), cost in all_edges.items():
+        if rank[w] > rank[u]:
+            up.append((u, w, cost))
+        else:
+            down.append((w, u, cost))  # Stored reversed for the backward search
+
+    result = {"node_osmid": np.asarray(arrays["node_osmid"]), "rank": rank}
+    for name, edges in (("up", up), ("down", down)):
+        offsets, targets, weights = _to_csr(n, edges)
+        result[name + "_offsets"] = offsets
+        result[name + "_targets"] = targets
+        result[name + "_weights"] = weights
+    result["shortcuts"] = np.array([(u, w, m) for (u, w), m in middle.items()],
+                                   dtype=np.int32).reshape(-1, 3)
+    return result
+
+
+# --- DISK CACHE (next to the cached graph) ---
+CH_ARRAYS = ("node_osmid", "rank", "up_offsets", "up_targets", "up_weights",
+             "down_offsets", "down_targets", "down_weights", "shortcuts")
+
+
+def _ch_path(key, weight, name):
+    return os.path.join(graph_store.region_dir(key), f"ch_{weight}_{name}.npy")
+
+
+def load_or_build(G, weight="length"):
+    """ Hierarchy for a graph that came from graph_store.load_graph """
+    return load_hierarchy(G.graph["store_key"], weight)
+
+
+def load_hierarchy(key, weight="length"):
+    """ Hierarchy of a cached region by store key (built and saved on first use,
+    and again whenever the region itself was saved again) """
+    paths = [_ch_path(key, weight, name) for name in CH_ARRAYS]
+    saved = os.stat(os.path.join(graph_store.region_dir(key), "edge_float.npy")).st_mtime_ns
+    if not all(os.path.exists(path) and os.stat(path).st_mtime_ns >= saved for path in paths):
+        arrays = build_arrays(graph_store.load_arrays(key), weight)
+        for name in CH_ARRAYS:
+            np.save(_ch_path(key, weight, name), arrays[name])
+    return ContractionHierarchy({name: np.load(_ch_path(key, weight, name), mmap_mode="r")
+                                 for name in CH_ARRAYS})
@@ -0,0 +1,221 @@
+import heapq
+import math
+import sys
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+import graph_store
+from astar import SearchStats
+
+# --- COMPRESSED SPARSE ROW ROAD GRAPH ---
+# The whole road network as a handful of flat arrays:
+#   offsets[i]:offsets[i+1]  -> slice of targets / weights leaving node i
+# Parallel OSM edges between the same two nodes are merged, keeping the
+# cheapest length and the cheapest travel time separately.
+
+METERS_PER_DEGREE = 111_320
+WEIGHTS = ("length", "travel_time")
+
+
+class CSRGraph:
+    def __init__(self, node_osmid, node_x, node_y, offsets, targets, length, travel_time):
+        self.node_osmid = node_osmid
+        self.node_x = node_x
+        self.node_y = node_y
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = {"length": length, "travel_time": travel_time}
+        self.n = len(node_osmid)
+        self.index = {n: i for i, n in enumerate(node_osmid.tolist())}
+        # Sorted u * n + v for every edge, so (u, v) -> edge id is a searchsorted
+        self.edge_keys = np.repeat(np.arange(self.n, dtype=np.int64), np.diff(offsets)) * self.n + targets
+        self._osmid_order = np.argsort(node_osmid, kind="stable")
+        self._matrices = {}
+        self._lists = None
+
+    # --- CONVERSION ---
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ Build from graph_store arrays (node_osmid, node_xy, edge_uv, edge_float) """
+        n = len(arrays["node_osmid"])
+        uv = np.asarray(arrays["edge_uv"], dtype=np.int64)
+        floats = np.asarray(arrays["edge_float"])
+        length = floats[:, graph_store.EDGE_FLOAT_COLUMNS.index("length")]
+        travel_time = floats[:, graph_store.EDGE_FLOAT_COLUMNS.index("travel_time")]
+
+        keys = uv[:, 0] * n + uv[:, 1]
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        unique_keys, first = np.unique(keys, return_index=True)
+        length = np.minimum.reduceat(length[order], first).astype(np.float32)
+        travel_time = np.minimum.reduceat(travel_time[order], first).astype(np.float32)
+
+        sources = unique_keys // n
+        offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+        targets = (unique_keys % n).astype(np.int32)
+
+        xy = np.asarray(arrays["node_xy"])
+        return cls(np.asarray(arrays["node_osmid"], dtype=np.int64), xy[:, 0].copy(), xy[:, 1].copy(),
+                   offsets, targets, length, travel_time)
+
+    @classmethod
+    def from_graph(cls, G):
+        """ Build from an osmnx MultiDiGraph (speeds / travel times already added) """
+        return cls.from_arrays(graph_store.graph_to_arrays(G))
+
+    @property
+    def nbytes(self):
+        arrays = (self.node_osmid, self.node_x, self.node_y, self.offsets, self.targets,
+                  self.weights["length"], self.weights["travel_time"])
+        return sum(a.nbytes for a in arrays)
+
+    def matrix(self, weight, extra=None):
+        """ scipy CSR matrix of one weight; extra = per-edge additions (e.g. tolls) """
+        if extra is not None:
+            data = self.weights[weight].astype(np.float64) + extra
+            return csr_matrix((data, self.targets, self.offsets), shape=(self.n, self.n))
+        if weight not in self._matrices:
+            self._matrices[weight] = csr_matrix(
+                (self.weights[weight].astype(np.float64), self.targets, self.offsets), shape=(self.n, self.n)
+            )
+        return self._matrices[weight]
+
+    def edge_ids(self, us, vs):
+        """ Edge ids for arrays of node indices (every pair must be an edge) """
+        return np.searchsorted(self.edge_keys, np.asarray(us, dtype=np.int64) * self.n + vs)
+
+    def penalty_array(self, penalties):
+        """ Per-edge extra cost from a tolls.* {(u, v, key): cost} map (osmids) """
+        extra = np.zeros(len(self.targets))
+        if penalties:
+            pairs = {}
+            for (u, v, _), cost in penalties.items():
+                # Parallel edges are merged, so keep the largest penalty per pair
+                pairs[(u, v)] = max(pairs.get((u, v), 0), cost)
+            us = [self.index[u] for u, _ in pairs]
+            vs = [self.index[v] for _, v in pairs]
+            extra[self.edge_ids(us, vs)] = list(pairs.values())
+        return extra
+
+    # --- SEARCH KERNELS ---
+    def dijkstra(self, source, target, weight="length", extra=None):
+        """ Native (scipy) Dijkstra between two osmids. Returns (route, cost) """
+        s, t = self.index[source], self.index[target]
+        dist, pred = csgraph_dijkstra(self.matrix(weight, extra), indices=s, return_predecessors=True)
+        if not np.isfinite(dist[t]):
+            return [], math.inf
+        route = [t]
+        while route[-1] != s:
+            route.append(pred[route[-1]])
+        return self.node_osmid[route[::-1]].tolist(), float(dist[t])
+
+    def astar(self, source, target, weight="length", stats=None, tracer=None):
+        """ A* over the CSR arrays with a straight-line lower bound.
+
+        stats / tracer work like astar.search_algorithm's (positions are osmids).
+        """
+        if self._lists is None:
+            self._lists = (self.offsets.tolist(), self.targets.tolist(),
+                           {w: a.tolist() for w, a in self.weights.items()})
+        offsets, targets, weights = self._lists[0], self._lists[1], self._lists[2][weight]
+        instrumented = stats is not None or tracer is not None
+        if stats is None and tracer is not None:
+            stats = SearchStats()
+        osmid = self.node_osmid
+
+        s, t = self.index[source], self.index[target]
+        heuristic = self._heuristic(t, weight)
+        dist = {s: 0.0}
+        parent = {s: -1}
+        heap = [(heuristic[s], s)]
+        closed = set()
+        if instrumented:
+            stats.pushes += 1
+            stats.peak_open = max(stats.peak_open, 1)
+            if tracer: tracer("push", source, 0.0)
+        while heap:
+            _, v = heapq.heappop(heap)
+            if instrumented:
+                stats.pops += 1
+                if tracer: tracer("pop", int(osmid[v]), dist[v])
+            if v in closed:
+                if instrumented: stats.stale_pops += 1
+                continue
+            if v == t:
+                if tracer: tracer("goal", target, dist[t])
+                route = []
+                while v != -1:
+                    route.append(v)
+                    v = parent[v]
+                return self.node_osmid[route[::-1]].tolist(), dist[t]
+            closed.add(v)
+            d = dist[v]
+            for i in range(offsets[v], offsets[v + 1]):
+                w = targets[i]
+                nd = d + weights[i]
+                if instrumented:
+                    stats.relaxations += 1
+                    if tracer: tracer("relax", int(osmid[w]), nd)
+                if nd < dist.get(w, math.inf):
+                    if instrumented:
+                        if w in dist: stats.duplicate_pushes += 1
+                        stats.pushes += 1
+                    dist[w] = nd
+                    parent[w] = v
+                    heapq.heappush(heap, (nd + heuristic[w], w))
+                    if instrumented:
+                        stats.peak_open = max(stats.peak_open, len(heap))
+                        if tracer: tracer("push", int(osmid[w]), nd)
+        return [], math.inf
+
+    def _heuristic(self, t, weight):
+        # Equirectangular meters, shaved by 1% so it never overestimates the
+        # haversine edge lengths osmnx computes
+        cos_lat = math.cos(math.radians(self.node_y[t]))
+        dx = (self.node_x - self.node_x[t]) * cos_lat
+        dy = self.node_y - self.node_y[t]
+        h = np.hypot(dx, dy) * METERS_PER_DEGREE * 0.99
+        if weight == "travel_time":
+            lengths, times = self.weights["length"], self.weights["travel_time"]
+            max_speed = float(np.max(lengths / np.maximum(times, 1e-6)))  # m/s
+            h = h / max_speed
+        return h.tolist()
+
+    # --- ROUTE STATISTICS ---
+    def route_stats(self, route):
+        """ Vectorised get_route_stats: (distance km, time min) for an osmid route """
+        if len(route) < 2:
+            return 0.0, 0.0
+        idx = np.array([self.index[n] for n in route], dtype=np.int64)
+        edges = self.edge_ids(idx[:-1], idx[1:])
+        dist_m = float(self.weights["length"][edges].sum(dtype=np.float64))
+        time_s = float(self.weights["travel_time"][edges].sum(dtype=np.float64))
+        return dist_m / 1000, time_s / 60
+
+    def indices(self, osmids):
+        """ Vectorised self.index lookup: node index of every osmid (all must exist) """
+        order = self._osmid_order
+        return order[np.searchsorted(self.node_osmid, np.asarray(osmids, dtype=np.int64), sorter=order)]
+
+    def route_coords(self, route):
+        """ (n, 2) array of (lat, lon) along an osmid route, for folium """
+        idx = self.indices(route)
+        return np.column_stack((self.node_y[idx], self.node_x[idx]))
+
+
+def networkx_bytes(G):
+    """ Rough in-memory size of a networkx graph (dicts, tuples and attribute values) """
+    total = sys.getsizeof(G._adj) + sys.getsizeof(G._node)
+    for n, attrs in G._node.items():
+        total += sys.getsizeof(n) + sys.getsizeof(attrs) + sum(sys.getsizeof(v) for v in attrs.values())
+    for adj in (G._succ, G._pred):
+        for nbrs in adj.values():
+            total += sys.getsizeof(nbrs)
+            for keydict in nbrs.values():
+                total += sys.getsizeof(keydict)
+    for _, _, attrs in G.edges(data=True):
+        total += sys.getsizeof(attrs) + sum(sys.getsizeof(v) for v in attrs.values())
+    return total
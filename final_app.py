@@ -1,9 +1,25 @@
 import streamlit as st
 import folium
 from streamlit_folium import st_folium
-import osmnx as ox
 import networkx as nx
+import numpy as np
+import pandas as pd
 import time
+import datetime
+import graph_store
+import contraction
+import tolls
+import spatial_index
+import csr_graph
+import route_cache
+import alternatives
+import time_profiles
+import isochrones
+import landmarks
+import jobs
+import route_geometry
+import uuid
+from astar import SearchStats
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(layout="wide", page_title="MetroFlow: Master Dashboard")
@@ -15,11 +31,15 @@ st.markdown("### Select a **Simulation Mode** in the sidebar to begin.")
 if "start_point" not in st.session_state: st.session_state["start_point"] = None
 if "end_point" not in st.session_state: st.session_state["end_point"] = None
 if "salik_gates" not in st.session_state: st.session_state["salik_gates"] = []
+if "gate_snaps" not in st.session_state: st.session_state["gate_snaps"] = {}
+if "depots" not in st.session_state: st.session_state["depots"] = []
+if "job_slot" not in st.session_state: st.session_state["job_slot"] = uuid.uuid4().hex
 
 # --- SIDEBAR: MASTER CONTROLS ---
 st.sidebar.header("🎛️ Simulation Mode")
 app_mode = st.sidebar.radio("Choose Analysis Type:", 
-    ["🧠 Algorithm Race (A* vs Dijkstra)", "💰 Logistics Trade-off (Salik Analysis)"])
+    ["🧠 Algorithm Race (A* vs Dijkstra)", "💰 Logistics Trade-off (Salik Analysis)",
+     "🗺️ Depot Coverage (Isochrones)"])
 
 st.sidebar.markdown("---")
 
@@ -34,17 +54,34 @@ if app_mode == "💰 Logistics Trade-off (Salik Analysis)":
     fuel_price = st.sidebar.number_input("Fuel Price (AED/L)", value=3.0)
     efficiency = st.sidebar.number_input("Car Efficiency (Km/L)", value=10.0)
     hourly_wage = st.sidebar.number_input("Your Time Value (AED/hr)", value=60.0)
+    k_routes = st.sidebar.slider("Alternative Routes (k)", 1, 8, alternatives.K_ROUTES)
+    depart_clock = st.sidebar.time_input("Departure Time", value=datetime.time(8, 0), step=900)
+    depart = depart_clock.hour * 3600 + depart_clock.minute * 60
 
-# 2. CONTROLS FOR RACE MODE
+# 2. CONTROLS FOR COVERAGE MODE
+elif app_mode == "🗺️ Depot Coverage (Isochrones)":
+    st.sidebar.header("🕹️ Interaction")
+    interaction_mode = st.sidebar.radio("Clicking Map will:", ["Add Depot", "Add Salik Gate (Toll)"])
+    st.sidebar.header("⏱️ Reach")
+    bands = st.sidebar.multiselect("Isochrones (minutes)", [5, 10, 15, 20, 30, 45, 60],
+                                   default=list(isochrones.THRESHOLDS))
+    avoid_salik = st.sidebar.checkbox("Avoid Salik gates", value=False)
+
+# 3. CONTROLS FOR RACE MODE
 else:
     st.sidebar.info("👉 This mode compares calculation speed. Salik gates are ignored here.")
     interaction_mode = "Set Start/End Points"
 
+st.sidebar.header("⚙️ Routing Backend")
+backend = st.sidebar.radio("Search graphs with:", ["networkx", "CSR arrays (scipy)"])
+use_csr = backend == "CSR arrays (scipy)"
+
 st.sidebar.markdown("---")
 if st.sidebar.button("❌ Reset All Points"):
     st.session_state["start_point"] = None
     st.session_state["end_point"] = None
     st.session_state["salik_gates"] = []
+    st.session_state["depots"] = []
     st.rerun()
 
 # --- HELPER FUNCTIONS ---
@@ -58,8 +95,314 @@ def get_route_stats(graph, route):
         time_s += edge.get('travel_time', 0)
     return dist_m / 1000, time_s / 60 
 
-def dist_heuristic(u, v):
-    return ((G.nodes[u]['x'] - G.nodes[v]['x'])**2 + (G.nodes[u]['y'] - G.nodes[v]['y'])**2)**0.5
+@st.cache_resource(show_spinner=False)
+def load_city_graph(mid_lat, mid_lon, graph_dist):
+    """ Road graph from the on-disk cache (downloads only on a cache miss) """
+    return graph_store.load_graph((mid_lat, mid_lon), graph_dist, network_type='drive')
+
+@st.cache_resource(show_spinner=False)
+def load_hierarchy(store_key, weight, _G):
+    """ Contraction Hierarchy for a cached graph (built once, then read from disk) """
+    return contraction.load_or_build(_G, weight)
+
+@st.cache_resource(show_spinner=False)
+def load_spatial_index(store_key, _G):
+    """ KD-tree over the cached graph's nodes and road segments """
+    return spatial_index.SpatialIndex(_G)
+
+@st.cache_resource(show_spinner=False)
+def load_csr_graph(store_key):
+    """ Flat CSR arrays of the cached graph (read straight from graph_cache/) """
+    return csr_graph.CSRGraph.from_arrays(graph_store.load_arrays(store_key))
+
+@st.cache_resource(show_spinner=False)
+def load_landmarks(store_key, weight):
+    """ ALT landmark tables of the cached graph (built once, then read from disk) """
+    return landmarks.load_or_build(store_key, load_csr_graph(store_key), weight)
+
+@st.cache_resource(show_spinner=False)
+def load_profiles(store_key):
+    """ Hourly travel-time profiles (imported observations, or the rush-hour defaults) """
+    return time_profiles.TravelTimeProfiles.load(load_csr_graph(store_key), store_key)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def departure_sweep(store_key, start_node, end_node):
+    """ Fastest trip for every departure over 24 hours, from one vectorised search """
+    departures, minutes, _ = load_profiles(store_key).sweep(start_node, end_node)
+    return departures, minutes
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def encoded_route(store_key, route, zoom):
+    """ Route simplified for one zoom level and encoded (see route_geometry.py) """
+    coords = load_csr_graph(store_key).route_coords(route)
+    return route_geometry.encode(route_geometry.simplify(coords, zoom))
+
+def route_line(store_key, route, zoom, **style):
+    return route_geometry.encoded_line(encoded_route(store_key, route, zoom), **style)
+
+def map_zoom(key, default=12):
+    """ Zoom a result map was last left at (st_folium keeps its output under key) """
+    return int((st.session_state.get(key) or {}).get("zoom") or default)
+
+def result_map(location, start, end):
+    """ Base of a result map: routes are added as st_folium feature groups, so
+    a rerun that only changes them (or nothing) keeps the map and its view """
+    m_res = folium.Map(location=location, zoom_start=12)
+    route_geometry.EncodedPolylineSupport().add_to(m_res)
+    folium.Marker(start, icon=folium.Icon(color="green")).add_to(m_res)
+    folium.Marker(end, icon=folium.Icon(color="red")).add_to(m_res)
+    return m_res
+
+@st.cache_resource(show_spinner=False)
+def networkx_size_mb(store_key, _G):
+    return csr_graph.networkx_bytes(_G) / 1e6
+
+def snap_gates(index, store_key, gates, snaps):
+    """ Road segment (u, v, key) under each gate; remembered across reruns in snaps """
+    missing = [gate for gate in gates if (store_key, gate) not in snaps]
+    if missing:
+        edges = index.nearest_edges([g[0] for g in missing], [g[1] for g in missing])
+        for gate, edge in zip(missing, edges):
+            snaps[(store_key, gate)] = edge
+    return [snaps[(store_key, gate)] for gate in gates]
+
+@st.cache_resource(show_spinner=False)
+def shared_route_cache():
+    """ One route cache for every session on this server (memory + graph_cache/ on disk) """
+    return route_cache.RouteCache(disk=True)
+
+def salik_routes(store_key, start_node, end_node, gate_edges, use_csr, G, job):
+    """ Both Logistics routes with their (km, min, salik hits).
+
+    Prices never enter here, so editing them only reruns the arithmetic. The
+    searches go through the shared route cache, keyed by graph version,
+    endpoints, weight, backend and gate set.
+    """
+    cache = shared_route_cache()
+    version = graph_store.graph_version(store_key)
+    algorithm = "dijkstra-csr" if use_csr else "dijkstra-networkx"
+    csr = load_csr_graph(store_key) if use_csr else None
+
+    # --- ROUTE A: PAY SALIK (Fastest / Shortest) ---
+    # This route ignores the yellow dots and goes straight through, so it
+    # does not depend on the gates and stays cached while they change
+    if use_csr:
+        search = lambda: csr.dijkstra(start_node, end_node, 'travel_time')[0]
+    else:
+        search = lambda: nx.shortest_path(G, start_node, end_node, weight='travel_time')
+    with job.stage("search A: pay Salik"):
+        path_salik = cache.route((version, 'travel_time', algorithm, ()), start_node, end_node, search)
+    dist_salik, time_salik = csr.route_stats(path_salik) if use_csr else get_route_stats(G, path_salik)
+
+    # Did we actually hit the user's custom gates?
+    salik_hits = tolls.count_gate_hits(path_salik, gate_edges)
+
+    # --- ROUTE B: AVOID SALIK (Cheapest / Longest) ---
+    # Make the yellow dots "impossible" to pass: a HUGE time penalty (1 hour)
+    # on each gate's road segment, read through a weight function
+    # so the cached graph itself is never copied or modified
+    penalties = tolls.gate_edge_penalties(G, gate_edges)
+    if use_csr:
+        search = lambda: csr.dijkstra(start_node, end_node, 'travel_time', csr.penalty_array(penalties))[0]
+    else:
+        avoid_weight = tolls.penalized_weight('travel_time', penalties)
+        search = lambda: nx.shortest_path(G, start_node, end_node, weight=avoid_weight)
+    avoid_context = (version, 'travel_time', algorithm, route_cache.gate_key(gate_edges))
+    with job.stage("search B: avoid Salik"):
+        path_avoid = cache.route(avoid_context, start_node, end_node, search)
+    dist_avoid, time_avoid = csr.route_stats(path_avoid) if use_csr else get_route_stats(G, path_avoid)
+
+    return {"pay": (path_salik, (dist_salik, time_salik, salik_hits)),
+            "avoid": (path_avoid, (dist_avoid, time_avoid, 0))}
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def alternative_candidates(store_key, start_node, end_node, gate_edges, k, depart, extra_routes, _G):
+    """ k distinct routes (see alternatives.py) plus extra_routes, each as
+    (route, km, min, salik hits) -- everything the full cost needs except prices.
+
+    Routes are found on the reference cost model, then timed for the departure.
+    price_alternatives ranks them, so editing a price never reruns a search.
+    """
+    csr = load_csr_graph(store_key)
+    gate_counts = csr.penalty_array(tolls.gate_edge_penalties(_G, gate_edges, penalty=1))
+    routes = alternatives.alternative_routes(csr, start_node, end_node, alternatives.edge_costs(csr, gate_counts), k)
+    routes += [route for route in extra_routes if route and route not in routes]
+    profiles = load_profiles(store_key)
+    return [(route, csr.route_stats(route)[0], profiles.route_time(route, depart), tolls.count_gate_hits(route, gate_edges))
+            for route in routes]
+
+def price_alternatives(store_key, candidates, k, prices):
+    """ The k cheapest candidates by fuel + Salik + time value, as table rows """
+    salik_price, fuel_price, efficiency, hourly_wage = prices
+    rows = [{"route": route, "Distance (km)": dist_km, "Time (min)": time_min, "Salik Hits": hits,
+             "Fuel (AED)": tolls.trip_cost(dist_km, 0, salik_price, fuel_price, efficiency),
+             "Salik (AED)": hits * salik_price,
+             "Time Value (AED)": time_min / 60 * hourly_wage,
+             "Total (AED)": tolls.full_cost(dist_km, time_min, hits, *prices)}
+            for route, dist_km, time_min, hits in candidates]
+    rows.sort(key=lambda row: row["Total (AED)"])
+    rows = rows[:k]
+    csr = load_csr_graph(store_key)
+    for row in rows:
+        row["Overlap with #1"] = alternatives.overlap(csr, row["route"], rows[0]["route"])
+    return rows
+
+def dist_heuristic(graph, u, v):
+    return ((graph.nodes[u]['x'] - graph.nodes[v]['x'])**2 + (graph.nodes[u]['y'] - graph.nodes[v]['y'])**2)**0.5
+
+# --- BACKGROUND JOBS (see jobs.py) ---
+# Loading, snapping and searching run on a worker thread. The page only
+# draws finished results, so a click during a long search replaces the job
+# instead of queueing a second full rerun behind it.
+RACE_STAGES = ("load", "snap", "Dijkstra", "A*", "Contraction Hierarchy", "ALT")
+LOGISTICS_STAGES = ("load", "snap", "search A: pay Salik", "search B: avoid Salik", "departure sweep", "alternatives")
+COVERAGE_STAGES = ("load", "snap", "isochrones", "coverage")
+JOB_INLINE_WAIT = 0.3   # Seconds a rerun waits for its job before showing progress instead
+JOB_POLL_SECONDS = 0.5  # Progress refresh interval while a job runs
+
+@st.cache_resource(show_spinner=False)
+def job_runner():
+    """ One worker pool for every session on this server """
+    return jobs.JobRunner()
+
+def stage_timings(job):
+    return " · ".join(f"{name} {ms:.0f} ms" for name, ms in job.timings.items())
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job):
+    """ Progress bar redrawn on its own; reruns the page once the job is done """
+    if job.done():
+        st.rerun()
+    st.progress(job.progress(), text=f"⏳ {job.current or 'Queued'}...")
+    if job.timings:
+        st.caption(stage_timings(job))
+
+def job_finished(job, failure):
+    """ True once job has a result to draw; shows its progress or error otherwise """
+    if not job.wait(JOB_INLINE_WAIT):
+        job_progress(job)
+        return False
+    if job.error is not None:
+        st.error(f"{failure}: {job.error}")
+        return False
+    return job.result is not None
+
+def load_area(job, area, start, end):
+    """ Cached graph around area plus the nodes nearest to start and end """
+    with job.stage("load"):
+        G = load_city_graph(*area)
+        index = load_spatial_index(G.graph['store_key'], G)
+    with job.stage("snap"):
+        start_node, end_node = index.nearest_nodes([start[0], end[0]], [start[1], end[1]])
+    return G, index, start_node, end_node
+
+def race_job(job, start, end, use_csr, area):
+    G, _, start_node, end_node = load_area(job, area, start, end)
+    store_key = G.graph['store_key']
+    csr = load_csr_graph(store_key)
+    heuristic = lambda u, v: dist_heuristic(G, u, v)
+    r = {"G": G}
+
+    # 1. Run Dijkstra
+    with job.stage("Dijkstra"):
+        t0 = time.perf_counter()
+        r["path_d"] = nx.shortest_path(G, start_node, end_node, weight='length')
+        r["time_d"] = (time.perf_counter() - t0) * 1000
+        # Same search on the CSR arrays instead of networkx dicts
+        if use_csr:
+            r["time_nx_d"] = r["time_d"]
+            t0 = time.perf_counter()
+            r["path_d"], _ = csr.dijkstra(start_node, end_node, 'length')
+            r["time_d"] = (time.perf_counter() - t0) * 1000
+
+    # 2. Run A* Search
+    with job.stage("A*"):
+        t0 = time.perf_counter()
+        r["path_a"] = nx.astar_path(G, start_node, end_node, heuristic=heuristic, weight='length')
+        r["time_a"] = (time.perf_counter() - t0) * 1000
+        if use_csr:
+            r["time_nx_a"] = r["time_a"]
+            t0 = time.perf_counter()
+            r["path_a"], _ = csr.astar(start_node, end_node, 'length')
+            r["time_a"] = (time.perf_counter() - t0) * 1000
+            networkx_size_mb(store_key, G)
+        # Search counters from a separate, untimed A* run so the race times stay clean
+        r["stats"] = SearchStats()
+        csr.astar(start_node, end_node, 'length', stats=r["stats"])
+
+    # 3. Contraction Hierarchy (one-time preprocessing, saved next to the cached map)
+    with job.stage("Contraction Hierarchy"):
+        ch = load_hierarchy(store_key, 'length', G)
+        t0 = time.perf_counter()
+        r["path_ch"], _ = ch.query(start_node, end_node)
+        r["time_ch"] = (time.perf_counter() - t0) * 1000
+
+    # 4. Bidirectional A* with landmark (ALT) bounds, tables saved next to the cached map
+    with job.stage("ALT"):
+        table = load_landmarks(store_key, 'length')
+        t0 = time.perf_counter()
+        r["path_alt"], _, r["alt_expanded"] = landmarks.road_route(csr, table, start_node, end_node)
+        r["time_alt"] = (time.perf_counter() - t0) * 1000
+        r["landmarks"] = len(table.nodes)
+    return r
+
+def logistics_job(job, start, end, gates, snaps, use_csr, area, k, depart):
+    """ Everything of the Logistics mode that does not depend on prices """
+    G, index, start_node, end_node = load_area(job, area, start, end)  # speeds & travel times already added
+    store_key = G.graph['store_key']
+    r = {"G": G}
+
+    # Each gate is snapped to the road segment it was placed on. snaps is a
+    # snapshot taken by the page; the worker fills a copy that the page
+    # stores back into the session
+    with job.stage("snap"):
+        r["snaps"] = dict(snaps)
+        gate_edges = snap_gates(index, store_key, gates, r["snaps"])
+        profiles = load_profiles(store_key)
+    routes = salik_routes(store_key, start_node, end_node, gate_edges, use_csr, G, job)
+    r["pay"], r["avoid"] = routes["pay"], routes["avoid"]
+
+    # Time both routes for the chosen departure (rush hour on the highways)
+    r["time_salik"] = profiles.route_time(r["pay"][0], depart)
+    r["time_avoid"] = profiles.route_time(r["avoid"][0], depart)
+
+    with job.stage("departure sweep"):
+        r["departures"], r["minutes"] = departure_sweep(store_key, start_node, end_node)
+        _, r["td_time"] = profiles.route(start_node, end_node, depart)
+    with job.stage("alternatives"):
+        r["candidates"] = alternative_candidates(store_key, start_node, end_node, route_cache.gate_key(gate_edges),
+                                                 k, depart, (r["pay"][0], r["avoid"][0]), G)
+    return r
+
+def coverage_job(job, depots, gates, snaps, bands, avoid_salik):
+    """ Isochrone bands per depot plus the nearest-depot split of the map """
+    lats, lons = [d[0] for d in depots], [d[1] for d in depots]
+    mid_lat, mid_lon = sum(lats) / len(lats), sum(lons) / len(lons)
+    spread = max(max(lats) - min(lats), max(lons) - min(lons))
+    with job.stage("load"):
+        G = load_city_graph(mid_lat, mid_lon, max(3000, spread * 111000 / 1.5))
+        store_key = G.graph['store_key']
+        csr = load_csr_graph(store_key)
+        index = load_spatial_index(store_key, G)
+    r = {"center": (mid_lat, mid_lon), "nodes": csr.n, "snaps": dict(snaps)}
+
+    # With "Avoid Salik" every gate segment costs an extra hour, so nothing
+    # behind a gate lands inside the bands
+    with job.stage("snap"):
+        r["depot_nodes"] = depot_nodes = index.nearest_nodes(lats, lons)
+        extra = None
+        if avoid_salik and gates:
+            gate_edges = snap_gates(index, store_key, gates, r["snaps"])
+            extra = csr.penalty_array(tolls.gate_edge_penalties(G, gate_edges))
+
+    # One bounded search per depot gives all of its bands at once
+    with job.stage("isochrones"):
+        r["isochrones"] = [sorted(isochrones.road_isochrones(csr, node, bands, extra).items(), reverse=True)
+                           for node in depot_nodes]
+    # All depots in one multi-source pass: who gets there first
+    with job.stage("coverage"):
+        r["owner"], r["minutes"], r["areas"] = isochrones.road_coverage(csr, depot_nodes, max(bands), extra)
+    return r
 
 # --- MAP PREPARATION ---
 m = folium.Map(location=[25.15, 55.25], zoom_start=11, tiles="cartodbpositron")
@@ -76,6 +419,9 @@ for gate in st.session_state["salik_gates"]:
         location=gate, radius=8, color="orange", fill=True, fill_color="yellow", popup="Custom Salik Gate"
     ).add_to(m)
 
+for depot in st.session_state["depots"]:
+    folium.Marker(depot, icon=folium.Icon(color="blue", icon="home"), popup="Depot").add_to(m)
+
 # --- CAPTURE CLICKS ---
 output = st_folium(m, width=1400, height=500)
 
@@ -90,63 +436,86 @@ if output["last_clicked"]:
             st.session_state["end_point"] = coords
             st.rerun()
             
+    elif interaction_mode == "Add Depot":
+        st.session_state["depots"].append(coords)
+        st.rerun()
+
     elif interaction_mode == "Add Salik Gate (Toll)":
         st.session_state["salik_gates"].append(coords)
-        st.success("💰 Salik Gate Added! The Green Route will now try to avoid this.")
-        time.sleep(0.5) 
+        st.toast("💰 Salik Gate Added! The Green Route will now try to avoid this.")
         st.rerun()
 
 # --- MAIN ENGINE ---
 if st.session_state["start_point"] and st.session_state["end_point"]:
     st.markdown("---")
-    
+
     start = st.session_state["start_point"]
     end = st.session_state["end_point"]
     gates = st.session_state["salik_gates"]
-    
+
     mid_lat = (start[0] + end[0]) / 2
     mid_lon = (start[1] + end[1]) / 2
     dist_deg = ((start[0]-end[0])**2 + (start[1]-end[1])**2)**0.5
     graph_dist = max(3000, dist_deg * 111000 / 1.5)
-    
+    area = (mid_lat, mid_lon, graph_dist)
+
     # ---------------------------------------------------------
     # MODE 1: ALGORITHM RACE (A* vs Dijkstra)
     # ---------------------------------------------------------
     if app_mode == "🧠 Algorithm Race (A* vs Dijkstra)":
         st.header("🏁 Speed Test: Which Algorithm is Faster?")
-        
-        with st.spinner("Downloading Map & Racing..."):
+
+        job = job_runner().submit(st.session_state["job_slot"], ("race", start, end, use_csr, area),
+                                  RACE_STAGES, race_job, start, end, use_csr, area)
+        if job_finished(job, "Error"):
             try:
-                global G
-                G = ox.graph_from_point((mid_lat, mid_lon), dist=graph_dist, network_type='drive')
-                start_node = ox.distance.nearest_nodes(G, start[1], start[0])
-                end_node = ox.distance.nearest_nodes(G, end[1], end[0])
-                
-                # 1. Run Dijkstra
-                t0 = time.perf_counter()
-                path_d = nx.shortest_path(G, start_node, end_node, weight='length')
-                time_d = (time.perf_counter() - t0) * 1000
-                
-                # 2. Run A* Search
-                t0 = time.perf_counter()
-                path_a = nx.astar_path(G, start_node, end_node, heuristic=dist_heuristic, weight='length')
-                time_a = (time.perf_counter() - t0) * 1000
-                
+                t_render = time.perf_counter()
+                r = job.result
+                G, store_key = r["G"], r["G"].graph['store_key']
+                path_d, path_a, path_ch, path_alt = r["path_d"], r["path_a"], r["path_ch"], r["path_alt"]
+                time_d, time_a, time_ch, time_alt = r["time_d"], r["time_a"], r["time_ch"], r["time_alt"]
+
+                # Same two searches on the CSR arrays instead of networkx dicts
+                if use_csr:
+                    time_nx_d, time_nx_a = r["time_nx_d"], r["time_nx_a"]
+                    st.info(f"⚙️ CSR backend: Dijkstra {time_nx_d / time_d:.1f}x and A* {time_nx_a / time_a:.1f}x faster than networkx "
+                            f"({time_nx_d:.2f} / {time_nx_a:.2f} ms) | Graph memory: {load_csr_graph(store_key).nbytes / 1e6:.2f} MB "
+                            f"vs ~{networkx_size_mb(store_key, G):.1f} MB")
+
                 # Metrics
-                col1, col2, col3 = st.columns(3)
-                col1.metric("🏆 Winner", "A* Search" if time_a < time_d else "Tie")
+                times = {"A* Search": time_a, "Dijkstra": time_d, "Contraction Hierarchy": time_ch, "ALT": time_alt}
+                col1, col2, col3, col4, col5 = st.columns(5)
+                col1.metric("🏆 Winner", min(times, key=times.get))
                 col2.metric("A* CPU Time", f"{time_a:.2f} ms")
                 col3.metric("Dijkstra CPU Time", f"{time_d:.2f} ms")
-                
+                col4.metric("CH CPU Time", f"{time_ch:.3f} ms")
+                col5.metric("ALT CPU Time", f"{time_alt:.2f} ms")
+
+                stats, alt_expanded = r["stats"], r["alt_expanded"]
+                astar_expanded = stats.pops - stats.stale_pops
+                saved = astar_expanded - alt_expanded
+                st.info(f"🧭 ALT expanded {alt_expanded} nodes vs {astar_expanded} for A* "
+                        f"({saved} fewer, {saved / max(astar_expanded, 1):.0%}) using {r['landmarks']} landmarks")
+                with st.expander("🔬 A* Search Counters"):
+                    c1, c2, c3, c4 = st.columns(4)
+                    c1.metric("Heap Pushes", stats.pushes, f"{stats.duplicate_pushes} duplicate", delta_color="off")
+                    c2.metric("Heap Pops", stats.pops, f"{stats.stale_pops} stale", delta_color="off")
+                    c3.metric("Peak Open List", stats.peak_open)
+                    c4.metric("Edges Relaxed", stats.relaxations)
+
                 # Visuals
-                m_res = folium.Map(location=[mid_lat, mid_lon], zoom_start=12)
-                folium.PolyLine([(G.nodes[n]['y'], G.nodes[n]['x']) for n in path_d], color="red", weight=8, opacity=0.5, tooltip="Dijkstra").add_to(m_res)
-                folium.PolyLine([(G.nodes[n]['y'], G.nodes[n]['x']) for n in path_a], color="blue", weight=3, opacity=1, tooltip="A* Search").add_to(m_res)
-                
-                folium.Marker(start, icon=folium.Icon(color="green")).add_to(m_res)
-                folium.Marker(end, icon=folium.Icon(color="red")).add_to(m_res)
-                st_folium(m_res, width=1400, height=500)
-                
+                m_res = result_map([mid_lat, mid_lon], start, end)
+                zoom = map_zoom("race_map")
+                routes = folium.FeatureGroup(name="Routes")
+                route_line(store_key, path_d, zoom, color="red", weight=8, opacity=0.5, tooltip="Dijkstra").add_to(routes)
+                route_line(store_key, path_a, zoom, color="blue", weight=3, opacity=1, tooltip="A* Search").add_to(routes)
+                route_line(store_key, path_ch, zoom, color="purple", weight=2, opacity=1, dash_array="6", tooltip="Contraction Hierarchy").add_to(routes)
+                route_line(store_key, path_alt, zoom, color="green", weight=2, opacity=1, dash_array="2 8", tooltip="ALT (landmarks)").add_to(routes)
+                st_folium(m_res, key="race_map", width=1400, height=500, returned_objects=["zoom"],
+                          feature_group_to_add=routes)
+                job.record("render", (time.perf_counter() - t_render) * 1000)
+                st.caption("⏱️ " + stage_timings(job))
+
             except Exception as e: st.error(f"Error: {e}")
 
     # ---------------------------------------------------------
@@ -154,59 +523,38 @@ if st.session_state["start_point"] and st.session_state["end_point"]:
     # ---------------------------------------------------------
     elif app_mode == "💰 Logistics Trade-off (Salik Analysis)":
         st.header("📊 Scenario Analysis: Pay Salik vs Avoid Salik")
-        
-        with st.spinner("Calculating Scenarios..."):
+
+        # Prices stay out of the job: editing one only reruns the arithmetic below
+        job = job_runner().submit(st.session_state["job_slot"],
+                                  ("logistics", start, end, tuple(gates), use_csr, area, k_routes, depart),
+                                  LOGISTICS_STAGES, logistics_job, start, end, list(gates),
+                                  tuple(st.session_state["gate_snaps"].items()), use_csr, area, k_routes, depart)
+        if job_finished(job, "Analysis Failed"):
             try:
-                G = ox.graph_from_point((mid_lat, mid_lon), dist=graph_dist, network_type='drive')
-                G = ox.add_edge_speeds(G)
-                G = ox.add_edge_travel_times(G)
-                
-                start_node = ox.distance.nearest_nodes(G, start[1], start[0])
-                end_node = ox.distance.nearest_nodes(G, end[1], end[0])
-
-                # --- ROUTE A: PAY SALIK (Fastest / Shortest) ---
-                # This route ignores the yellow dots and goes straight through
-                path_salik = nx.shortest_path(G, start_node, end_node, weight='travel_time')
-                dist_salik, time_salik = get_route_stats(G, path_salik)
-                
-                # Did we actually hit the user's custom gates?
-                salik_hits = 0
-                if gates:
-                    path_nodes = set(path_salik)
-                    for gate in gates:
-                        g_node = ox.distance.nearest_nodes(G, gate[1], gate[0])
-                        # Check if path contains this node
-                        if g_node in path_nodes: salik_hits += 1
-
-                # --- ROUTE B: AVOID SALIK (Cheapest / Longest) ---
-                # We modify the graph to make the yellow dots "impossible" to pass
-                G_avoid = G.copy()
-                if gates:
-                    for gate in gates:
-                        g_node = ox.distance.nearest_nodes(G_avoid, gate[1], gate[0])
-                        # Add HUGE time penalty (1 hour) to edges connected to this node
-                        for u, v, k, data in G_avoid.edges(keys=True, data=True):
-                            if u == g_node or v == g_node:
-                                data['travel_time'] += 3600 
-
-                path_avoid = nx.shortest_path(G_avoid, start_node, end_node, weight='travel_time')
-                dist_avoid, time_avoid_raw = get_route_stats(G, path_avoid) 
+                t_render = time.perf_counter()
+                r = job.result
+                st.session_state["gate_snaps"].update(r["snaps"])
+                store_key = r["G"].graph['store_key']
+                path_salik, (dist_salik, _, salik_hits) = r["pay"]
+                path_avoid, (dist_avoid, _, _) = r["avoid"]
+                time_salik, time_avoid_raw = r["time_salik"], r["time_avoid"]
 
                 # --- FINANCIALS (THE RULE OF THUMB) ---
                 # Route A: Less Time, Less Fuel (usually), More Salik Cost
-                cost_fuel_salik = dist_salik * (fuel_price / efficiency)
-                total_cost_salik = cost_fuel_salik + (salik_hits * salik_price)
-
                 # Route B: More Time, More Fuel (longer distance), 0 Salik Cost
-                cost_fuel_avoid = dist_avoid * (fuel_price / efficiency)
-                total_cost_avoid = cost_fuel_avoid
-                
+                cost_fuel_salik = tolls.trip_cost(dist_salik, 0, salik_price, fuel_price, efficiency)
+                cost_fuel_avoid = tolls.trip_cost(dist_avoid, 0, salik_price, fuel_price, efficiency)
+                tradeoff = tolls.salik_tradeoff((dist_salik, time_salik, salik_hits), (dist_avoid, time_avoid_raw, 0),
+                                                salik_price, fuel_price, efficiency, hourly_wage)
+                total_cost_salik = tradeoff["pay_cost"]
+                total_cost_avoid = tradeoff["avoid_cost"]
+
                 # Differences
-                money_saved = total_cost_salik - total_cost_avoid
-                time_lost = time_avoid_raw - time_salik
-                value_lost = (time_lost/60) * hourly_wage
-                
-                rec = "✅ **Recommendation: AVOID SALIK**" if money_saved > value_lost else "🚀 **Recommendation: PAY SALIK**"
+                money_saved = tradeoff["money_saved"]
+                time_lost = tradeoff["time_lost"]
+                value_lost = tradeoff["value_lost"]
+
+                rec = "✅ **Recommendation: AVOID SALIK**" if tradeoff["avoid"] else "🚀 **Recommendation: PAY SALIK**"
                 st.success(rec)
 
                 col1, col2 = st.columns(2)
@@ -221,22 +569,161 @@ if st.session_state["start_point"] and st.session_state["end_point"]:
                     st.metric("Total Cost", f"{total_cost_avoid:.2f} AED", f"-{money_saved:.2f} AED saved")
                     st.caption(f"Salik Hits: 0 | Fuel Cost: {cost_fuel_avoid:.2f} AED")
 
+                # --- SENSITIVITY: one NumPy sweep over the Salik price, no rerouting ---
+                with st.expander("📈 Break-even: Time Value vs Salik Price"):
+                    prices = np.linspace(0, max(2 * salik_price, 10.0), 201)
+                    wages = tolls.break_even_wage((dist_salik, time_salik, salik_hits), (dist_avoid, time_avoid_raw, 0),
+                                                  prices, fuel_price, efficiency)
+                    if np.isnan(wages).all():
+                        st.info("The avoid route is no slower, so avoiding Salik wins at any time value.")
+                    else:
+                        st.line_chart(pd.DataFrame({"Break-even time value (AED/hr)": np.maximum(wages, 0)},
+                                                   index=pd.Index(prices, name="Salik price (AED)")))
+                        here = float(tolls.break_even_wage((dist_salik, time_salik, salik_hits),
+                                                           (dist_avoid, time_avoid_raw, 0),
+                                                           salik_price, fuel_price, efficiency))
+                        st.caption(f"Below the line avoiding Salik pays off, above it paying does. "
+                                   f"At {salik_price:.2f} AED per gate the break-even is {max(here, 0):.0f} AED/hr "
+                                   f"(yours: {hourly_wage:.0f} AED/hr).")
+
+                # --- DEPARTURE PLANNER: 24-hour sweep in one search ---
+                with st.expander("🕒 Best Departure Window"):
+                    departures, minutes = r["departures"], r["minutes"]
+                    if not np.isfinite(minutes).any():
+                        st.info("No route between these points.")
+                    else:
+                        clock = lambda sec: f"{int(sec // 3600) % 24:02d}:{int(sec % 3600 // 60):02d}"
+                        st.line_chart(pd.DataFrame({"Fastest trip (min)": minutes},
+                                                   index=pd.Index([clock(d) for d in departures], name="Departure")))
+                        first, last = time_profiles.best_window(departures, minutes)
+                        st.caption(f"Best window: {clock(first)}–{clock(last + time_profiles.SWEEP_STEP)} "
+                                   f"({np.min(minutes):.0f} min). Leaving at {clock(depart)}: fastest route "
+                                   f"{r['td_time']:.0f} min, Route A {time_salik:.0f} min.")
+
+                # --- TOP-K ALTERNATIVES, ranked by the full cost model ---
+                st.subheader(f"🧭 Top {k_routes} Alternatives (fuel + Salik + time value)")
+                alts = price_alternatives(store_key, r["candidates"], k_routes,
+                                          (salik_price, fuel_price, efficiency, hourly_wage))
+                table = pd.DataFrame([{k: v for k, v in row.items() if k != "route"} for row in alts],
+                                     index=pd.Index(range(1, len(alts) + 1), name="Rank"))
+                st.dataframe(table.style.format({"Distance (km)": "{:.2f}", "Time (min)": "{:.1f}",
+                                                 "Fuel (AED)": "{:.2f}", "Salik (AED)": "{:.2f}",
+                                                 "Time Value (AED)": "{:.2f}", "Total (AED)": "{:.2f}",
+                                                 "Overlap with #1": "{:.0%}"}))
+
                 # Map Visuals
-                m_res = folium.Map(location=[mid_lat, mid_lon], zoom_start=12)
-                
+                m_res = result_map([mid_lat, mid_lon], start, end)
+                for gate in gates:
+                     folium.CircleMarker(location=gate, radius=8, color="orange", fill=True, fill_color="yellow").add_to(m_res)
+                zoom = map_zoom("logistics_map")
+
+                # Alternatives in their own toggleable layers, under the two main routes.
+                # Labels leave out prices, so editing a price resends no geometry
+                # unless the ranking itself changes
+                palette = ["blue", "purple", "darkorange", "cadetblue", "darkred", "gray", "pink", "black"]
+                layers = []
+                for rank, row in enumerate(alts, 1):
+                    layer = folium.FeatureGroup(name=f"#{rank}: {row['Distance (km)']:.1f} km")
+                    route_line(store_key, row["route"], zoom, color=palette[(rank - 1) % len(palette)], weight=3,
+                               opacity=0.8, dash_array="8", tooltip=f"Alternative #{rank}").add_to(layer)
+                    layers.append(layer)
+
+                main_routes = folium.FeatureGroup(name="Pay / Avoid Salik")
                 # Draw Red (Pay Salik)
-                folium.PolyLine([(G.nodes[n]['y'], G.nodes[n]['x']) for n in path_salik], color="red", weight=6, opacity=0.5, tooltip="Pay Salik").add_to(m_res)
-                
+                route_line(store_key, path_salik, zoom, color="red", weight=6, opacity=0.5, tooltip="Pay Salik").add_to(main_routes)
+
                 # Draw Green (Avoid Salik)
                 if path_avoid != path_salik:
-                    folium.PolyLine([(G.nodes[n]['y'], G.nodes[n]['x']) for n in path_avoid], color="green", weight=4, opacity=0.9, tooltip="Avoid Salik").add_to(m_res)
+                    route_line(store_key, path_avoid, zoom, color="green", weight=4, opacity=0.9, tooltip="Avoid Salik").add_to(main_routes)
+                layers.append(main_routes)
+
+                st_folium(m_res, key="logistics_map", width=1400, height=500, returned_objects=["zoom"],
+                          feature_group_to_add=layers, layer_control=folium.LayerControl(collapsed=False))
+                job.record("render", (time.perf_counter() - t_render) * 1000)
+                st.caption("⏱️ " + stage_timings(job))
+
+            except Exception as e: st.error(f"Analysis Failed: {e}")
+
+elif app_mode != "🗺️ Depot Coverage (Isochrones)":
+    # Nothing to route (e.g. after a reset): stop whatever this session still computes
+    job_runner().cancel(st.session_state["job_slot"])
 
-                folium.Marker(start, icon=folium.Icon(color="green")).add_to(m_res)
-                folium.Marker(end, icon=folium.Icon(color="red")).add_to(m_res)
-                
+# ---------------------------------------------------------
+# MODE 3: DEPOT COVERAGE (Isochrones)
+# ---------------------------------------------------------
+if app_mode == "🗺️ Depot Coverage (Isochrones)":
+    st.markdown("---")
+    st.header("🗺️ Depot Coverage: Who Reaches What, and How Fast?")
+    depots = st.session_state["depots"]
+    if not depots or not bands:
+        job_runner().cancel(st.session_state["job_slot"])
+        st.info("👉 Click the map to place one or more depots." if not depots
+                else "👉 Pick at least one isochrone in the sidebar.")
+    else:
+        gates = st.session_state["salik_gates"]
+        job = job_runner().submit(st.session_state["job_slot"],
+                                  ("coverage", tuple(depots), tuple(gates) if avoid_salik else (), tuple(sorted(bands)), avoid_salik),
+                                  COVERAGE_STAGES, coverage_job, list(depots), list(gates),
+                                  tuple(st.session_state["gate_snaps"].items()), sorted(bands), avoid_salik)
+        if job_finished(job, "Coverage Failed"):
+            try:
+                t_render = time.perf_counter()
+                r = job.result
+                st.session_state["gate_snaps"].update(r["snaps"])
+                depot_nodes, owner, minutes, areas = r["depot_nodes"], r["owner"], r["minutes"], r["areas"]
+
+                m_iso = folium.Map(location=list(r["center"]), zoom_start=12, tiles="cartodbpositron")
+                palette = ["blue", "purple", "darkorange", "cadetblue", "darkred", "green", "gray", "pink"]
+                shades = {t: 0.15 + 0.35 * i / max(1, len(bands) - 1) for i, t in enumerate(sorted(bands, reverse=True))}
+
+                for i, bands_of_depot in enumerate(r["isochrones"]):
+                    layer = folium.FeatureGroup(name=f"Depot {i + 1} isochrones")
+                    color = palette[i % len(palette)]
+                    for band, area in bands_of_depot:
+                        if not area.is_empty:
+                            folium.GeoJson(area.__geo_interface__, tooltip=f"Depot {i + 1}: {band} min",
+                                           style_function=lambda _, c=color, o=shades[band]: {
+                                               "color": c, "weight": 1, "fillColor": c, "fillOpacity": o}).add_to(layer)
+                    layer.add_to(m_iso)
+
+                coverage = folium.FeatureGroup(name="Nearest-depot coverage", show=len(depots) > 1)
+                for i, node in enumerate(depot_nodes):
+                    if not areas[node].is_empty:
+                        color = palette[i % len(palette)]
+                        folium.GeoJson(areas[node].__geo_interface__, tooltip=f"Served first by depot {i + 1}",
+                                       style_function=lambda _, c=color: {
+                                           "color": c, "weight": 2, "fillColor": c, "fillOpacity": 0.35}).add_to(coverage)
+                coverage.add_to(m_iso)
+
+                for i, depot in enumerate(depots):
+                    folium.Marker(depot, icon=folium.Icon(color="blue", icon="home"), popup=f"Depot {i + 1}").add_to(m_iso)
                 for gate in gates:
-                     folium.CircleMarker(location=gate, radius=8, color="orange", fill=True, fill_color="yellow").add_to(m_res)
+                    folium.CircleMarker(location=gate, radius=8, color="orange", fill=True, fill_color="yellow").add_to(m_iso)
+                folium.LayerControl(collapsed=False).add_to(m_iso)
+
+                # Intersections each depot serves first, per band
+                rows = []
+                for i in range(len(depots)):
+                    mine = minutes[owner == i]
+                    rows.append({f"≤ {t} min": int((mine <= t).sum()) for t in sorted(bands)})
+                st.dataframe(pd.DataFrame(rows, index=pd.Index(range(1, len(depots) + 1), name="Depot")))
+                st.caption(f"Intersections served first by each depot ({r['nodes']} in the map). "
+                           f"{int((owner < 0).sum())} are out of reach within {max(bands)} min.")
+                st_folium(m_iso, width=1400, height=550)
+                job.record("render", (time.perf_counter() - t_render) * 1000)
+                st.caption("⏱️ " + stage_timings(job))
 
-                st_folium(m_res, width=1400, height=500)
-                
-            except Exception as e: st.error(f"Analysis Failed: {e}")
\ No newline at end of file
+            except Exception as e: st.error(f"Coverage Failed: {e}")
+
+# --- ROUTE CACHE COUNTERS (drawn last, so they include this run) ---
+st.sidebar.markdown("---")
+st.sidebar.header("🗄️ Route Cache")
+if st.sidebar.button("🧹 Clear Route Cache"):
+    shared_route_cache().invalidate()
+counts = shared_route_cache().counters()
+c1, c2, c3 = st.sidebar.columns(3)
+c1.metric("Hits", counts["hits"] + counts["subpath_hits"] + counts["disk_hits"])
+c2.metric("Misses", counts["misses"])
+c3.metric("Evictions", counts["evictions"])
+st.sidebar.caption(f"{counts['entries']} routes in memory | {counts['subpath_hits']} answered from a longer route "
+                   f"| {counts['disk_hits']} from disk")
@@ -0,0 +1,196 @@
+import json
+import math
+import os
+
+import networkx as nx
+import numpy as np
+import osmnx as ox
+from shapely.geometry import box
+
+# --- PERSISTENT ROAD GRAPH CACHE ---
+# Downloaded OSM graphs are saved as plain .npy arrays (loaded memory-mapped)
+# under CACHE_DIR, one folder per region. A region is a bounding box snapped
+# outwards to a BBOX_STEP degree grid, so nearby requests share one download.
+# Any cached region that fully covers a new request is reused.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "graph_cache")
+BBOX_STEP = 0.01  # degrees (~1.1 km in Dubai)
+METERS_PER_DEGREE = 111_000
+
+# Column order of edges_float.npy
+EDGE_FLOAT_COLUMNS = ("length", "speed_kph", "travel_time")
+# Arrays of the graph itself; other .npy files in a region folder (ch_*,
+# alt_*, td_*) belong to the tables built on top of it
+GRAPH_ARRAYS = ("node_osmid", "node_xy", "edge_uv", "edge_key", "edge_float")
+
+
+# --- REGION KEYS ---
+def bbox_from_point(point, dist):
+    """ (south, west, north, east) box around (lat, lon) with a half-width in meters """
+    lat, lon = point
+    dlat = dist / METERS_PER_DEGREE
+    dlon = dist / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+    return (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+
+def normalize_bbox(bbox, step=BBOX_STEP):
+    south, west, north, east = bbox
+    snap_down = lambda v: round(math.floor(v / step) * step, 6)
+    snap_up = lambda v: round(math.ceil(v / step) * step, 6)
+    return (snap_down(south), snap_down(west), snap_up(north), snap_up(east))
+
+
+def region_key(bbox, network_type):
+    return network_type + "_" + "_".join(f"{v:.4f}" for v in bbox)
+
+
+def bbox_covers(outer, inner):
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[2] >= inner[2] and outer[3] >= inner[3])
+
+
+# --- ARRAY CONVERSION ---
+def graph_to_arrays(G):
+    """ Flatten an osmnx MultiDiGraph (with speeds/travel times) into numpy arrays """
+    osmids = np.fromiter(G.nodes, dtype=np.int64, count=len(G))
+    index = {n: i for i, n in enumerate(G.nodes)}
+    node_xy = np.array([(d["x"], d["y"]) for _, d in G.nodes(data=True)], dtype=np.float64)
+
+    edge_uv = np.empty((G.number_of_edges(), 2), dtype=np.int32)
+    edge_key = np.empty(G.number_of_edges(), dtype=np.int32)
+    edge_float = np.empty((G.number_of_edges(), len(EDGE_FLOAT_COLUMNS)), dtype=np.float32)
+    for i, (u, v, k, d) in enumerate(G.edges(keys=True, data=True)):
+        edge_uv[i] = (index[u], index[v])
+        edge_key[i] = k
+        edge_float[i] = [d.get(col, 0.0) for col in EDGE_FLOAT_COLUMNS]
+
+    return {"node_osmid": osmids, "node_xy": node_xy,
+            "edge_uv": edge_uv, "edge_key": edge_key, "edge_float": edge_float}
+
+
+def graph_from_arrays(arrays, crs="epsg:4326"):
+    """ Rebuild a networkx MultiDiGraph that osmnx / networkx calls accept """
+    osmids = arrays["node_osmid"].tolist()
+    node_xy = arrays["node_xy"].tolist()
+    G = nx.MultiDiGraph(crs=crs)
+    G.add_nodes_from((n, {"x": x, "y": y}) for n, (x, y) in zip(osmids, node_xy))
+
+    edge_uv = arrays["edge_uv"].tolist()
+    edge_key = arrays["edge_key"].tolist()
+    edge_float = arrays["edge_float"].tolist()
+    G.add_edges_from(
+        (osmids[u], osmids[v], k, dict(zip(EDGE_FLOAT_COLUMNS, values)))
+        for (u, v), k, values in zip(edge_uv, edge_key, edge_float)
+    )
+    return G
+
+
+# --- DISK FORMAT ---
+def _index_path():
+    return os.path.join(CACHE_DIR, "index.json")
+
+
+def _read_index():
+    if not os.path.exists(_index_path()):
+        return {}
+    with open(_index_path()) as f:
+        return json.load(f)
+
+
+def _write_index(index):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = _index_path() + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, _index_path())
+
+
+def region_dir(key):
+    return os.path.join(CACHE_DIR, key)
+
+
+def save_graph(G, bbox, network_type):
+    """ Store a graph (speeds and travel times already added) for a region """
+    key = region_key(bbox, network_type)
+    folder = region_dir(key)
+    os.makedirs(folder, exist_ok=True)
+    for name, arr in graph_to_arrays(G).items():
+        np.save(os.path.join(folder, name + ".npy"), arr)
+
+    index = _read_index()
+    index[key] = {"bbox": list(bbox), "network_type": network_type,
+                  "crs": str(G.graph.get("crs", "epsg:4326")),
+                  "nodes": len(G), "edges": G.number_of_edges()}
+    _write_index(index)
+    return key
+
+
+def load_arrays(key):
+    """ Memory-mapped arrays of a cached region (no copy until touched) """
+    folder = region_dir(key)
+    return {name: np.load(os.path.join(folder, name + ".npy"), mmap_mode="r") for name in GRAPH_ARRAYS}
+
+
+def load_cached(key):
+    entry = _read_index()[key]
+    G = graph_from_arrays(load_arrays(key), crs=entry["crs"])
+    G.graph["store_key"] = key
+    return G
+
+
+def graph_version(key):
+    """ Cache key part that changes whenever a region is saved again (e.g. re-downloaded) """
+    stat = os.stat(os.path.join(region_dir(key), "edge_float.npy"))
+    return f"{key}@{stat.st_mtime_ns}"
+
+
+def find_covering(bbox, network_type):
+    """ Smallest cached region of this network type that covers bbox, or None """
+    best = None
+    best_area = None
+    for key, entry in _read_index().items():
+        if entry["network_type"] != network_type or not bbox_covers(entry["bbox"], bbox):
+            continue
+        if not os.path.isdir(region_dir(key)):
+            continue
+        s, w, n, e = entry["bbox"]
+        area = (n - s) * (e - w)
+        if best is None or area < best_area:
+            best, best_area = key, area
+    return best
+
+
+# --- PUBLIC API ---
+def prepare_graph(G):
+    """ The same enrichment final_app.py does before routing """
+    G = ox.add_edge_speeds(G)
+    G = ox.add_edge_travel_times(G)
+    return G
+
+
+def load_bbox(bbox, network_type="drive"):
+    bbox = normalize_bbox(bbox)
+    key = find_covering(bbox, network_type)
+    if key is None:
+        south, west, north, east = bbox
+        G = ox.graph_from_polygon(box(west, south, east, north), network_type=network_type)
+        key = save_graph(prepare_graph(G), bbox, network_type)
+    return load_cached(key)
+
+
+def load_graph(point, dist, network_type="drive"):
+    """ Cached replacement for ox.graph_from_point(point, dist, network_type=...)
+
+    The returned graph already has 'speed_kph' and 'travel_time' on every
+    edge. G.graph['store_key'] names the cached region it came from.
+    """
+    return load_bbox(bbox_from_point(point, dist), network_type)
+
+
+def import_xml(filepath, network_type="drive"):
+    """ Add a local .osm XML extract to the cache (offline use / fixtures) """
+    G = prepare_graph(ox.graph_from_xml(filepath))
+    xs = [d["x"] for _, d in G.nodes(data=True)]
+    ys = [d["y"] for _, d in G.nodes(data=True)]
+    bbox = (min(ys), min(xs), max(ys), max(xs))
+    return save_graph(G, bbox, network_type)
@@ -0,0 +1,384 @@
+import heapq
+import time
+from array import array
+
+# Cell costs stored in the cost array. A wall is a cell you can never enter.
+WALL = 0
+ROAD_COST = 1
+SALIK_COST = 10
+
+INF = 2**31 - 1
+
+# Byte translation: 1 for every cell that is not a plain road (wall or gate)
+_NOT_ROAD = bytes(0 if i == ROAD_COST else 1 for i in range(256))
+
+
+class GridEngine:
+    """ Grid search engine that keeps everything in flat typed arrays.
+
+    Every cell (x, y) is an integer id = y * grid_size + x. Walls and move
+    costs live in one byte per cell, and g-values / parents are int32 arrays,
+    so a 2000x2000 map needs ~40 MB instead of millions of Node objects.
+    """
+
+    def __init__(self, grid_size, walls=(), salik_gates=()):
+        self.grid_size = grid_size
+        self.cell_count = grid_size * grid_size
+        self.cost = bytearray([ROAD_COST]) * self.cell_count
+        for pos in salik_gates:
+            self.set_gate(pos)
+        for pos in walls:
+            self.set_wall(pos)
+
+    # --- CELL HELPERS ---
+    def cell_id(self, pos):
+        return pos[1] * self.grid_size + pos[0]
+
+    def cell_pos(self, cell):
+        y, x = divmod(cell, self.grid_size)
+        return (x, y)
+
+    def set_wall(self, pos):
+        self.cost[self.cell_id(pos)] = WALL
+
+    def set_gate(self, pos):
+        self.cost[self.cell_id(pos)] = SALIK_COST
+
+    def clear_cell(self, pos):
+        self.cost[self.cell_id(pos)] = ROAD_COST
+
+    def neighbors(self, cell):
+        """ Same order as astar.get_neighbors: up, down, left, right """
+        size = self.grid_size
+        x = cell % size
+        if cell >= size: yield cell - size
+        if cell < self.cell_count - size: yield cell + size
+        if x > 0: yield cell - 1
+        if x < size - 1: yield cell + 1
+
+    # --- SEARCH ---
+    def search(self, start_pos, end_pos, algo_type="A*", track_visited=True):
+        if algo_type == "JPS":
+            return self._drain(self.jump_steps(start_pos, end_pos), track_visited)
+        if algo_type == "ALT":
+            return self._drain(self.alt_steps(start_pos, end_pos), track_visited)
+        # Same loop as search_steps, run without per-expansion events: the
+        # only thing it yields is the result
+        visited = array('i') if track_visited else None  # Expansion order, kept compact until the end
+        (_, result), = self._best_first(start_pos, end_pos, algo_type, False, visited)
+        path, cost, _, execution_time, expanded = result
+        return path, cost, self._positions(visited or ()), execution_time, expanded
+
+    def search_steps(self, start_pos, end_pos, algo_type="A*"):
+        """ Step-wise search: a generator of ("expand", (x, y)) events, one per
+        expanded cell, followed by a single ("done", result) event.
+
+        result is the usual (path, cost, visited, time, count) tuple, except
+        that visited is the closed-cell bitmap (a bytearray indexed by cell id)
+        instead of the expansion list, so memory stays O(cells) however long
+        the search runs. time only counts the search itself, not the time the
+        caller spends between events (e.g. animating).
+        """
+        if algo_type == "JPS":
+            return self.jump_steps(start_pos, end_pos)
+        if algo_type == "ALT":
+            return self.alt_steps(start_pos, end_pos)
+        return self._best_first(start_pos, end_pos, algo_type, True)
+
+    def _best_first(self, start_pos, end_pos, algo_type, events, visited=None):
+        # A* / Dijkstra for both entry points. With events=False nothing is
+        # yielded until the result, so search pays no per-expansion generator
+        # switch or clock read; visited (an array) collects the expansion order.
+        elapsed = 0.0
+        resumed = time.perf_counter()
+
+        size = self.grid_size
+        last_row = self.cell_count - size
+        cost = self.cost
+        start = self.cell_id(start_pos)
+        goal = self.cell_id(end_pos)
+        goal_x, goal_y = end_pos
+        use_heuristic = algo_type == "A*"
+
+        g = array('i', [INF]) * self.cell_count
+        parent = array('i', [-1]) * self.cell_count
+        closed = bytearray(self.cell_count)
+        expanded = 0
+
+        g[start] = 0
+        open_list = [(0, 0, start)]  # (f, h, id): ties go to the cell closer to the goal
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        while open_list:
+            _, _, current = heappop(open_list)
+            if closed[current]:
+                continue  # Stale heap entry, a cheaper copy was already expanded
+            closed[current] = 1
+            expanded += 1
+            if visited is not None:
+                visited.append(current)
+            if events:
+                elapsed += time.perf_counter() - resumed
+                yield "expand", (current % size, current // size)
+                resumed = time.perf_counter()
+
+            # Goal Reached
+            if current == goal:
+                path = []
+                while current != -1:
+                    path.append(self.cell_pos(current))
+                    current = parent[current]
+                elapsed += time.perf_counter() - resumed
+                yield "done", (path[::-1], g[goal], closed, elapsed * 1000, expanded)
+                return
+
+            current_g = g[current]
+            x = current % size
+            for nxt in (current - size if current >= size else -1,
+                        current + size if current < last_row else -1,
+                        current - 1 if x > 0 else -1,
+                        current + 1 if x < size - 1 else -1):
+                if nxt < 0 or closed[nxt]:
+                    continue
+                move_cost = cost[nxt]
+                if move_cost == WALL:
+                    continue
+
+                new_g = current_g + move_cost
+                if new_g < g[nxt]:
+                    g[nxt] = new_g
+                    parent[nxt] = current
+                    if use_heuristic:
+                        ny, nx_ = divmod(nxt, size)
+                        h = abs(nx_ - goal_x) + abs(ny - goal_y)
+                        heappush(open_list, (new_g + h, h, nxt))
+                    else:
+                        heappush(open_list, (new_g, 0, nxt))
+
+        yield "done", ([], 0, closed, 0, expanded)
+
+    # --- JUMP POINT SEARCH ---
+    def special_cells(self):
+        """ 1 for every cell that is a wall/gate or touches one (8 directions).
+
+        Built row by row with big-int shifts, so it costs O(rows) Python steps.
+        """
+        size = self.grid_size
+        row_mask = (1 << (8 * size)) - 1
+        blocked = self.cost.translate(_NOT_ROAD)
+        spread = []
+        for row in range(0, self.cell_count, size):
+            v = int.from_bytes(blocked[row:row + size], "big")
+            spread.append((v | (v << 8) | (v >> 8)) & row_mask)  # left / right neighbours
+        special = bytearray()
+        for y in range(size):
+            v = spread[y]
+            if y > 0: v |= spread[y - 1]
+            if y < size - 1: v |= spread[y + 1]
+            special += v.to_bytes(size, "big")
+        return special
+
+    def jump_steps(self, start_pos, end_pos):
+        """ Jump Point Search, same events as search_steps.
+
+        4-connected JPS where rows are the "fast" direction: a horizontal jump
+        keeps going until it reaches a column that a vertical jump could turn
+        into (it holds a wall/gate neighbour or the goal), and vertical jumps
+        only stop at such cells. Every cell touching a wall or a Salik gate is
+        expanded in all four directions and gates are only ever entered one
+        step at a time, so costs stay exactly those of plain A*.
+        """
+        elapsed = 0.0
+        resumed = time.perf_counter()
+
+        size = self.grid_size
+        cost = self.cost
+        start = self.cell_id(start_pos)
+        goal = self.cell_id(end_pos)
+        goal_x, goal_y = end_pos
+        special = self.special_cells()
+        columns = {}  # x -> special[x::size], sliced on first use
+        column_has_special = {}
+
+        def column(x):
+            col = columns.get(x)
+            if col is None:
+                col = columns[x] = special[x::size]
+            return col
+
+        def turnable(x):
+            # A vertical jump from a plain cell in column x finds a jump point
+            # iff the column holds a special cell or the goal
+            found = column_has_special.get(x)
+            if found is None:
+                found = column_has_special[x] = 1 in column(x)
+            return found or x == goal_x
+
+        # Both jumps start from the first cell of the ray, which the caller
+        # already checked is a plain road with no wall/gate around it.
+        def jump_vertical(nxt, dy):
+            x, ny = nxt % size, nxt // size
+            col = column(x)
+            stop = col.find(1, ny) if dy > 0 else col.rfind(1, 0, ny + 1)
+            if x == goal_x and (goal_y - ny) * dy >= 0 and (stop == -1 or (stop - goal_y) * dy > 0):
+                stop = goal_y
+            return -1 if stop == -1 else stop * size + x
+
+        def jump_horizontal(nxt, dx):
+            nx_ = nxt % size
+            row = nxt - nx_
+            if dx > 0:
+                stop = special.find(1, nxt, row + size)
+                end_x = stop - row if stop != -1 else size
+            else:
+                stop = special.rfind(1, row, nxt + 1)
+                end_x = stop - row if stop != -1 else -1
+            for x in range(nx_, end_x, dx):
+                if turnable(x):
+                    return row + x
+            return stop
+
+        g = array('i', [INF]) * self.cell_count
+        parent = array('i', [-1]) * self.cell_count
+        closed = bytearray(self.cell_count)
+        arrived = bytearray(self.cell_count)  # 1 / 2: reached by a jump right / left
+        expanded = 0
+
+        g[start] = 0
+        open_list = [(0, 0, start)]
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        while open_list:
+            _, _, current = heappop(open_list)
+            if closed[current]:
+                continue
+            closed[current] = 1
+            expanded += 1
+
+            elapsed += time.perf_counter() - resumed
+            yield "expand", (current % size, current // size)
+            resumed = time.perf_counter()
+
+            if current == goal:
+                path = [self.cell_pos(current)]
+                while parent[current] != -1:
+                    prev = parent[current]
+                    step = size if abs(current - prev) >= size else 1
+                    step = step if current < prev else -step
+                    for cell in range(current + step, prev + step, step):
+                        path.append(self.cell_pos(cell))
+                    current = prev
+                elapsed += time.perf_counter() - resumed
+                yield "done", (path[::-1], g[goal], closed, elapsed * 1000, expanded)
+                return
+
+            # A plain cell reached by a horizontal jump keeps its direction
+            # and may turn up or down; everything else looks all four ways.
+            direction = arrived[current]
+            if direction and not special[current]:
+                moves = ((1, 0) if direction == 1 else (-1, 0), (0, -1), (0, 1))
+            else:
+                moves = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+            current_g = g[current]
+            cx, cy = current % size, current // size
+            for dx, dy in moves:
+                if not (0 <= cx + dx < size and 0 <= cy + dy < size):
+                    continue
+                nxt = current + dx + dy * size
+                if cost[nxt] == WALL:
+                    continue
+                if not special[nxt] and nxt != goal:
+                    nxt = jump_horizontal(nxt, dx) if dx else jump_vertical(nxt, dy)
+                    if nxt < 0:
+                        continue
+                if closed[nxt]:
+                    continue
+                nx_, ny = nxt % size, nxt // size
+                steps = abs(nx_ - cx) + abs(ny - cy)
+                new_g = current_g + steps - 1 + cost[nxt]
+                if new_g < g[nxt]:
+                    g[nxt] = new_g
+                    parent[nxt] = current
+                    arrived[nxt] = (1 if dx > 0 else 2) if dx else 0
+                    h = abs(nx_ - goal_x) + abs(ny - goal_y)
+                    heappush(open_list, (new_g + h, h, nxt))
+
+        yield "done", ([], 0, closed, 0, expanded)
+
+    # --- BIDIRECTIONAL ALT ---
+    def alt_steps(self, start_pos, end_pos):
+        """ Bidirectional A* with landmark bounds (landmarks.py), same events as search_steps.
+
+        Landmark tables are built once per set of cell costs. Each cell's bound
+        is the larger of the landmark bound and the Manhattan distance, so it
+        is never weaker than plain A*'s.
+        """
+        import landmarks  # Needs numpy / scipy, which plain grid searches do not
+
+        elapsed = 0.0
+        resumed = time.perf_counter()
+
+        size = self.grid_size
+        cost = self.cost
+        start = self.cell_id(start_pos)
+        goal = self.cell_id(end_pos)
+        start_x, start_y = start_pos
+        goal_x, goal_y = end_pos
+        table = landmarks.grid_landmarks(size, cost)
+        neighbors = self.neighbors
+
+        def to_goal(cell):
+            y, x = divmod(cell, size)
+            return abs(x - goal_x) + abs(y - goal_y)
+
+        def from_start(cell):
+            y, x = divmod(cell, size)
+            return abs(x - start_x) + abs(y - start_y)
+
+        def out_edges(cell):
+            # Moving costs whatever the entered cell costs
+            return [(nxt, cost[nxt]) for nxt in neighbors(cell) if cost[nxt] != WALL]
+
+        def in_edges(cell):
+            step = cost[cell]
+            return [(prev, step) for prev in neighbors(cell) if cost[prev] != WALL]
+
+        closed = bytearray(self.cell_count)
+        for kind, data in table.search_steps(start, goal, out_edges, in_edges, (to_goal, from_start)):
+            if kind == "done":
+                route, total, expanded = data
+                path = [self.cell_pos(cell) for cell in route]
+                elapsed += time.perf_counter() - resumed
+                yield "done", (path, int(total) if path else 0, closed, elapsed * 1000 if path else 0, expanded)
+                return
+            closed[data] = 1
+            elapsed += time.perf_counter() - resumed
+            yield "expand", (data % size, data // size)
+            resumed = time.perf_counter()
+
+    def _drain(self, steps, track_visited):
+        # Run a step-wise search to the end, collecting the expansion order
+        visited = []
+        for kind, data in steps:
+            if kind == "done":
+                path, cost, _, execution_time, expanded = data
+                return path, cost, visited, execution_time, expanded
+            if track_visited:
+                visited.append(data)
+
+    def _positions(self, cells):
+        size = self.grid_size
+        return [(c % size, c // size) for c in cells]
+
+
+def grid_search(start_pos, end_pos, walls, salik_gates, grid_size, algo_type="A*", track_visited=True):
+    """ Drop-in replacement for astar.search_algorithm (same arguments and result).
+
+    Pass track_visited=False when nobody needs the expansion order (e.g. no
+    animation): the visited list is then empty but the node count is kept.
+    """
+    engine = GridEngine(grid_size, walls, salik_gates)
+    return engine.search(start_pos, end_pos, algo_type, track_visited)
@@ -0,0 +1,316 @@
+import heapq
+import time
+
+from grid_engine import GridEngine, WALL, ROAD_COST, SALIK_COST, INF
+
+CLUSTER_SIZE = 16
+LONG_ENTRANCE = 6  # Border openings at least this wide get a transition at each end
+
+
+class HierarchicalPlanner(GridEngine):
+    """ HPA*: A* over a precomputed abstraction of the grid.
+
+    The grid is cut into CLUSTER_SIZE x CLUSTER_SIZE clusters. Every opening
+    in the border between two clusters becomes one or two transitions (a pair
+    of cells facing each other), and inside each cluster the cheapest cost
+    between its transition cells is precomputed, walls and Salik gates
+    included. A query only searches inside the start and goal clusters, then
+    runs A* over the transition cells, then refines the clusters on the
+    chosen route back into grid cells.
+
+    The result is close to optimal but not guaranteed optimal: the best route
+    may cross a border somewhere that is not a transition cell.
+    """
+
+    def __init__(self, grid_size, walls=(), salik_gates=(), cluster_size=CLUSTER_SIZE):
+        super().__init__(grid_size, walls, salik_gates)
+        self.cells_searched = 0  # Cells expanded by cluster-local searches (stats)
+        self.cluster_size = cluster_size
+        self.clusters_per_row = -(-grid_size // cluster_size)
+        self.inter = {}      # cell -> {cell across a border: cost}
+        self.intra = {}      # cell -> {cell in the same cluster: cost}
+        self.borders = {}    # (cluster, cluster) -> [(cell, cell), ...]
+        self.entrances = {}  # cluster -> set of transition cells
+        self.build()
+
+    # --- CLUSTERS ---
+    def cluster_of(self, cell):
+        k = self.cluster_size
+        y, x = divmod(cell, self.grid_size)
+        return (y // k) * self.clusters_per_row + x // k
+
+    def cluster_bounds(self, cluster):
+        """ (x0, y0, x1, y1) cell range of a cluster, end exclusive """
+        k, size = self.cluster_size, self.grid_size
+        cy, cx = divmod(cluster, self.clusters_per_row)
+        return cx * k, cy * k, min(size, (cx + 1) * k), min(size, (cy + 1) * k)
+
+    def cluster_neighbors(self, cluster):
+        m = self.clusters_per_row
+        cy, cx = divmod(cluster, m)
+        if cx > 0: yield cluster - 1
+        if cx < m - 1: yield cluster + 1
+        if cy > 0: yield cluster - m
+        if cy < m - 1: yield cluster + m
+
+    # --- BUILD ---
+    def build(self):
+        self.inter, self.intra, self.borders, self.entrances = {}, {}, {}, {}
+        count = self.clusters_per_row ** 2
+        for cluster in range(count):
+            for other in self.cluster_neighbors(cluster):
+                if other > cluster:
+                    self._build_border(cluster, other)
+        for cluster in range(count):
+            self._collect_entrances(cluster)
+            self._build_intra(cluster)
+
+    def _border_pairs(self, a, b):
+        # Cell pairs facing each other across the border, in order along it
+        size = self.grid_size
+        ax0, ay0, ax1, ay1 = self.cluster_bounds(a)
+        if b == a + 1:  # b is to the right
+            return [(y * size + ax1 - 1, y * size + ax1) for y in range(ay0, ay1)]
+        return [((ay1 - 1) * size + x, ay1 * size + x) for x in range(ax0, ax1)]  # b is below
+
+    def _build_border(self, a, b):
+        cost = self.cost
+        for u, v in self.borders.pop((a, b), ()):
+            self.inter[u].pop(v, None)
+            self.inter[v].pop(u, None)
+
+        transitions = []
+        run = []
+        for u, v in self._border_pairs(a, b) + [(None, None)]:
+            if u is not None and cost[u] != WALL and cost[v] != WALL:
+                run.append((u, v))
+                continue
+            if run:
+                if len(run) >= LONG_ENTRANCE:
+                    transitions += [run[0], run[-1]]
+                else:
+                    transitions.append(run[len(run) // 2])
+                run = []
+
+        for u, v in transitions:
+            # Moving costs whatever the entered cell costs, so each way differs
+            self.inter.setdefault(u, {})[v] = cost[v]
+            self.inter.setdefault(v, {})[u] = cost[u]
+        self.borders[(a, b)] = transitions
+
+    def _collect_entrances(self, cluster):
+        cells = set()
+        for other in self.cluster_neighbors(cluster):
+            for u, v in self.borders.get((min(cluster, other), max(cluster, other)), ()):
+                cells.add(u if self.cluster_of(u) == cluster else v)
+        self.entrances[cluster] = cells
+
+    def _build_intra(self, cluster):
+        cells = self.entrances[cluster]
+        if self._is_open(cluster):
+            # No walls or gates: the cheapest cost is the Manhattan distance
+            size = self.grid_size
+            for u in cells:
+                ux, uy = u % size, u // size
+                self.intra[u] = {v: abs(v % size - ux) + abs(v // size - uy) for v in cells if v != u}
+            return
+        for u in cells:
+            dist = self._cluster_costs(u, cluster)
+            self.intra[u] = {v: dist[v] for v in cells if v != u and v in dist}
+
+    def _is_open(self, cluster):
+        size = self.grid_size
+        x0, y0, x1, y1 = self.cluster_bounds(cluster)
+        return all(self.cost.count(ROAD_COST, y * size + x0, y * size + x1) == x1 - x0
+                   for y in range(y0, y1))
+
+    # --- SEARCH INSIDE ONE CLUSTER ---
+    def _cluster_costs(self, source, cluster, reverse=False):
+        """ Dijkstra limited to one cluster: {cell: cost from source}.
+
+        reverse=True gives the cost from every cell *to* source instead
+        (stepping back out of a cell pays that cell's cost).
+        """
+        size, cost = self.grid_size, self.cost
+        x0, y0, x1, y1 = self.cluster_bounds(cluster)
+        dist = {source: 0}
+        heap = [(0, source)]
+        done = set()
+        while heap:
+            d, cell = heapq.heappop(heap)
+            if cell in done:
+                continue
+            done.add(cell)
+            step = cost[cell] if reverse else 0
+            x, y = cell % size, cell // size
+            for nxt, ok in ((cell - size, y > y0), (cell + size, y < y1 - 1),
+                            (cell - 1, x > x0), (cell + 1, x < x1 - 1)):
+                if not ok or cost[nxt] == WALL or nxt in done:
+                    continue
+                nd = d + (step if reverse else cost[nxt])
+                if nd < dist.get(nxt, INF):
+                    dist[nxt] = nd
+                    heapq.heappush(heap, (nd, nxt))
+        self.cells_searched += len(done)
+        return dist
+
+    def _cluster_path(self, source, target, cluster):
+        """ A* limited to one cluster. Cells after source up to target """
+        size, cost = self.grid_size, self.cost
+        x0, y0, x1, y1 = self.cluster_bounds(cluster)
+        tx, ty = target % size, target // size
+        g = {source: 0}
+        parent = {source: -1}
+        heap = [(0, source)]
+        done = set()
+        while heap:
+            _, cell = heapq.heappop(heap)
+            if cell in done:
+                continue
+            done.add(cell)
+            if cell == target:
+                break
+            x, y = cell % size, cell // size
+            for nxt, ok in ((cell - size, y > y0), (cell + size, y < y1 - 1),
+                            (cell - 1, x > x0), (cell + 1, x < x1 - 1)):
+                if not ok or cost[nxt] == WALL or nxt in done:
+                    continue
+                nd = g[cell] + cost[nxt]
+                if nxt not in g or nd < g[nxt]:
+                    g[nxt] = nd
+                    parent[nxt] = cell
+                    heapq.heappush(heap, (nd + abs(nxt % size - tx) + abs(nxt // size - ty), nxt))
+        self.cells_searched += len(done)
+        if target not in parent:
+            return None
+        cells = []
+        cell = target
+        while cell != source:
+            cells.append(cell)
+            cell = parent[cell]
+        return cells[::-1]
+
+    # --- INCREMENTAL UPDATES ---
+    def update_cell(self, pos, cell_cost):
+        """ Change one cell to WALL, ROAD_COST or SALIK_COST and repair the
+        abstraction: the borders that cell lies on, then the intra-cluster
+        costs of every cluster whose transitions could have changed. """
+        cell = self.cell_id(pos)
+        if self.cost[cell] == cell_cost:
+            return
+        self.cost[cell] = cell_cost
+
+        cluster = self.cluster_of(cell)
+        x0, y0, x1, y1 = self.cluster_bounds(cluster)
+        x, y = pos
+        m = self.clusters_per_row
+        touched = {cluster}
+        for other, on_edge in ((cluster - 1, x == x0 and x0 > 0), (cluster + 1, x == x1 - 1 and x1 < self.grid_size),
+                               (cluster - m, y == y0 and y0 > 0), (cluster + m, y == y1 - 1 and y1 < self.grid_size)):
+            if on_edge:
+                self._build_border(min(cluster, other), max(cluster, other))
+                touched.add(other)
+        for c in touched:
+            for u in self.entrances.get(c, ()):
+                self.intra.pop(u, None)
+            self._collect_entrances(c)
+            self._build_intra(c)
+
+    def add_wall(self, pos):
+        self.update_cell(pos, WALL)
+
+    def add_gate(self, pos):
+        self.update_cell(pos, SALIK_COST)
+
+    def remove_cell(self, pos):
+        self.update_cell(pos, ROAD_COST)
+
+    # --- QUERY ---
+    def query(self, start_pos, end_pos):
+        """ Returns (path, cost, visited, time, count) like search_algorithm.
+
+        visited holds the transition cells the abstract search expanded and
+        count every cell or transition touched, refinement included.
+        """
+        start_time = time.perf_counter()
+        self.cells_searched = 0
+        size = self.grid_size
+        start, goal = self.cell_id(start_pos), self.cell_id(end_pos)
+        start_cluster, goal_cluster = self.cluster_of(start), self.cluster_of(goal)
+        if self.cost[start] == WALL or self.cost[goal] == WALL:
+            return [], 0, [], 0, 0
+
+        # Connect start and goal to the transition cells of their clusters
+        from_start = self._cluster_costs(start, start_cluster)
+        to_goal = self._cluster_costs(goal, goal_cluster, reverse=True)
+        start_edges = {u: from_start[u] for u in self.entrances[start_cluster] if u in from_start}
+        goal_edges = {u: to_goal[u] for u in self.entrances[goal_cluster] if u in to_goal}
+
+        # Abstract A*. GOAL is a virtual node; start and goal in the same
+        # cluster may also connect directly.
+        GOAL = -1
+        gx, gy = end_pos
+        g = {}
+        parent = {}
+        heap = []
+        for u, c in start_edges.items():
+            g[u] = c
+            parent[u] = start
+            h = abs(u % size - gx) + abs(u // size - gy)
+            heapq.heappush(heap, (c + h, h, u))
+        if start_cluster == goal_cluster and goal in from_start:
+            g[GOAL] = from_start[goal]
+            parent[GOAL] = start
+            heapq.heappush(heap, (g[GOAL], 0, GOAL))
+        closed = set()
+        visited = []
+        inter, intra = self.inter, self.intra
+        while heap:
+            _, _, u = heapq.heappop(heap)  # (f, h, cell): ties go to the node closer to the goal
+            if u in closed:
+                continue
+            closed.add(u)
+            if u == GOAL:
+                break
+            visited.append(self.cell_pos(u))
+            gu = g[u]
+            if u in goal_edges and gu + goal_edges[u] < g.get(GOAL, INF):
+                g[GOAL] = gu + goal_edges[u]
+                parent[GOAL] = u
+                heapq.heappush(heap, (g[GOAL], 0, GOAL))
+            for edges in (inter.get(u, ()), intra.get(u, ())):
+                for v in edges:
+                    nd = gu + edges[v]
+                    if v not in closed and nd < g.get(v, INF):
+                        g[v] = nd
+                        parent[v] = u
+                        h = abs(v % size - gx) + abs(v // size - gy)
+                        heapq.heappush(heap, (nd + h, h, v))
+
+        if GOAL not in closed:
+            return [], 0, visited, 0, len(closed) + self.cells_searched
+
+        # Refine: grid path for each abstract hop
+        hops = [goal]
+        u = parent[GOAL]
+        while u != start:
+            hops.append(u)
+            u = parent[u]
+        hops.append(start)
+        hops.reverse()
+        cells = [start]
+        for a, b in zip(hops, hops[1:]):
+            if self.cluster_of(a) == self.cluster_of(b):
+                cells += self._cluster_path(a, b, self.cluster_of(a))
+            else:
+                cells.append(b)  # Transition across a border
+        execution_time = (time.perf_counter() - start_time) * 1000
+        path = [self.cell_pos(c) for c in cells]
+        return path, g[GOAL], visited, execution_time, len(closed) + self.cells_searched
+
+    # GridEngine-style entry point
+    def search(self, start_pos, end_pos, algo_type="HPA*", track_visited=True):
+        if algo_type != "HPA*":
+            return super().search(start_pos, end_pos, algo_type, track_visited)
+        path, cost, visited, execution_time, count = self.query(start_pos, end_pos)
+        return path, cost, visited if track_visited else [], execution_time, count
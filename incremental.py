@@ -0,0 +1,150 @@
+import heapq
+import time
+from array import array
+
+from grid_engine import GridEngine, WALL, ROAD_COST, SALIK_COST, INF
+
+
+class IncrementalPlanner(GridEngine):
+    """ Lifelong Planning A* (LPA*) on top of the flat-array grid.
+
+    The planner keeps g / rhs values between calls. After a wall or gate edit
+    only the cells whose cost-to-come actually changed are re-expanded, and
+    moving the goal (or switching A*/Dijkstra) only re-keys the open list.
+    Moving the start invalidates every g-value, so that falls back to reset().
+
+    Edges are "cost of the cell you enter", so changing one cell only changes
+    the edges *into* that cell and a single vertex update is enough.
+    """
+
+    def __init__(self, grid_size, walls, salik_gates, start_pos, end_pos, algo_type="A*"):
+        super().__init__(grid_size, walls, salik_gates)
+        self.algo_type = algo_type
+        self.reset(start_pos, end_pos)
+
+    # --- FULL RESET (Space key / start moved) ---
+    def reset(self, start_pos, end_pos):
+        self.start = self.cell_id(start_pos)
+        self.goal = self.cell_id(end_pos)
+        self.g = array('i', [INF]) * self.cell_count
+        self.rhs = array('i', [INF]) * self.cell_count
+        self.rhs[self.start] = 0
+        self.open_list = [self._key(self.start) + (self.start,)]
+
+    def rebuild(self, walls, salik_gates, start_pos, end_pos):
+        """ Reload every cell cost and start over, e.g. after the grid was cleared """
+        self.cost = bytearray([ROAD_COST]) * self.cell_count
+        for pos in salik_gates:
+            self.set_gate(pos)
+        for pos in walls:
+            self.set_wall(pos)
+        self.reset(start_pos, end_pos)
+
+    # --- EDITS ---
+    def update_cell(self, pos, cell_cost):
+        """ Change one cell to WALL, ROAD_COST or SALIK_COST """
+        cell = self.cell_id(pos)
+        if self.cost[cell] == cell_cost:
+            return
+        self.cost[cell] = cell_cost
+        self._update_vertex(cell)
+
+    def add_wall(self, pos):
+        self.update_cell(pos, WALL)
+
+    def add_gate(self, pos):
+        self.update_cell(pos, SALIK_COST)
+
+    def remove_cell(self, pos):
+        self.update_cell(pos, ROAD_COST)
+
+    def move_goal(self, end_pos):
+        self.goal = self.cell_id(end_pos)
+        self._rekey()
+
+    def move_start(self, start_pos):
+        self.reset(start_pos, self.cell_pos(self.goal))
+
+    def set_algo(self, algo_type):
+        self.algo_type = algo_type
+        self._rekey()
+
+    # --- LPA* CORE ---
+    def _h(self, cell):
+        if self.algo_type != "A*":
+            return 0
+        size = self.grid_size
+        return abs(cell % size - self.goal % size) + abs(cell // size - self.goal // size)
+
+    def _key(self, cell):
+        best = min(self.g[cell], self.rhs[cell])
+        return (best + self._h(cell), best)
+
+    def _rekey(self):
+        # The heuristic changed, so every queued key is stale. Only cells that
+        # are still inconsistent belong in the open list.
+        g, rhs = self.g, self.rhs
+        cells = {entry[2] for entry in self.open_list if g[entry[2]] != rhs[entry[2]]}
+        self.open_list = [self._key(c) + (c,) for c in cells]
+        heapq.heapify(self.open_list)
+
+    def _update_vertex(self, cell):
+        if cell != self.start:
+            best = INF
+            cell_cost = self.cost[cell]
+            if cell_cost != WALL:
+                g = self.g
+                for pred in self.neighbors(cell):
+                    if g[pred] < best:
+                        best = g[pred]
+                if best != INF:
+                    best += cell_cost
+            self.rhs[cell] = best
+        if self.g[cell] != self.rhs[cell]:
+            heapq.heappush(self.open_list, self._key(cell) + (cell,))
+
+    def _top_key(self):
+        # Drop stale entries (cell already consistent) so the top is real
+        open_list, g, rhs = self.open_list, self.g, self.rhs
+        while open_list and g[open_list[0][2]] == rhs[open_list[0][2]]:
+            heapq.heappop(open_list)
+        return open_list[0][:2] if open_list else (INF, INF)
+
+    def plan(self):
+        """ Repair the search after edits. Returns (path, cost, visited, time, count) """
+        start_time = time.perf_counter()
+        g, rhs, goal = self.g, self.rhs, self.goal
+        open_list = self.open_list
+        visited = []
+
+        while self._top_key() < self._key(goal) or rhs[goal] != g[goal]:
+            if not open_list:
+                break
+            k1, k2, cell = heapq.heappop(open_list)
+            new_key = self._key(cell)
+            if (k1, k2) < new_key:
+                heapq.heappush(open_list, new_key + (cell,))
+                continue
+            visited.append(self.cell_pos(cell))
+
+            if g[cell] > rhs[cell]:
+                g[cell] = rhs[cell]  # Over-consistent: settle it
+            else:
+                g[cell] = INF  # Under-consistent: a wall/gate made it worse
+                self._update_vertex(cell)
+            for succ in self.neighbors(cell):
+                self._update_vertex(succ)
+
+        execution_time = (time.perf_counter() - start_time) * 1000
+        if g[goal] == INF:
+            return [], 0, visited, 0, len(visited)
+        return self._extract_path(), g[goal], visited, execution_time, len(visited)
+
+    def _extract_path(self):
+        g = self.g
+        cell = self.goal
+        path = [self.cell_pos(cell)]
+        while cell != self.start:
+            cell = min(self.neighbors(cell), key=lambda p: g[p])
+            path.append(self.cell_pos(cell))
+        return path[::-1]
@@ -0,0 +1,134 @@
+import numpy as np
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+from od_matrix import grid_arrays
+
+# --- ISOCHRONES (REACHABILITY BANDS) ---
+# One bounded one-to-all Dijkstra (scipy, with limit= set to the largest
+# threshold) gives the cost to every node that can be reached at all; every
+# band is then just a comparison on that one array. Many depots at once use
+# scipy's multi-source mode with min_only=True: a single pass that also
+# reports which depot reached each node first, i.e. the nearest-depot
+# coverage map.
+#
+# Road bands are returned as shapely polygons around the reached road
+# segments, ready for folium.GeoJson. Grid bands are cell masks.
+
+THRESHOLDS = (10, 20, 30)  # Minutes
+ROAD_CELL = 80             # Meters per raster cell when drawing road bands
+METERS_PER_DEGREE = 111_320
+
+
+# --- ROAD GRAPH ---
+def _road_search(csr, depots, limit_s, extra=None, min_only=False):
+    indices = [csr.index[d] for d in depots]
+    return csgraph_dijkstra(csr.matrix("travel_time", extra), indices=indices, limit=limit_s,
+                            min_only=min_only, return_predecessors=min_only)
+
+
+def reach_polygon(csr, reached, cell_m=ROAD_CELL):
+    """ Area covered by the road segments whose both ends are in the reached node mask.
+
+    Buffering thousands of segments with shapely takes about a second, so the
+    segments are rasterised instead: points every half cell along each one
+    mark a cell_m grid, the marks grow by one cell, and the marked cells (which
+    never overlap) are merged with a cheap coverage union.
+    """
+    sources = np.repeat(np.arange(csr.n), np.diff(csr.offsets))
+    keep = reached[sources] & reached[csr.targets]
+    u, v = sources[keep], csr.targets[keep]
+    if not len(u):
+        return shapely.Polygon()
+    step_y = cell_m / METERS_PER_DEGREE
+    step_x = step_y / np.cos(np.radians(csr.node_y.mean()))
+    x0, y0 = csr.node_x.min() - 2 * step_x, csr.node_y.min() - 2 * step_y
+    ax, ay = (csr.node_x[u] - x0) / step_x, (csr.node_y[u] - y0) / step_y
+    bx, by = (csr.node_x[v] - x0) / step_x, (csr.node_y[v] - y0) / step_y
+
+    # Sample i of n + 1 on segment e sits at fraction i / n along it
+    samples = np.maximum(1, np.ceil(np.hypot(bx - ax, by - ay) * 2)).astype(np.int64)
+    edge = np.repeat(np.arange(len(u)), samples + 1)
+    frac = (np.arange(len(edge)) - np.repeat(np.cumsum(samples + 1) - (samples + 1), samples + 1)) / samples[edge]
+    px = (ax[edge] + (bx - ax)[edge] * frac).astype(np.int64)
+    py = (ay[edge] + (by - ay)[edge] * frac).astype(np.int64)
+
+    marked = np.zeros((py.max() + 3, px.max() + 3), dtype=bool)
+    marked[py, px] = True
+    grown = marked.copy()
+    grown[1:] |= marked[:-1]
+    grown[:-1] |= marked[1:]
+    grown[:, 1:] |= marked[:, :-1]
+    grown[:, :-1] |= marked[:, 1:]
+    ys, xs = np.nonzero(grown)
+    cells = shapely.box(x0 + xs * step_x, y0 + ys * step_y, x0 + (xs + 1) * step_x, y0 + (ys + 1) * step_y)
+    return shapely.coverage_union_all(cells).simplify(step_y / 2)
+
+
+def road_isochrones(csr, depot, thresholds=THRESHOLDS, extra=None):
+    """ {minutes: polygon} around one depot (osmid), from one bounded search.
+
+    extra is a per-edge cost addition such as csr.penalty_array(gate
+    penalties): with the 1-hour Salik penalty the bands show what can be
+    reached without paying Salik.
+    """
+    seconds = _road_search(csr, [depot], max(thresholds) * 60, extra)[0]
+    return {t: reach_polygon(csr, seconds <= t * 60) for t in sorted(thresholds)}
+
+
+def road_coverage(csr, depots, limit=max(THRESHOLDS), extra=None):
+    """ Nearest-depot coverage for many depots in one multi-source pass.
+
+    Returns (owner, minutes, areas): per node the position of its nearest
+    depot in depots (-1 beyond limit minutes) and the travel time to it, plus
+    {depot: polygon} of the area each depot serves first.
+    """
+    seconds, _, sources = _road_search(csr, depots, limit * 60, extra, min_only=True)
+    position = {csr.index[d]: i for i, d in enumerate(depots)}
+    owner = np.array([position.get(s, -1) for s in sources.tolist()], dtype=np.int64)
+    for node, i in position.items():
+        owner[node] = i  # scipy reports no source for the depots themselves
+    areas = {d: reach_polygon(csr, owner == i) for i, d in enumerate(depots)}
+    return owner, seconds / 60, areas
+
+
+# --- GRID ---
+def _grid_matrix(grid_size, walls, salik_gates, avoid_tolls):
+    # Avoiding Salik on the grid means gates cannot be entered at all
+    if avoid_tolls:
+        walls, salik_gates = list(walls) + list(salik_gates), ()
+    arrays = grid_arrays(grid_size, walls, salik_gates)
+    n = grid_size * grid_size
+    return csr_matrix((arrays["cost"], arrays["targets"], arrays["offsets"]), shape=(n, n))
+
+
+def grid_isochrones(grid_size, walls, salik_gates, depot, thresholds, avoid_tolls=False):
+    """ (grid_size, grid_size) uint8 mask: 1 within thresholds[0], 2 within
+    thresholds[1], ..., 0 beyond the last. Thresholds are in grid cost units
+    (1 per road cell, SALIK_COST per gate) and index as mask[y, x].
+    """
+    thresholds = sorted(thresholds)
+    graph = _grid_matrix(grid_size, walls, salik_gates, avoid_tolls)
+    cost = csgraph_dijkstra(graph, indices=depot[1] * grid_size + depot[0], limit=thresholds[-1])
+    band = np.searchsorted(thresholds, cost, side="left") + 1
+    band[~np.isfinite(cost)] = 0
+    return band.astype(np.uint8).reshape(grid_size, grid_size)
+
+
+def grid_coverage(grid_size, walls, salik_gates, depots, limit, avoid_tolls=False):
+    """ Nearest-depot map for many (x, y) depots in one multi-source pass.
+
+    Returns (owner, cost), both (grid_size, grid_size): owner is the position
+    in depots of the cell's nearest depot (-1 beyond limit or unreachable).
+    """
+    graph = _grid_matrix(grid_size, walls, salik_gates, avoid_tolls)
+    cells = [y * grid_size + x for x, y in depots]
+    cost, _, sources = csgraph_dijkstra(graph, indices=cells, limit=limit, min_only=True,
+                                        return_predecessors=True)
+    lookup = np.full(grid_size * grid_size, -1, dtype=np.int64)
+    lookup[cells] = np.arange(len(cells))
+    owner = np.where(sources >= 0, lookup[np.maximum(sources, 0)], -1)
+    # A depot owns itself (scipy reports source -9999 for the sources)
+    owner[cells] = np.arange(len(cells))
+    return owner.reshape(grid_size, grid_size), cost.reshape(grid_size, grid_size)
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# --- BACKGROUND JOBS ---
+# The dashboard hands its heavy work (graph load, snapping, searches) to a
+# small thread pool shared by every session, so a rerun never waits for it.
+# Each session owns one slot. Submitting new inputs to a slot cancels the job
+# already in it; submitting the same inputs again returns the running (or
+# finished) job, so clicks that change nothing cost nothing.
+#
+# Cancellation is cooperative: a job stops at its next stage boundary, since
+# a scipy / networkx call cannot be interrupted halfway. Every stage records
+# its wall time, which the page shows while it polls for progress.
+#
+# A finished job stays in its slot so reruns can reuse it. Sessions never say
+# goodbye, so the runner keeps only the MAX_SLOTS most recently used slots.
+
+JOB_WORKERS = 2  # Jobs computed at once; a replaced job may still be finishing its stage
+MAX_SLOTS = 32   # Slots kept; the least recently used one is dropped (and its job cancelled)
+
+
+class JobCancelled(Exception):
+    """ Raised inside a job whose inputs changed, at its next stage boundary """
+
+
+class Job:
+    def __init__(self, key, stages):
+        self.key = key
+        self.stages = tuple(stages)  # Expected stage names, for the progress bar
+        self.timings = {}            # Stage name -> ms, in completion order
+        self.current = None          # Stage running right now (None while queued / when done)
+        self.result = None
+        self.error = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._future = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """ Block until the job is done (or timeout seconds pass); True if done """
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._future is not None and self._future.cancel():
+            self._done.set()  # Never started
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    @contextmanager
+    def stage(self, name):
+        """ with job.stage("search"): ... -- timed, and a cancellation point.
+        A stage entered twice adds up its times. """
+        self.check()
+        self.current = name
+        t0 = time.perf_counter()
+        yield
+        self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+
+    def record(self, name, ms):
+        """ Timing of a stage that ran outside the job (e.g. drawing its result) """
+        self.timings[name] = ms
+
+    def progress(self):
+        """ Share of the expected stages that have finished (0.0 - 1.0) """
+        return sum(name in self.timings for name in self.stages) / max(len(self.stages), 1)
+
+
+class JobRunner:
+    """ Thread pool with one replaceable job per slot (e.g. per browser session) """
+
+    def __init__(self, workers=JOB_WORKERS, max_slots=MAX_SLOTS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metroflow-job")
+        self._slots = OrderedDict()  # slot -> job, least recently used first
+        self._max_slots = max_slots
+        self._lock = threading.Lock()
+
+    def submit(self, slot, key, stages, fn, *args):
+        """ Job computing fn(job, *args) in the background.
+
+        key identifies the inputs: while it stays the same the slot's job is
+        reused (unless it failed), otherwise that job is cancelled and replaced.
+        """
+        with self._lock:
+            job = self._slots.get(slot)
+            if job is not None:
+                self._slots.move_to_end(slot)
+            if job is not None and job.key == key and not job.cancelled and job.error is None:
+                return job
+            if job is not None:
+                job.cancel()
+            job = self._slots[slot] = Job(key, stages)
+            job._future = self._pool.submit(self._run, job, fn, args)
+            while len(self._slots) > self._max_slots:
+                _, old = self._slots.popitem(last=False)
+                old.cancel()
+        return job
+
+    def current(self, slot):
+        with self._lock:
+            return self._slots.get(slot)
+
+    def cancel(self, slot):
+        with self._lock:
+            job = self._slots.pop(slot, None)
+        if job is not None:
+            job.cancel()
+
+    @staticmethod
+    def _run(job, fn, args):
+        try:
+            job.check()
+            job.result = fn(job, *args)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            job.error = e
+        finally:
+            job.current = None
+            job._done.set()
@@ -0,0 +1,228 @@
+import hashlib
+import heapq
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra as csgraph_dijkstra
+
+from od_matrix import cost_arrays
+
+# --- ALT (A*, LANDMARKS, TRIANGLE INEQUALITY) ---
+# A few landmark nodes L are spread over the graph, each one as far as
+# possible from those already picked. One Dijkstra from and one towards every
+# landmark store d(L, v) and d(v, L) for all nodes. The triangle inequality
+# then bounds any remaining distance:
+#   d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+# Unlike a straight line or Manhattan distance this follows the real roads,
+# walls and gate costs. A query only uses the ACTIVE_LANDMARKS that bound
+# d(s, t) best.
+#
+# The search is bidirectional. Forward from s uses the potential
+#   p(v) = (bound on d(v, t) - bound on d(s, v)) / 2
+# and backward from t uses -p(v). Both then work on the same nonnegative
+# reduced edge costs, so they can stop as soon as their two smallest keys add
+# up to the best meeting point found so far.
+#
+# Road tables are float32 and saved next to the cached graph:
+#   graph_cache/<region>/alt_<weight>_{nodes,from,to}.npy
+# Grid tables stay in memory, keyed by the grid's cost bytes.
+
+LANDMARKS = 16        # Per road graph
+GRID_LANDMARKS = 4    # Per grid: every landmark costs 8 bytes per cell
+ACTIVE_LANDMARKS = 4  # Used by one query
+GRID_TABLES = 2       # Grids whose tables are kept in memory
+ALT_ARRAYS = ("nodes", "from", "to")
+
+
+class Landmarks:
+    """ Landmark distance tables of one graph, with a bidirectional ALT search """
+
+    def __init__(self, nodes, dist_from, dist_to, graph=None):
+        self.nodes = nodes          # (landmarks,) node indices
+        self.dist_from = dist_from  # (landmarks, n) float32: d(L, v)
+        self.dist_to = dist_to      # (landmarks, n) float32: d(v, L)
+        self.graph = graph          # scipy CSR matrix searched by default
+        self._edges = None
+
+    @classmethod
+    def build(cls, graph, count):
+        """ Farthest-first landmarks of a scipy CSR matrix (one search each way per landmark) """
+        reverse = graph.T.tocsr()
+        # Start inside the largest strongly connected component
+        _, labels = connected_components(graph, directed=True, connection="strong")
+        first = int(np.argmax(labels == np.argmax(np.bincount(labels))))
+        score = csgraph_dijkstra(graph, indices=first)
+
+        nodes, rows_from, rows_to = [], [], []
+        for _ in range(min(count, graph.shape[0])):
+            score[~np.isfinite(score)] = -1  # Never pick nodes the others cannot reach
+            landmark = int(np.argmax(score))
+            if nodes and score[landmark] <= 0:
+                break
+            dist_from = csgraph_dijkstra(graph, indices=landmark)
+            dist_to = csgraph_dijkstra(reverse, indices=landmark)
+            nodes.append(landmark)
+            rows_from.append(dist_from)
+            rows_to.append(dist_to)
+            round_trip = dist_from + dist_to
+            score = round_trip if len(nodes) == 1 else np.minimum(score, round_trip)
+        return cls(np.array(nodes, dtype=np.int64), np.array(rows_from, dtype=np.float32),
+                   np.array(rows_to, dtype=np.float32), graph)
+
+    # --- BOUNDS ---
+    def potential(self, s, t, bounds=None):
+        """ Forward potential p(v) of a query from s to t (node indices).
+
+        bounds = (to_t, from_s) adds lower bounds of the caller's own (e.g.
+        Manhattan distance on grids); the larger bound wins per node.
+        """
+        f, b = self.dist_from, self.dist_to
+        with np.errstate(invalid="ignore"):
+            quality = np.fmax(f[:, t] - f[:, s], b[:, s] - b[:, t])
+        active = np.argsort(-np.nan_to_num(quality, nan=-1.0), kind="stable")[:ACTIVE_LANDMARKS]
+        rows = [(memoryview(np.ascontiguousarray(f[i])), memoryview(np.ascontiguousarray(b[i])),
+                 float(f[i, t]), float(b[i, t]), float(f[i, s]), float(b[i, s])) for i in active.tolist()]
+        to_t_bound, from_s_bound = bounds if bounds else (None, None)
+        cache = {}
+
+        # Unreachable landmarks are stored as inf. inf - inf gives nan, and a
+        # comparison with nan is always False, so such terms are skipped.
+        def p(v):
+            value = cache.get(v)
+            if value is None:
+                to_t = to_t_bound(v) if bounds else 0.0
+                from_s = from_s_bound(v) if bounds else 0.0
+                for lm_from, lm_to, lm_from_t, lm_to_t, lm_from_s, lm_to_s in rows:
+                    v_from, v_to = lm_from[v], lm_to[v]
+                    x = lm_from_t - v_from
+                    if x > to_t: to_t = x
+                    x = v_to - lm_to_t
+                    if x > to_t: to_t = x
+                    x = v_from - lm_from_s
+                    if x > from_s: from_s = x
+                    x = lm_to_s - v_to
+                    if x > from_s: from_s = x
+                value = cache[v] = (to_t - from_s) / 2
+            return value
+        return p
+
+    # --- SEARCH ---
+    def _csr_edges(self):
+        if self._edges is None:
+            def edges_of(matrix):
+                offsets, targets, weights = matrix.indptr.tolist(), matrix.indices.tolist(), matrix.data.tolist()
+
+                def edges(v):
+                    lo, hi = offsets[v], offsets[v + 1]
+                    return zip(targets[lo:hi], weights[lo:hi])
+                return edges
+            self._edges = (edges_of(self.graph), edges_of(self.graph.T.tocsr()))
+        return self._edges
+
+    def search_steps(self, s, t, out_edges=None, in_edges=None, bounds=None):
+        """ Bidirectional ALT from s to t: ("expand", node) events, then one
+        ("done", (route, cost, expanded)) event. route is [] if t is unreachable.
+
+        out_edges(v) / in_edges(v) give (neighbour, cost) pairs of the edges
+        leaving / entering v; by default they come from self.graph.
+        """
+        if out_edges is None:
+            out_edges, in_edges = self._csr_edges()
+        p = self.potential(s, t, bounds)
+        dist = ({s: 0.0}, {t: 0.0})
+        parent = ({s: -1}, {t: -1})
+        closed = (set(), set())
+        # (key, -distance, node): among equal keys the deeper node goes first
+        heaps = ([(p(s), 0.0, s)], [(-p(t), 0.0, t)])
+        roots = (p(s), -p(t))  # Keys at reduced distance 0, to balance the two sides
+        edges = (out_edges, in_edges)
+        best, meet = (0.0, s) if s == t else (math.inf, -1)
+        expanded = 0
+        forward, backward = heaps
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        while forward and backward:
+            if forward[0][0] + backward[0][0] >= best:
+                break
+            side = 0 if forward[0][0] - roots[0] <= backward[0][0] - roots[1] else 1
+            _, _, v = heappop(heaps[side])
+            if v in closed[side]:
+                continue
+            closed[side].add(v)
+            expanded += 1
+            yield "expand", v
+
+            mine, theirs, tree, heap = dist[side], dist[1 - side], parent[side], heaps[side]
+            sign = 1 if side == 0 else -1
+            d = mine[v]
+            for w, cost in edges[side](v):
+                nd = d + cost
+                if nd < mine.get(w, math.inf):
+                    mine[w] = nd
+                    tree[w] = v
+                    heappush(heap, (nd + sign * p(w), -nd, w))
+                    if w in theirs and nd + theirs[w] < best:
+                        best, meet = nd + theirs[w], w
+
+        if meet < 0:
+            yield "done", ([], math.inf, expanded)
+            return
+        route = [meet]
+        while parent[0][route[-1]] != -1:
+            route.append(parent[0][route[-1]])
+        route.reverse()
+        while parent[1][route[-1]] != -1:
+            route.append(parent[1][route[-1]])
+        yield "done", (route, best, expanded)
+
+    def route(self, s, t, out_edges=None, in_edges=None, bounds=None):
+        """ search_steps run to the end: (route, cost, expanded) """
+        for kind, data in self.search_steps(s, t, out_edges, in_edges, bounds):
+            if kind == "done":
+                return data
+
+
+# --- ROAD GRAPHS (tables saved next to the cached graph) ---
+def _alt_path(key, weight, name):
+    import graph_store  # Road-only: grid searches run without osmnx
+    return os.path.join(graph_store.region_dir(key), f"alt_{weight}_{name}.npy")
+
+
+def load_or_build(key, csr, weight="length", count=LANDMARKS):
+    """ Landmarks of a cached region, built and saved on first use (and again
+    whenever the region itself was saved again) """
+    paths = [_alt_path(key, weight, name) for name in ALT_ARRAYS]
+    saved = os.stat(os.path.join(os.path.dirname(paths[0]), "edge_float.npy")).st_mtime_ns
+    if not all(os.path.exists(path) and os.stat(path).st_mtime_ns >= saved for path in paths):
+        table = Landmarks.build(csr.matrix(weight), count)
+        for path, array in zip(paths, (table.nodes, table.dist_from, table.dist_to)):
+            np.save(path, array)
+    return Landmarks(*(np.load(path, mmap_mode="r") for path in paths), graph=csr.matrix(weight))
+
+
+def road_route(csr, table, source, target):
+    """ Bidirectional ALT between two osmids: (route, cost, nodes expanded) """
+    route, cost, expanded = table.route(csr.index[source], csr.index[target])
+    return csr.node_osmid[route].tolist(), cost, expanded
+
+
+# --- GRIDS (tables kept in memory) ---
+_grid_tables = OrderedDict()
+
+
+def grid_landmarks(grid_size, cost):
+    """ Landmarks of a grid given its GridEngine cost buffer; reused while the cells stay the same """
+    key = (grid_size, hashlib.blake2b(cost, digest_size=16).digest())
+    if key in _grid_tables:
+        _grid_tables.move_to_end(key)
+        return _grid_tables[key]
+    arrays = cost_arrays(cost, grid_size)
+    n = grid_size * grid_size
+    graph = csr_matrix((arrays["cost"], arrays["targets"], arrays["offsets"]), shape=(n, n))
+    table = _grid_tables[key] = Landmarks.build(graph, GRID_LANDMARKS)
+    while len(_grid_tables) > GRID_TABLES:
+        _grid_tables.popitem(last=False)
+    return table
@@ -1,14 +1,25 @@
 import pygame
 import sys
 import time
-from astar import search_algorithm
+from grid_engine import GridEngine
+from incremental import IncrementalPlanner
+from astar import search_algorithm, SearchStats
 
 # --- CONFIGURATION ---
-GRID_SIZE = 20
-CELL_SIZE = 35 
-WIDTH = GRID_SIZE * CELL_SIZE
-HEIGHT = GRID_SIZE * CELL_SIZE + 160 # Extra space for Financial Dashboard
-FPS = 60 
+GRID_SIZE = 20 # Default city size, or run "python main.py 500" for a bigger one
+CELL_SIZE = 35
+VIEW_SIZE = 700 # Map viewport in pixels; bigger grids scroll and zoom inside it
+WIDTH = VIEW_SIZE
+HEIGHT = VIEW_SIZE + 160 # Extra space for Financial Dashboard
+FPS = 60
+FULL_SEARCH_ALGOS = ("JPS", "ALT") # No incremental form: searched from scratch after every change
+
+# VIEWPORT SETTINGS
+MIN_CELL = 1 # Pixels per cell when fully zoomed out
+MAX_CELL = 60 # Pixels per cell when fully zoomed in
+BORDER_MIN_CELL = 6 # Cell borders are only drawn from this zoom level up
+SCROLL_STEP = 100 # Pixels per arrow key press
+FULL_REPAINT_CELLS = 2000 # More changed cells than this -> repaint the whole view
 
 # FINANCIAL SETTINGS
 FUEL_PRICE = 0.50 # AED per block
@@ -23,35 +34,142 @@ GRAY = (50, 50, 55)     # Walls
 YELLOW = (255, 215, 0)  # SALIK GATES
 BLUE = (0, 120, 255)    # Path
 PURPLE = (100, 50, 200) # Visited Nodes
+VISITED = (40, 20, 60)  # Visited Nodes (after the search)
+BORDER = (40, 40, 40)
 UI_BG = (30, 30, 35)
 
 class CityGrid:
-    def __init__(self):
-        self.start = (2, 9)
-        self.end = (17, 9)
+    def __init__(self, grid_size=GRID_SIZE):
+        self.size = grid_size
+        self.start = (2, grid_size // 2 - 1)
+        self.end = (grid_size - 3, grid_size // 2 - 1)
         self.walls = set()
         self.salik_gates = set()
         self.path = []
-        self.visited = [] 
+        self.visited = bytearray(grid_size * grid_size) # Bitmap of expanded cells, index y * size + x
+        self.visited_cells = [] # Cells set in the bitmap (None = unknown, e.g. after an animation)
         self.cost = 0
         self.time_taken = 0
         self.nodes_count = 0
-        self.current_algo = "A*" 
-        
+        self.current_algo = "A*"
+        self.show_stats = False # I key: profile a full search after every change
+        self.stats = None
+
+        # Cells whose color changed since the last frame (read and cleared by GridView)
+        self.dirty = set()
+        self.full_redraw = True
+
         # Financial Stats
         self.trip_fuel_cost = 0
         self.trip_salik_cost = 0
         self.trip_total_cost = 0
-        
+
         self.dragging_start = False
         self.dragging_end = False
 
-    def update_path(self):
-        results = search_algorithm(
-            self.start, self.end, self.walls, self.salik_gates, GRID_SIZE, self.current_algo
+        # Keeps its search between edits so clicks/drags only repair the path
+        self.planner = IncrementalPlanner(
+            grid_size, self.walls, self.salik_gates, self.start, self.end, self.current_algo
         )
-        self.path, self.cost, self.visited, self.time_taken, self.nodes_count = results
+
+    def update_path(self):
+        # Full search from scratch (start-up, reset, animation)
+        self.planner.rebuild(self.walls, self.salik_gates, self.start, self.end)
+        self.full_redraw = True
+        self.replan()
+
+    def replan(self):
+        if self.current_algo in FULL_SEARCH_ALGOS:
+            # Jump Point Search and ALT have no incremental form; they search
+            # the planner's (always current) cost grid from scratch instead
+            results = self.planner.search(self.start, self.end, self.current_algo)
+        else:
+            results = self.planner.plan()
+        self.path, self.cost, visited, self.time_taken, self.nodes_count = results
+        self.set_visited(visited)
         self.calculate_financials()
+        if self.show_stats:
+            self.profile_search()
+
+    def set_visited(self, cells):
+        # Only touch the bitmap (and the screen) where the visited cells changed
+        size = self.size
+        if self.visited_cells is None:
+            self.visited = bytearray(size * size)
+            self.full_redraw = True
+        else:
+            for x, y in self.visited_cells:
+                self.visited[y * size + x] = 0
+            self.dirty.update(self.visited_cells)
+        for x, y in cells:
+            self.visited[y * size + x] = 1
+        self.dirty.update(cells)
+        self.visited_cells = cells
+
+    def profile_search(self):
+        # The planner only repairs its last search, so its work per edit is not
+        # comparable. Re-run the reference search with counters switched on.
+        if self.current_algo in FULL_SEARCH_ALGOS:
+            self.stats = None # The reference search has no JPS / ALT mode
+            return
+        self.stats = SearchStats()
+        search_algorithm(self.start, self.end, self.walls, self.salik_gates, self.size,
+                         self.current_algo, stats=self.stats)
+
+    def toggle_stats(self):
+        self.show_stats = not self.show_stats
+        if self.show_stats:
+            self.profile_search()
+
+    # --- INCREMENTAL EDITS ---
+    # Only A* / Dijkstra feed edits to the LPA* planner. JPS / ALT just update
+    # its cost grid, and set_algo rebuilds the planner when switching back.
+    def incremental(self):
+        return self.current_algo not in FULL_SEARCH_ALGOS
+
+    def add_wall(self, pos):
+        self.walls.add(pos)
+        self.salik_gates.discard(pos)
+        self.dirty.add(pos)
+        if self.incremental(): self.planner.add_wall(pos)
+        else: self.planner.set_wall(pos)
+        self.replan()
+
+    def add_gate(self, pos):
+        self.salik_gates.add(pos)
+        self.walls.discard(pos)
+        self.dirty.add(pos)
+        if self.incremental(): self.planner.add_gate(pos)
+        else: self.planner.set_gate(pos)
+        self.replan()
+
+    def remove_cell(self, pos):
+        if pos not in self.walls and pos not in self.salik_gates:
+            return
+        self.walls.discard(pos)
+        self.salik_gates.discard(pos)
+        self.dirty.add(pos)
+        if self.incremental(): self.planner.remove_cell(pos)
+        else: self.planner.clear_cell(pos)
+        self.replan()
+
+    def move_start(self, pos):
+        self.dirty.update((self.start, pos))
+        self.start = pos
+        if self.incremental(): self.planner.move_start(pos)
+        self.replan()
+
+    def move_end(self, pos):
+        self.dirty.update((self.end, pos))
+        self.end = pos
+        if self.incremental(): self.planner.move_goal(pos)
+        self.replan()
+
+    def set_algo(self, algo_type):
+        self.current_algo = algo_type
+        if self.incremental():
+            self.planner.set_algo(algo_type)
+        self.update_path()
 
     def calculate_financials(self):
         if not self.path:
@@ -74,153 +192,344 @@ class CityGrid:
         # 3. Total
         self.trip_total_cost = self.trip_fuel_cost + self.trip_salik_cost
 
-    def animate_search(self, screen):
+    def animate_search(self, screen, view):
         self.path = []
-        self.draw(screen) 
-        pygame.display.update()
-        
-        # Draw visited nodes step-by-step (Bonus Visualization)
-        for node in self.visited:
-            if node == self.start or node == self.end: continue
-            
-            x, y = node
-            rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(screen, PURPLE, rect)
-            pygame.draw.rect(screen, (40, 40, 40), rect, 1)
-            pygame.display.update()
-            
-            delay = 0.005 if self.current_algo == "Dijkstra" else 0.02
-            time.sleep(delay) 
-            
+        self.visited = bytearray(self.size * self.size)
+        self.visited_cells = None
+        self.full_redraw = True
+        pygame.display.update(view.render(screen))
+
+        # Draw visited nodes step-by-step while the search runs (Bonus Visualization).
+        # Big grids draw a batch of cells per step so the animation still ends.
+        engine = GridEngine(self.size, self.walls, self.salik_gates)
+        delay = 0.005 if self.current_algo == "Dijkstra" else 0.02
+        batch = max(1, (self.size // GRID_SIZE) ** 2)
+        rects = []
+        for step, (kind, data) in enumerate(engine.search_steps(self.start, self.end, self.current_algo), 1):
+            if kind == "done":
+                self.path, self.cost, self.visited, self.time_taken, self.nodes_count = data
+                break
+
+            if data != self.start and data != self.end and view.is_visible(data):
+                rect = view.paint_cell(data, PURPLE)
+                screen.blit(view.background, rect, rect)
+                rects.append(rect)
+            if step % batch: continue
+
+            pygame.display.update(rects)
+            rects = []
+            time.sleep(delay)
+
             for event in pygame.event.get():
                 if event.type == pygame.QUIT: sys.exit()
 
-        self.update_path()
+        # The streamed search already found the path, no second search needed
+        self.full_redraw = True
+        self.calculate_financials()
+        if self.show_stats:
+            self.profile_search()
+
+class GridView:
+    """ Draws the city through a scrollable, zoomable viewport.
+
+    Cell colors are painted into a cached background surface. A frame only
+    repaints the cells the city marked dirty, blits those rects to the screen
+    and draws the path on top, so an idle frame costs nothing and a click
+    costs a few rects. Scrolling, zooming or a full search repaint the
+    visible part of the grid only.
+    """
+
+    def __init__(self, city, size=VIEW_SIZE):
+        self.city = city
+        self.rect = pygame.Rect(0, 0, size, size)
+        self.background = pygame.Surface(self.rect.size)
+        self.cell = max(MIN_CELL, min(CELL_SIZE, size // city.size))
+        self.offset_x = 0 # Scroll position in pixels
+        self.offset_y = 0
+        self.shown_path = None # Path drawn in the last frame
+        self.needs_repaint = True
+
+    # --- VIEWPORT ---
+    def visible_range(self):
+        """ (x0, y0, x1, y1): the cells at least partly inside the viewport """
+        cell, size = self.cell, self.city.size
+        x0, y0 = self.offset_x // cell, self.offset_y // cell
+        x1 = min(size, (self.offset_x + self.rect.width) // cell + 1)
+        y1 = min(size, (self.offset_y + self.rect.height) // cell + 1)
+        return x0, y0, x1, y1
+
+    def is_visible(self, pos):
+        x0, y0, x1, y1 = self.visible_range()
+        return x0 <= pos[0] < x1 and y0 <= pos[1] < y1
 
-    def draw(self, screen):
-        for y in range(GRID_SIZE):
-            for x in range(GRID_SIZE):
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                color = BLACK 
-                
-                if (x, y) in self.visited: color = (40, 20, 60) 
-                
-                if (x, y) in self.walls: color = GRAY
-                elif (x, y) in self.salik_gates: color = YELLOW 
-                elif (x, y) == self.start: color = GREEN
-                elif (x, y) == self.end: color = RED
-                
-                pygame.draw.rect(screen, color, rect)
-                pygame.draw.rect(screen, (40, 40, 40), rect, 1)
-
-        if self.path:
-            points = [(p[0]*CELL_SIZE+CELL_SIZE/2, p[1]*CELL_SIZE+CELL_SIZE/2) for p in self.path]
-            if len(points) > 1:
-                pygame.draw.lines(screen, BLUE, False, points, 5)
-
-def main():
+    def cell_at(self, pixel):
+        """ Grid cell under a screen pixel, or None outside the map """
+        if not self.rect.collidepoint(pixel):
+            return None
+        x = (pixel[0] + self.offset_x) // self.cell
+        y = (pixel[1] + self.offset_y) // self.cell
+        if x >= self.city.size or y >= self.city.size:
+            return None
+        return (x, y)
+
+    def cell_rect(self, pos):
+        cell = self.cell
+        return pygame.Rect(pos[0] * cell - self.offset_x, pos[1] * cell - self.offset_y, cell, cell)
+
+    def scroll(self, dx, dy):
+        self.offset_x += dx
+        self.offset_y += dy
+        self._clamp()
+
+    def zoom(self, factor, pixel=None):
+        """ Zoom in (factor > 1) or out, keeping the cell under the mouse in place """
+        cell = max(MIN_CELL, min(MAX_CELL, round(self.cell * factor)))
+        if cell == self.cell:
+            return
+        px, py = pixel if pixel and self.rect.collidepoint(pixel) else self.rect.center
+        self.offset_x = (self.offset_x + px) * cell // self.cell - px
+        self.offset_y = (self.offset_y + py) * cell // self.cell - py
+        self.cell = cell
+        self._clamp()
+
+    def _clamp(self):
+        map_px = self.city.size * self.cell
+        self.offset_x = max(0, min(self.offset_x, map_px - self.rect.width))
+        self.offset_y = max(0, min(self.offset_y, map_px - self.rect.height))
+        self.needs_repaint = True
+
+    # --- PAINTING ---
+    def cell_color(self, pos):
+        city = self.city
+        if pos in city.walls: return GRAY
+        if pos in city.salik_gates: return YELLOW
+        if pos == city.start: return GREEN
+        if pos == city.end: return RED
+        if city.visited[pos[1] * city.size + pos[0]]: return VISITED
+        return BLACK
+
+    def paint_cell(self, pos, color=None):
+        """ Repaint one cell into the background. Returns its screen rect """
+        rect = self.cell_rect(pos)
+        pygame.draw.rect(self.background, color or self.cell_color(pos), rect)
+        if self.cell >= BORDER_MIN_CELL:
+            pygame.draw.rect(self.background, BORDER, rect, 1)
+        return rect
+
+    def paint_all(self):
+        # Everything starts as an empty road; only cells with another color
+        # are painted, and the borders are drawn as whole grid lines.
+        city = self.city
+        size = city.size
+        x0, y0, x1, y1 = self.visible_range()
+        self.background.fill(BLACK)
+
+        for y in range(y0, y1):
+            row = y * size
+            x = city.visited.find(1, row + x0, row + x1)
+            while x != -1:
+                self.paint_cell((x - row, y), VISITED)
+                x = city.visited.find(1, x + 1, row + x1)
+        for cells, color in ((city.walls, GRAY), (city.salik_gates, YELLOW)):
+            for pos in cells:
+                if x0 <= pos[0] < x1 and y0 <= pos[1] < y1:
+                    self.paint_cell(pos, color)
+        for pos, color in ((city.start, GREEN), (city.end, RED)):
+            self.paint_cell(pos, color)
+
+        if self.cell >= BORDER_MIN_CELL:
+            height, width = self.rect.height, self.rect.width
+            for x in range(x0, x1):
+                left = x * self.cell - self.offset_x
+                pygame.draw.line(self.background, BORDER, (left, 0), (left, height))
+                pygame.draw.line(self.background, BORDER, (left + self.cell - 1, 0), (left + self.cell - 1, height))
+            for y in range(y0, y1):
+                top = y * self.cell - self.offset_y
+                pygame.draw.line(self.background, BORDER, (0, top), (width, top))
+                pygame.draw.line(self.background, BORDER, (0, top + self.cell - 1), (width, top + self.cell - 1))
+
+    def render(self, screen):
+        """ Bring the map on screen up to date. Returns the rects that changed """
+        city = self.city
+        if city.full_redraw or self.needs_repaint or len(city.dirty) > FULL_REPAINT_CELLS:
+            self.paint_all()
+            dirty = [self.rect]
+        else:
+            dirty = [self.paint_cell(pos) for pos in city.dirty if self.is_visible(pos)]
+            if city.path is not self.shown_path:
+                # The old path is erased by repainting its cells, the new one drawn below
+                for path in (self.shown_path or [], city.path):
+                    dirty.extend(self.cell_rect(pos) for pos in path if self.is_visible(pos))
+        city.dirty.clear()
+        city.full_redraw = False
+        self.needs_repaint = False
+        self.shown_path = city.path
+        if not dirty:
+            return []
+
+        screen.set_clip(self.rect)
+        for rect in dirty:
+            screen.blit(self.background, rect, rect)
+        if len(city.path) > 1:
+            half = self.cell / 2
+            points = [(x * self.cell - self.offset_x + half, y * self.cell - self.offset_y + half) for x, y in city.path]
+            pygame.draw.lines(screen, BLUE, False, points, max(1, self.cell // 7))
+        screen.set_clip(None)
+        return [rect.clip(self.rect) for rect in dirty]
+
+class TextCache:
+    """ Rendered text surfaces, reused until the text or color changes """
+
+    def __init__(self, limit=256):
+        self.surfaces = {}
+        self.limit = limit
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.limit:
+                self.surfaces.clear()
+            surface = self.surfaces[key] = font.render(text, True, color)
+        return surface
+
+def dashboard_lines(city, font, header_font, big_font):
+    """ Every piece of dashboard text as (font, text, color, position) """
+    lines = [
+        # Column 1: Algo Stats
+        (header_font, "ALGORITHM", WHITE, (20, HEIGHT - 150)),
+        (font, f"Type: {city.current_algo}", BLUE, (20, HEIGHT - 120)),
+        (font, f"Time: {city.time_taken:.2f} ms", YELLOW, (20, HEIGHT - 100)),
+        (font, f"Nodes: {city.nodes_count}", YELLOW, (20, HEIGHT - 80)),
+    ]
+    if city.show_stats and city.stats:
+        st = city.stats
+        lines += [
+            (font, f"Push: {st.pushes} Dup: {st.duplicate_pushes}", WHITE, (20, HEIGHT - 60)),
+            (font, f"Pop: {st.pops} Stale: {st.stale_pops}", WHITE, (20, HEIGHT - 40)),
+            (font, f"Peak: {st.peak_open} ms: {st.neighbor_time:.1f}/{st.heap_time:.1f}", WHITE, (20, HEIGHT - 20)),
+        ]
+
+    # Column 2: Trip Costs (The "Business" Part)
+    salik_count = int(city.trip_salik_cost / SALIK_PRICE)
+    lines += [
+        (header_font, "LOGISTICS COST (AED)", WHITE, (250, HEIGHT - 150)),
+        (font, f"Fuel ({len(city.path)}km @ 0.5):", WHITE, (250, HEIGHT - 120)),
+        (font, f"{city.trip_fuel_cost:.2f} AED", GREEN, (450, HEIGHT - 120)),
+        (font, f"Salik ({salik_count} Gates @ 4.0):", WHITE, (250, HEIGHT - 100)),
+        (font, f"{city.trip_salik_cost:.2f} AED", YELLOW if salik_count > 0 else GREEN, (450, HEIGHT - 100)),
+        (big_font, "TOTAL:", WHITE, (250, HEIGHT - 60)),
+        (big_font, f"{city.trip_total_cost:.2f} AED", RED, (450, HEIGHT - 60)),
+    ]
+
+    # Column 3: Instructions
+    lines += [
+        (font, "[L-Click] Wall", GRAY, (550, HEIGHT - 140)),
+        (font, "[R-Click] Salik Gate (4 AED)", YELLOW, (550, HEIGHT - 120)),
+        (font, "[A] Animate Search", BLUE, (550, HEIGHT - 100)),
+        (font, "[1/2/3/4] A*/Dijkstra/JPS/ALT", BLUE, (550, HEIGHT - 80)),
+        (font, "[Arrows/Wheel] Pan/Zoom", BLUE, (550, HEIGHT - 60)),
+        (font, "[I] Stats", BLUE, (550, HEIGHT - 40)),
+    ]
+    return lines
+
+def main(grid_size=GRID_SIZE):
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("MetroFlow: Smart Logistics Simulation")
-    
+
     font = pygame.font.SysFont('Consolas', 16)
     header_font = pygame.font.SysFont('Arial', 20, bold=True)
     big_font = pygame.font.SysFont('Arial', 24, bold=True)
-    
+
     clock = pygame.time.Clock()
-    
-    city = CityGrid()
+
+    city = CityGrid(grid_size)
     city.update_path()
+    view = GridView(city)
+    texts = TextCache()
+    dashboard_rect = pygame.Rect(0, HEIGHT - 160, WIDTH, 160)
+    shown_lines = None
 
     running = True
     while running:
-        screen.fill(BLACK)
-        
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-            
+
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE: 
+                if event.key == pygame.K_SPACE:
                     city.walls.clear()
                     city.salik_gates.clear()
                     city.update_path()
-                elif event.key == pygame.K_1: 
-                    city.current_algo = "A*"
-                    city.update_path()
-                elif event.key == pygame.K_2: 
-                    city.current_algo = "Dijkstra"
-                    city.update_path()
-                elif event.key == pygame.K_a: 
-                    city.animate_search(screen)
+                elif event.key == pygame.K_1:
+                    city.set_algo("A*")
+                elif event.key == pygame.K_2:
+                    city.set_algo("Dijkstra")
+                elif event.key == pygame.K_3:
+                    city.set_algo("JPS")
+                elif event.key == pygame.K_4:
+                    city.set_algo("ALT")
+                elif event.key == pygame.K_a:
+                    city.animate_search(screen, view)
+                elif event.key == pygame.K_i:
+                    city.toggle_stats()
+                elif event.key == pygame.K_LEFT: view.scroll(-SCROLL_STEP, 0)
+                elif event.key == pygame.K_RIGHT: view.scroll(SCROLL_STEP, 0)
+                elif event.key == pygame.K_UP: view.scroll(0, -SCROLL_STEP)
+                elif event.key == pygame.K_DOWN: view.scroll(0, SCROLL_STEP)
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS): view.zoom(2)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS): view.zoom(0.5)
+
+            elif event.type == pygame.MOUSEWHEEL:
+                view.zoom(2 if event.y > 0 else 0.5, pygame.mouse.get_pos())
 
             # MOUSE CONTROLS (User Interaction Bonus)
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if pos[1] < GRID_SIZE * CELL_SIZE:
-                    col, row = pos[0] // CELL_SIZE, pos[1] // CELL_SIZE
-                    
+                cell = view.cell_at(event.pos)
+                if cell:
                     if event.button == 1: # Left Click
-                        if (col, row) == city.start: city.dragging_start = True
-                        elif (col, row) == city.end: city.dragging_end = True
+                        if cell == city.start: city.dragging_start = True
+                        elif cell == city.end: city.dragging_end = True
                         else:
-                            city.walls.add((col, row)) # WALL
-                            if (col, row) in city.salik_gates: city.salik_gates.remove((col, row))
-                            city.update_path()
-                            
+                            city.add_wall(cell) # WALL
+
+                    elif event.button == 2: # Middle Click
+                        city.remove_cell(cell) # ERASE
+
                     elif event.button == 3: # Right Click
-                        city.salik_gates.add((col, row)) # SALIK GATE
-                        if (col, row) in city.walls: city.walls.remove((col, row))
-                        city.update_path()
+                        city.add_gate(cell) # SALIK GATE
 
             elif event.type == pygame.MOUSEBUTTONUP:
                 city.dragging_start = False
                 city.dragging_end = False
-            
+
             elif event.type == pygame.MOUSEMOTION:
                 if city.dragging_start or city.dragging_end:
-                    pos = pygame.mouse.get_pos()
-                    if pos[1] < GRID_SIZE * CELL_SIZE:
-                        col, row = pos[0] // CELL_SIZE, pos[1] // CELL_SIZE
-                        if (col, row) not in city.walls and (col, row) != city.start and (col, row) != city.end:
-                            if city.dragging_start: city.start = (col, row)
-                            if city.dragging_end: city.end = (col, row)
-                            city.update_path()
+                    cell = view.cell_at(event.pos)
+                    if cell:
+                        if cell not in city.walls and cell != city.start and cell != city.end:
+                            if city.dragging_start: city.move_start(cell)
+                            if city.dragging_end: city.move_end(cell)
 
-        city.draw(screen)
+        changed = view.render(screen)
 
         # --- FINANCIAL DASHBOARD ---
-        pygame.draw.rect(screen, UI_BG, (0, HEIGHT-160, WIDTH, 160))
-        
-        # Column 1: Algo Stats
-        screen.blit(header_font.render("ALGORITHM", True, WHITE), (20, HEIGHT - 150))
-        screen.blit(font.render(f"Type: {city.current_algo}", True, BLUE), (20, HEIGHT - 120))
-        screen.blit(font.render(f"Time: {city.time_taken:.2f} ms", True, YELLOW), (20, HEIGHT - 100))
-        screen.blit(font.render(f"Nodes: {city.nodes_count}", True, YELLOW), (20, HEIGHT - 80))
-
-        # Column 2: Trip Costs (The "Business" Part)
-        screen.blit(header_font.render("LOGISTICS COST (AED)", True, WHITE), (250, HEIGHT - 150))
-        screen.blit(font.render(f"Fuel ({len(city.path)}km @ 0.5):", True, WHITE), (250, HEIGHT - 120))
-        screen.blit(font.render(f"{city.trip_fuel_cost:.2f} AED", True, GREEN), (450, HEIGHT - 120))
-        
-        salik_count = int(city.trip_salik_cost / SALIK_PRICE)
-        screen.blit(font.render(f"Salik ({salik_count} Gates @ 4.0):", True, WHITE), (250, HEIGHT - 100))
-        screen.blit(font.render(f"{city.trip_salik_cost:.2f} AED", True, YELLOW if salik_count > 0 else GREEN), (450, HEIGHT - 100))
-        
-        screen.blit(big_font.render("TOTAL:", True, WHITE), (250, HEIGHT - 60))
-        screen.blit(big_font.render(f"{city.trip_total_cost:.2f} AED", True, RED), (450, HEIGHT - 60))
-
-        # Column 3: Instructions
-        screen.blit(font.render("[L-Click] Wall", True, GRAY), (550, HEIGHT - 140))
-        screen.blit(font.render("[R-Click] Salik Gate (4 AED)", True, YELLOW), (550, HEIGHT - 120))
-        screen.blit(font.render("[A] Animate Search", True, BLUE), (550, HEIGHT - 100))
-        screen.blit(font.render("[1/2] Switch Algo", True, BLUE), (550, HEIGHT - 80))
-
-        pygame.display.flip()
+        # Only re-drawn (from cached text) when one of its values changed
+        lines = dashboard_lines(city, font, header_font, big_font)
+        if lines != shown_lines:
+            pygame.draw.rect(screen, UI_BG, dashboard_rect)
+            for line_font, text, color, position in lines:
+                screen.blit(texts.render(line_font, text, color), position)
+            changed.append(dashboard_rect)
+            shown_lines = lines
+
+        if changed:
+            pygame.display.update(changed)
         clock.tick(FPS)
 
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else GRID_SIZE)
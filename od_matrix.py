@@ -0,0 +1,221 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+from grid_engine import GridEngine, WALL, SALIK_COST
+
+# --- MANY-TO-MANY COST MATRICES ---
+# One single-source Dijkstra per origin (scipy, in C) gives the costs to every
+# destination at once. The extra layers (distance, time, tolls along the
+# chosen route) are summed over the shortest-path tree with pointer jumping,
+# so they are vectorised too.
+#
+# With workers > 1 the origins are split across a process pool. The graph
+# arrays go into shared memory once; each worker only receives their names.
+# Starting the pool costs ~70 ms, so by default (workers=None) small matrices
+# stay serial and only jobs of POOL_MIN_WORK origin-nodes or more (roughly
+# half a second of serial Dijkstra) use one worker per CPU.
+
+CHUNK_SIZE = 16            # Origins per pool task: bounds the (chunk x nodes) scratch arrays
+POOL_MIN_WORK = 1_000_000  # len(origins) x nodes below which workers=None runs serially
+
+
+# --- GRAPH ARRAYS ---
+def road_arrays(csr, penalties=None):
+    """ Matrix inputs for a csr_graph.CSRGraph.
+
+    Layers: length (m), travel_time (s) and tolls (gates driven through).
+    penalties is a tolls.* {(u, v, key): cost} map; without it tolls is all 0.
+    """
+    extra = csr.penalty_array(penalties) if penalties else np.zeros(len(csr.targets))
+    arrays = {"offsets": csr.offsets, "targets": csr.targets,
+              "length": csr.weights["length"].astype(np.float64),
+              "travel_time": csr.weights["travel_time"].astype(np.float64),
+              "tolls": (extra > 0).astype(np.float64),
+              "penalty": extra}
+    return arrays
+
+
+def grid_arrays(grid_size, walls=(), salik_gates=()):
+    """ Matrix inputs for a grid. An edge costs whatever the entered cell costs.
+
+    Layers: cost (same units as search_algorithm), steps (cells moved) and
+    tolls (Salik gates entered).
+    """
+    engine = GridEngine(grid_size, walls, salik_gates)
+    return cost_arrays(engine.cost, grid_size)
+
+
+def cost_arrays(cost, grid_size):
+    """ grid_arrays for a GridEngine cost buffer (one byte per cell) """
+    cost = np.frombuffer(bytes(cost), dtype=np.uint8)
+    n = grid_size * grid_size
+    cells = np.arange(n, dtype=np.int64)
+    x, y = cells % grid_size, cells // grid_size
+
+    # Up, down, left, right for every cell, dropping moves off the grid or into walls
+    sources, targets = [], []
+    for ok, step in ((y > 0, -grid_size), (y < grid_size - 1, grid_size), (x > 0, -1), (x < grid_size - 1, 1)):
+        src = cells[ok & (cost != WALL)]
+        dst = src + step
+        keep = cost[dst] != WALL
+        sources.append(src[keep])
+        targets.append(dst[keep])
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    order = np.lexsort((targets, sources))
+    sources, targets = sources[order], targets[order]
+
+    offsets = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    entered = cost[targets]
+    return {"offsets": offsets, "targets": targets.astype(np.int32),
+            "cost": entered.astype(np.float64),
+            "steps": np.ones(len(targets)),
+            "tolls": (entered == SALIK_COST).astype(np.float64)}
+
+
+# --- CORE ---
+def _edge_keys(arrays):
+    n = len(arrays["offsets"]) - 1
+    sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(arrays["offsets"]))
+    return sources * n + arrays["targets"]
+
+
+def _matrix(arrays, weight):
+    n = len(arrays["offsets"]) - 1
+    data = arrays[weight] + arrays["penalty"] if "penalty" in arrays else arrays[weight]
+    return csr_matrix((data, arrays["targets"], arrays["offsets"]), shape=(n, n))
+
+
+def _rows(arrays, graph, origins, destinations, layers):
+    """ Cost (and layer) rows for a batch of origins: {name: (len(origins), len(destinations))} """
+    n = len(arrays["offsets"]) - 1
+    dist, pred = csgraph_dijkstra(graph, indices=origins, return_predecessors=True)
+    out = {"cost": dist[:, destinations]}
+    if not layers:
+        return out
+
+    # Value of the tree edge into every node, then sums up to the root
+    keys = arrays.get("edge_keys")
+    if keys is None:
+        keys = _edge_keys(arrays)
+    reached = pred >= 0
+    parent = np.where(reached, pred, np.arange(n))
+    edges = np.searchsorted(keys, parent.astype(np.int64) * n + np.arange(n))
+    edges = np.minimum(edges, len(keys) - 1)
+    totals = {name: np.where(reached, arrays[name][edges], 0.0) for name in layers}
+    # Pointer jumping: after k rounds every node has summed the 2^k tree edges
+    # above it. Roots point at themselves with a total of 0, so extra rounds
+    # add nothing.
+    rows = np.arange(len(origins))[:, None]
+    while True:
+        for name in layers:
+            totals[name] = totals[name] + totals[name][rows, parent]
+        grand = parent[rows, parent]
+        if np.array_equal(grand, parent):
+            break
+        parent = grand
+    unreachable = ~np.isfinite(out["cost"])
+    for name in layers:
+        layer = totals[name][:, destinations]
+        layer[unreachable] = np.nan
+        out[name] = layer
+    return out
+
+
+# Worker-side state, set once per process by _attach
+_shared = {}
+_graphs = {}  # weight -> scipy matrix, built on first use
+
+
+def _attach(specs):
+    blocks = {}
+    for name, (block, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=block)
+        blocks[name] = shm
+        _shared[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _shared["_blocks"] = blocks  # Keep the mappings alive as long as the arrays
+
+
+def _pool_rows(task):
+    start, origins, destinations, weight, layers = task
+    arrays = {k: v for k, v in _shared.items() if not k.startswith("_")}
+    if weight not in _graphs:
+        _graphs[weight] = _matrix(arrays, weight)
+    return start, _rows(arrays, _graphs[weight], origins, destinations, layers)
+
+
+def od_matrix(arrays, origins, destinations, weight, layers=(), workers=None, chunk_size=CHUNK_SIZE):
+    """ Many-to-many matrix over road_arrays / grid_arrays output.
+
+    origins / destinations are node indices. Returns {"cost": matrix, layer:
+    matrix, ...} as float64 arrays of shape (len(origins), len(destinations));
+    unreachable pairs are inf in "cost" and NaN in the layers. workers=None
+    picks serial or one process per CPU from the size of the job.
+    """
+    origins = np.asarray(origins, dtype=np.int64)
+    destinations = np.asarray(destinations, dtype=np.int64)
+    layers = tuple(layers)
+    arrays = dict(arrays, edge_keys=_edge_keys(arrays)) if layers else dict(arrays)
+    if not workers:
+        nodes = len(arrays["offsets"]) - 1
+        workers = (os.cpu_count() or 1) if len(origins) * nodes >= POOL_MIN_WORK else 1
+    chunks = [(i, origins[i:i + chunk_size]) for i in range(0, len(origins), chunk_size)]
+
+    result = {name: np.empty((len(origins), len(destinations))) for name in ("cost",) + layers}
+    if workers == 1 or len(chunks) == 1:
+        graph = _matrix(arrays, weight)
+        for start, batch in chunks:
+            for name, rows in _rows(arrays, graph, batch, destinations, layers).items():
+                result[name][start:start + len(batch)] = rows
+        return result
+
+    # Copy every array into shared memory once; workers map it read-only
+    blocks, specs = [], {}
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            blocks.append(shm)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+
+        tasks = [(start, batch, destinations, weight, layers) for start, batch in chunks]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as pool:
+            for start, rows in pool.map(_pool_rows, tasks):
+                for name, values in rows.items():
+                    result[name][start:start + len(values)] = values
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return result
+
+
+# --- CONVENIENCE WRAPPERS ---
+def road_od_matrix(csr, origins, destinations, weight="travel_time", layers=(),
+                   penalties=None, avoid_tolls=False, workers=None):
+    """ Matrix between osmids on a CSRGraph.
+
+    layers: any of "length", "travel_time", "tolls". With avoid_tolls the
+    gate penalties are added to the routing cost (like the "Avoid Salik"
+    route); the layers always report the real length / time / gate count.
+    """
+    arrays = road_arrays(csr, penalties)
+    if not avoid_tolls:
+        del arrays["penalty"]
+    return od_matrix(arrays, [csr.index[o] for o in origins], [csr.index[d] for d in destinations],
+                     weight, layers, workers)
+
+
+def grid_od_matrix(grid_size, walls, salik_gates, origins, destinations, layers=(), workers=None):
+    """ Matrix between (x, y) cells. layers: any of "steps", "tolls" """
+    arrays = grid_arrays(grid_size, walls, salik_gates)
+    cell = lambda pos: pos[1] * grid_size + pos[0]
+    return od_matrix(arrays, [cell(o) for o in origins], [cell(d) for d in destinations],
+                     "cost", layers, workers)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import graph_store
+
+# --- PROCESS-WIDE ROUTE CACHE ---
+# One instance is shared by every Streamlit session on the server. A route is
+# stored under (context, source, target), where the context is everything the
+# answer depends on besides the endpoints:
+#   (graph_version, weight, algorithm, gate_key)
+# graph_version changes when a region is saved again and gate_key is the
+# sorted gate set, so a new download or a different set of gates can never
+# hit a stale route. Old entries simply stop matching and age out.
+#
+# Every subpath of a shortest path is itself a shortest path. So a query whose
+# endpoints both lie, in order, on a cached route of the same context is
+# answered by slicing that route, without any search.
+#
+# With disk=True every route is also written as a small JSON file under the
+# region's folder in graph_cache/, so it survives restarts.
+
+ROUTE_CACHE_SIZE = 512  # Routes kept in memory
+
+
+def gate_key(gate_edges):
+    """ Order-independent key of a gate set (duplicates kept: they add up) """
+    return tuple(sorted(tuple(int(v) for v in edge) for edge in gate_edges))
+
+
+class RouteCache:
+    """ LRU cache of routes (lists of node ids) with hit / miss / eviction counters """
+
+    def __init__(self, max_entries=ROUTE_CACHE_SIZE, disk=False):
+        self.max_entries = max_entries
+        self.disk = disk
+        self._entries = OrderedDict()  # (context, source, target) -> route
+        self._through = {}             # context -> {node: {key, ...}} for subpath lookups
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.subpath_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def counters(self):
+        return {"hits": self.hits, "subpath_hits": self.subpath_hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries)}
+
+    # --- LOOKUP ---
+    def route(self, context, source, target, search):
+        """ Cached route from source to target; search() computes it on a miss.
+
+        An empty route (no path) is cached like any other answer.
+        """
+        key = (context, source, target)
+        with self._lock:
+            route = self._lookup(key)
+            if route is not None:
+                return route
+
+        route = [int(n) for n in search()]  # Outside the lock: other sessions keep working
+        with self._lock:
+            self.misses += 1
+            self._store(key, route)
+        if self.disk:
+            self._write(key, route)
+        return route
+
+    def _lookup(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        route = self._subpath(*key)
+        if route is not None:
+            self.subpath_hits += 1
+            return route
+        if self.disk:
+            route = self._read(key)
+            if route is not None:
+                self.disk_hits += 1
+                self._store(key, route)
+                return route
+        return None
+
+    def _subpath(self, context, source, target):
+        through = self._through.get(context, {})
+        for key in through.get(source, set()) & through.get(target, set()):
+            route = self._entries[key]
+            i, j = route.index(source), route.index(target)
+            if i <= j:
+                self._entries.move_to_end(key)
+                return route[i:j + 1]
+        return None
+
+    # --- STORAGE ---
+    def _store(self, key, route):
+        self._entries[key] = route
+        self._entries.move_to_end(key)
+        through = self._through.setdefault(key[0], {})
+        for node in route:
+            through.setdefault(node, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, old_route = self._entries.popitem(last=False)
+            self._forget(old_key, old_route)
+            self.evictions += 1
+
+    def _forget(self, key, route):
+        through = self._through[key[0]]
+        for node in route:
+            keys = through.get(node)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del through[node]
+        if not through:
+            del self._through[key[0]]
+
+    def invalidate(self, store_key=None):
+        """ Drop every route of one cached region (memory and disk), or of all regions """
+        with self._lock:
+            for key in [k for k in self._entries if store_key is None or k[0][0].startswith(store_key + "@")]:
+                self._forget(key, self._entries.pop(key))
+        if self.disk:
+            if store_key:
+                regions = [store_key]
+            else:
+                # graph_cache/ only exists once a region was saved
+                regions = os.listdir(graph_store.CACHE_DIR) if os.path.isdir(graph_store.CACHE_DIR) else []
+            for region in regions:
+                shutil.rmtree(self._folder(region), ignore_errors=True)
+
+    # --- DISK TIER ---
+    def _folder(self, store_key):
+        return os.path.join(graph_store.region_dir(store_key), "routes")
+
+    def _path(self, key):
+        store_key = key[0][0].rsplit("@", 1)[0]
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self._folder(store_key), digest + ".json")
+
+    def _read(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry["route"] if entry.get("key") == repr(key) else None
+
+    def _write(self, key, route):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"key": repr(key), "route": route}, f)
+        os.replace(tmp, path)
@@ -0,0 +1,119 @@
+import json
+import math
+
+import folium
+import numpy as np
+import shapely
+from folium.elements import JSCSSMixin
+from folium.plugins import PolyLineFromEncoded
+from folium.template import Template
+
+from csr_graph import METERS_PER_DEGREE
+
+# --- COMPACT ROUTE GEOMETRY ---
+# A folium.PolyLine writes every node of a route into the page as a JSON
+# float pair, so a long cross-city route costs tens of kilobytes per line and
+# map. Routes are drawn in three cheap steps instead:
+#   1. coordinates: one array lookup on the CSR graph (csr.route_coords)
+#   2. simplify:    Douglas-Peucker with a tolerance of TOLERANCE_PX screen
+#                   pixels at the map's zoom, so nothing visible is lost
+#   3. encode:      Google's encoded polyline format (about 4-6 bytes per
+#                   point instead of ~40), decoded in the browser by the
+#                   Leaflet plugin that folium's PolyLineFromEncoded loads
+
+TOLERANCE_PX = 1.0                 # Largest allowed deviation from the full route, in pixels
+EQUATOR_M_PER_PX = 156_543.03392   # Web Mercator meters per pixel at zoom 0 on the equator
+DETAIL_ZOOM = 16                   # Tolerance for static HTML maps users can zoom into
+PRECISION = 5                      # Decimal places kept by the encoding (~1 m)
+
+
+def tolerance_m(zoom, lat, pixels=TOLERANCE_PX):
+    """ Ground distance (m) covered by pixels screen pixels at this zoom and latitude """
+    return EQUATOR_M_PER_PX * math.cos(math.radians(lat)) / 2 ** zoom * pixels
+
+
+def simplify(coords, zoom, pixels=TOLERANCE_PX):
+    """ Douglas-Peucker simplified (n, 2) lat/lon array; ends are always kept """
+    coords = np.asarray(coords, dtype=np.float64)
+    if len(coords) < 3:
+        return coords
+    lat = float(coords[:, 0].mean())
+    # Local meters, so the tolerance means the same north-south and east-west
+    scale = np.array([METERS_PER_DEGREE, METERS_PER_DEGREE * math.cos(math.radians(lat))])
+    line = shapely.simplify(shapely.LineString(coords * scale), tolerance_m(zoom, lat, pixels),
+                            preserve_topology=False)
+    return shapely.get_coordinates(line) / scale
+
+
+def encode(coords, precision=PRECISION):
+    """ Encoded polyline string of an (n, 2) lat/lon array, built with NumPy.
+
+    Each coordinate is stored as the difference to the previous one, shifted
+    left with the sign in bit 0, and written in 5-bit chunks (low bits first)
+    as ASCII 63 + chunk, with 0x20 set on every chunk but the last.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if not len(coords):
+        return ""
+    ints = np.round(coords * 10 ** precision).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=0).reshape(-1)  # lat, lon, lat, lon, ...
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    shifts = 5 * np.arange(7)  # 35 bits covers any delta at up to 7 decimals
+    chunks = (values[:, None] >> shifts) & 0x1F
+    count = 1 + ((values[:, None] >> shifts[1:]) > 0).sum(axis=1)
+    chunks |= np.where(np.arange(7) < (count - 1)[:, None], 0x20, 0)
+    return (chunks[np.arange(7) < count[:, None]] + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode(encoded, precision=PRECISION):
+    """ (n, 2) lat/lon array of an encoded polyline, e.g. to check a round trip """
+    values, value, shift = [], 0, 0
+    for byte in encoded.encode("ascii"):
+        chunk = byte - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if not chunk & 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    return np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+
+
+class EncodedPolyline(PolyLineFromEncoded):
+    """ PolyLineFromEncoded that survives branca: a rendered script is parsed
+    again as a Jinja template, so a "{{" inside the encoding would break the
+    page. Every "{" is written as the JSON escape \\u007b instead. """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+
+            var {{ this.get_name() }} = L.Polyline.fromEncoded(
+                {{ this.literal }},
+                {{ this.options|tojavascript }}
+            ).addTo({{ this._parent.get_name() }});
+
+        {% endmacro %}
+        """)
+
+    def __init__(self, encoded, **kwargs):
+        super().__init__(encoded, **kwargs)
+        self.literal = json.dumps(encoded).replace("{", "\\u007b")
+
+
+def encoded_line(encoded, tooltip=None, **options):
+    """ folium line from an encoded polyline; options are Leaflet path options """
+    line = EncodedPolyline(encoded, **options)
+    if tooltip is not None:
+        folium.Tooltip(tooltip).add_to(line)
+    return line
+
+
+def polyline(coords, zoom, tooltip=None, **options):
+    """ Drop-in for folium.PolyLine(coords, ...): simplified for zoom, then encoded """
+    return encoded_line(encode(simplify(coords, zoom)), tooltip, **options)
+
+
+class EncodedPolylineSupport(JSCSSMixin):
+    """ Loads the polyline decoder on a map whose encoded lines are not its own
+    children, e.g. lines sent with st_folium(feature_group_to_add=...) """
+
+    default_js = PolyLineFromEncoded.default_js
@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# --- SPATIAL INDEX FOR SNAPPING CLICKS TO THE ROAD GRAPH ---
+# Built once per cached graph. Coordinates are projected to local meters
+# (equirectangular around the graph's mean latitude), which is accurate to a
+# fraction of a percent at city scale, so plain Euclidean KD-trees work.
+
+METERS_PER_DEGREE = 111_320
+EDGE_SAMPLE_SPACING = 50  # meters between sample points on long road segments
+EDGE_CANDIDATES = 8       # sample points checked exactly per query
+
+
+class SpatialIndex:
+    """ Batched nearest-node and nearest-edge lookups for one road graph """
+
+    def __init__(self, G):
+        self.node_ids = np.fromiter(G.nodes, dtype=np.int64, count=len(G))
+        lon = np.array([d["x"] for _, d in G.nodes(data=True)])
+        lat = np.array([d["y"] for _, d in G.nodes(data=True)])
+        self.cos_lat = math.cos(math.radians(float(lat.mean()))) if len(lat) else 1.0
+        self.node_xy = self.project(lat, lon)
+        self.node_tree = cKDTree(self.node_xy)
+
+        # Edges: straight segments between their end nodes, each covered by
+        # sample points so long highway segments can be found from any spot
+        position = {n: i for i, n in enumerate(G.nodes)}
+        edges = list(G.edges(keys=True))
+        self.edges = edges
+        self.edge_ends = np.array([(position[u], position[v]) for u, v, _ in edges],
+                                  dtype=np.int64).reshape(-1, 2)
+        a = self.node_xy[self.edge_ends[:, 0]]
+        b = self.node_xy[self.edge_ends[:, 1]]
+        lengths = np.hypot(*(b - a).T)
+        samples_per_edge = np.maximum(1, np.ceil(lengths / EDGE_SAMPLE_SPACING)).astype(np.int64)
+        self.sample_edge = np.repeat(np.arange(len(edges)), samples_per_edge)
+        # Sample i of n on an edge sits at fraction (i + 0.5) / n along it
+        first = np.cumsum(samples_per_edge) - samples_per_edge
+        step = np.arange(len(self.sample_edge)) - np.repeat(first, samples_per_edge)
+        frac = (step + 0.5) / np.repeat(samples_per_edge, samples_per_edge)
+        seg_a = a[self.sample_edge]
+        seg_b = b[self.sample_edge]
+        self.edge_tree = cKDTree(seg_a + (seg_b - seg_a) * frac[:, None])
+
+    def project(self, lat, lon):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        return np.column_stack((lon * METERS_PER_DEGREE * self.cos_lat, lat * METERS_PER_DEGREE))
+
+    def nearest_nodes(self, lats, lons):
+        """ osmids of the nearest graph node for each (lat, lon), in one call """
+        _, idx = self.node_tree.query(self.project(lats, lons))
+        return self.node_ids[idx].tolist()
+
+    def nearest_edges(self, lats, lons):
+        """ (u, v, key) of the nearest road segment for each (lat, lon) """
+        points = self.project(lats, lons)
+        k = min(EDGE_CANDIDATES, len(self.sample_edge))
+        _, idx = self.edge_tree.query(points, k=k)
+        candidates = self.sample_edge[np.asarray(idx).reshape(len(points), -1)]
+
+        # Exact point-to-segment distance for every candidate edge
+        a = self.node_xy[self.edge_ends[candidates, 0]]
+        b = self.node_xy[self.edge_ends[candidates, 1]]
+        p = points[:, None, :]
+        ab = b - a
+        denom = np.einsum("ijk,ijk->ij", ab, ab)
+        t = np.clip(np.einsum("ijk,ijk->ij", p - a, ab) / np.where(denom == 0, 1, denom), 0, 1)
+        closest = a + ab * t[..., None]
+        dist = np.hypot(*(p - closest).transpose(2, 0, 1))
+        best = candidates[np.arange(len(points)), dist.argmin(axis=1)]
+        return [self.edges[i] for i in best.tolist()]
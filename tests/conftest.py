@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to main.py / final_app.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SMALL_OSM = os.path.join(FIXTURES, "small.osm")
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """ Empty graph_cache/ for one test """
+    import graph_store
+    monkeypatch.setattr(graph_store, "CACHE_DIR", str(tmp_path / "graph_cache"))
+    return tmp_path / "graph_cache"
+
+
+@pytest.fixture
+def small_region(cache_dir):
+    """ Store key of the small.osm fixture imported into the test cache """
+    import graph_store
+    return graph_store.import_xml(SMALL_OSM)
@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+import pytest
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+import alternatives
+from csr_graph import CSRGraph
+from test_contraction import grid_graph
+
+
+def route_cost(csr, costs, route):
+    idx = csr.indices(route)
+    return float(np.asarray(costs)[csr.edge_ids(idx[:-1], idx[1:])].sum())
+
+
+def test_first_route_is_the_cheapest_and_the_rest_stay_distinct():
+    csr = CSRGraph.from_graph(grid_graph(size=14))
+    gates = np.zeros(len(csr.targets))
+    gates[random.Random(1).sample(range(len(gates)), 30)] = 1
+    costs = alternatives.edge_costs(csr, gates)
+    rng = random.Random(6)
+    nodes = csr.node_osmid.tolist()
+    graph = csr.matrix("length").copy()
+    graph.data = costs
+    for _ in range(15):
+        s, t = rng.sample(nodes, 2)
+        routes = alternatives.alternative_routes(csr, s, t, costs)
+        best = csgraph_dijkstra(graph, indices=csr.index[s])[csr.index[t]]
+        if not np.isfinite(best):
+            assert routes == []
+            continue
+
+        assert routes and route_cost(csr, costs, routes[0]) == pytest.approx(best, rel=1e-9)
+        costs_found = [route_cost(csr, costs, r) for r in routes]
+        assert costs_found == sorted(costs_found)
+        for i, route in enumerate(routes):
+            assert route[0] == s and route[-1] == t
+            assert len(set(route)) == len(route)
+            assert costs_found[i] <= costs_found[0] * alternatives.MAX_STRETCH + 1e-9
+            for other in routes[:i]:
+                assert alternatives.overlap(csr, route, other) <= alternatives.MAX_OVERLAP + 1e-9
@@ -0,0 +1,50 @@
+import io
+
+import networkx as nx
+import pytest
+
+import batch_route
+import graph_store
+import tolls
+
+
+def toll_road():
+    """ A 500 m street with a Salik gate, and a 5 km expressway around it.
+
+    The detour is longer than tolls.GATE_PENALTY read as meters, so a
+    penalty added to length instead of travel_time would keep the gate.
+    """
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    for n, (x, y) in {1: (55.200, 25.150), 2: (55.205, 25.150),
+                      3: (55.200, 25.170), 4: (55.205, 25.170)}.items():
+        G.add_node(n, x=x, y=y)
+    for u, v, length, speed in ((1, 2, 500, 40), (1, 3, 2000, 100), (3, 4, 1000, 100), (4, 2, 2000, 100)):
+        for a, b in ((u, v), (v, u)):
+            G.add_edge(a, b, 0, length=length, speed_kph=speed, travel_time=length / speed * 3.6)
+    return G
+
+
+@pytest.mark.parametrize("weight", ["length", "travel_time"])
+def test_avoid_route_skips_the_gate_for_every_weight(cache_dir, weight):
+    G = toll_road()
+    key = graph_store.save_graph(G, (25.14, 55.19, 25.18, 55.21), "drive")
+    gate_edges = [(1, 2, 0)]
+    router = batch_route.RoadRouter({
+        "algo": "Dijkstra", "weight": weight, "region": key,
+        "prices": {"salik_price": 4.0, "fuel_price": 3.0, "efficiency": 10.0, "hourly_wage": 60.0},
+        "gate_edges": gate_edges, "penalties": tolls.gate_edge_penalties(G, gate_edges)})
+
+    result = router.route(1, 2)
+    assert result["status"] == "ok"
+    assert result["pay_salik"] == 1 and result["pay_km"] == pytest.approx(0.5)
+    assert result["avoid_salik"] == 0 and result["avoid_km"] == pytest.approx(5.0)
+
+
+def test_jsonl_rows_that_are_not_objects_are_bad_rows():
+    stream = io.StringIO('{"id": "a", "start_x": 1}\n[1, 2]\n7\nnot json\n')
+    rows = list(batch_route.read_rows(stream, "jsonl"))
+    assert rows == [{"id": "a", "start_x": 1}, {}, {}, {}]
+
+    tasks = batch_route.make_tasks(lambda pairs: pairs, batch_route.GRID_COLUMNS, 10, rows)
+    assert [t[0] for t in tasks] == ["a", "11", "12", "13"]
+    assert all(start is None for _, start, _ in tasks)
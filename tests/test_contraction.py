@@ -0,0 +1,67 @@
+import os
+import random
+
+import networkx as nx
+import pytest
+
+import contraction
+import graph_store
+
+
+def grid_graph(size=12, seed=7):
+    """ Street grid with random lengths and a few one-way streets """
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    node = lambda x, y: 1000 + y * size + x
+    for y in range(size):
+        for x in range(size):
+            G.add_node(node(x, y), x=55.20 + x * 0.002, y=25.15 + y * 0.002)
+    for y in range(size):
+        for x in range(size):
+            for nx_, ny in ((x + 1, y), (x, y + 1)):
+                if nx_ < size and ny < size:
+                    u, v = node(x, y), node(nx_, ny)
+                    for a, b in ((u, v), (v, u)):
+                        if rng.random() < 0.1 and G.has_edge(b, a):
+                            continue  # One-way
+                        length = rng.uniform(100, 400)
+                        G.add_edge(a, b, 0, length=length, speed_kph=50.0, travel_time=length / 50 * 3.6)
+    return G
+
+
+def save(G):
+    return graph_store.save_graph(G, (25.14, 55.19, 25.18, 55.23), "drive")
+
+
+def test_queries_match_networkx_dijkstra(cache_dir):
+    G = grid_graph()
+    ch = contraction.load_hierarchy(save(G), "length")
+    rng = random.Random(1)
+    nodes = sorted(G.nodes)
+    for _ in range(60):
+        s, t = rng.choice(nodes), rng.choice(nodes)
+        route, cost = ch.query(s, t)
+        if not nx.has_path(G, s, t):
+            assert route == []
+            continue
+        assert cost == pytest.approx(nx.shortest_path_length(G, s, t, weight="length"), rel=1e-5)
+        assert route[0] == s and route[-1] == t
+        # The unpacked route uses real road segments and adds up to the cost
+        assert sum(G.edges[u, v, 0]["length"] for u, v in zip(route[:-1], route[1:])) == pytest.approx(cost, rel=1e-5)
+
+
+def test_hierarchy_is_rebuilt_when_the_region_is_saved_again(cache_dir):
+    G = grid_graph()
+    key = save(G)
+    contraction.load_hierarchy(key, "length")
+
+    # Same region downloaded again with different lengths
+    H = grid_graph(seed=8)
+    save(H)
+    edge_float = os.path.join(graph_store.region_dir(key), "edge_float.npy")
+    later = os.stat(edge_float).st_mtime_ns + 10**9  # Never the same timestamp as the saved tables
+    os.utime(edge_float, ns=(later, later))
+
+    ch = contraction.load_hierarchy(key, "length")
+    s, t = min(H.nodes), max(H.nodes)
+    assert ch.query(s, t)[1] == pytest.approx(nx.shortest_path_length(H, s, t, weight="length"), rel=1e-5)
@@ -0,0 +1,74 @@
+import numpy as np
+import osmnx as ox
+import pytest
+
+import graph_store
+from conftest import SMALL_OSM
+
+
+def test_save_and_reload_keep_the_graph(cache_dir):
+    G = graph_store.prepare_graph(ox.graph_from_xml(SMALL_OSM))
+    bbox = (25.15, 55.20, 25.16, 55.21)
+    key = graph_store.save_graph(G, bbox, "drive")
+
+    assert key == graph_store.region_key(bbox, "drive")
+    assert graph_store._read_index()[key]["nodes"] == len(G)
+
+    H = graph_store.load_cached(key)
+    assert H.graph["store_key"] == key
+    assert sorted(H.nodes) == sorted(G.nodes)
+    assert sorted(H.edges(keys=True)) == sorted(G.edges(keys=True))
+    for u, v, k, d in G.edges(keys=True, data=True):
+        for column in graph_store.EDGE_FLOAT_COLUMNS:
+            assert H.edges[u, v, k][column] == pytest.approx(d[column], rel=1e-6)
+    for n, d in G.nodes(data=True):
+        assert (H.nodes[n]["x"], H.nodes[n]["y"]) == (d["x"], d["y"])
+
+
+def test_import_xml_bbox_covers_every_node(small_region):
+    bbox = graph_store._read_index()[small_region]["bbox"]
+    G = graph_store.load_cached(small_region)
+    for _, d in G.nodes(data=True):
+        assert bbox[0] <= d["y"] <= bbox[2] and bbox[1] <= d["x"] <= bbox[3]
+
+
+def test_find_covering_picks_the_smallest_covering_region(cache_dir):
+    G = graph_store.prepare_graph(ox.graph_from_xml(SMALL_OSM))
+    small = graph_store.save_graph(G, (25.14, 55.19, 25.17, 55.22), "drive")
+    large = graph_store.save_graph(G, (25.10, 55.10, 25.30, 55.30), "drive")
+
+    assert graph_store.find_covering((25.15, 55.20, 25.16, 55.21), "drive") == small
+    assert graph_store.find_covering((25.12, 55.15, 25.25, 55.25), "drive") == large
+    # Not fully covered, other network type, or region folder gone
+    assert graph_store.find_covering((25.00, 55.20, 25.16, 55.21), "drive") is None
+    assert graph_store.find_covering((25.15, 55.20, 25.16, 55.21), "walk") is None
+    for name in graph_store.GRAPH_ARRAYS:
+        (cache_dir / small / (name + ".npy")).unlink()
+    (cache_dir / small).rmdir()
+    assert graph_store.find_covering((25.15, 55.20, 25.16, 55.21), "drive") == large
+
+
+def test_load_bbox_reuses_a_covering_region(cache_dir, monkeypatch):
+    G = graph_store.prepare_graph(ox.graph_from_xml(SMALL_OSM))
+    key = graph_store.save_graph(G, (25.14, 55.19, 25.17, 55.22), "drive")
+
+    def no_download(*args, **kwargs):
+        raise AssertionError("covered request must not download")
+    monkeypatch.setattr(ox, "graph_from_polygon", no_download)
+
+    H = graph_store.load_bbox((25.151, 55.201, 25.153, 55.203))
+    assert H.graph["store_key"] == key
+    assert H.number_of_edges() == G.number_of_edges()
+
+
+def test_load_arrays_returns_only_the_graph_arrays(small_region):
+    # Tables built on top of the graph share its folder
+    folder = graph_store.region_dir(small_region)
+    np.save(f"{folder}/ch_length_rank.npy", np.arange(3))
+    np.save(f"{folder}/alt_length_from.npy", np.zeros((2, 3)))
+
+    arrays = graph_store.load_arrays(small_region)
+    assert set(arrays) == set(graph_store.GRAPH_ARRAYS)
+    assert len(arrays["node_osmid"]) == len(arrays["node_xy"])
+    assert arrays["edge_float"].shape == (len(arrays["edge_uv"]), len(graph_store.EDGE_FLOAT_COLUMNS))
+
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+import astar
+from grid_engine import GridEngine, grid_search
+
+
+def random_grid(size, seed, walls=0.25, gates=0.08):
+    """ Random walls and Salik gates, with start and end kept free """
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(size) for x in range(size)]
+    start, end = rng.sample(cells, 2)
+    wall_cells, gate_cells = set(), set()
+    for pos in cells:
+        if pos in (start, end):
+            continue
+        r = rng.random()
+        if r < walls:
+            wall_cells.add(pos)
+        elif r < walls + gates:
+            gate_cells.add(pos)
+    return start, end, wall_cells, gate_cells
+
+
+def path_cost(path, gates):
+    return sum(10 if pos in gates else 1 for pos in path[1:])
+
+
+@pytest.mark.parametrize("algo_type", ["A*", "Dijkstra", "JPS", "ALT"])
+def test_costs_match_search_algorithm(algo_type):
+    for seed in range(40):
+        size = 8 + seed % 5 * 6
+        start, end, walls, gates = random_grid(size, seed)
+        expected = astar.search_algorithm(start, end, walls, gates, size, "A*" if algo_type == "A*" else "Dijkstra")
+        path, cost, visited, _, count = GridEngine(size, walls, gates).search(start, end, algo_type)
+
+        assert cost == expected[1], (seed, algo_type)
+        if not expected[0]:
+            assert path == []
+            continue
+        # A valid walk of 4-neighbour moves through open cells that adds up to the cost
+        assert path[0] == start and path[-1] == end
+        assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(path, path[1:]))
+        assert not walls.intersection(path)
+        assert path_cost(path, gates) == cost
+        assert count > 0
+
+
+@pytest.mark.parametrize("algo_type", ["A*", "Dijkstra"])
+def test_grid_search_without_visited_keeps_the_result(algo_type):
+    for seed in range(20):
+        start, end, walls, gates = random_grid(15, seed)
+        tracked = grid_search(start, end, walls, gates, 15, algo_type)
+        untracked = grid_search(start, end, walls, gates, 15, algo_type, track_visited=False)
+        assert untracked[2] == []
+        assert (untracked[0], untracked[1], untracked[4]) == (tracked[0], tracked[1], tracked[4])
+        assert tracked[4] == len(tracked[2])
+
+
+@pytest.mark.parametrize("algo_type", ["A*", "Dijkstra", "JPS", "ALT"])
+def test_search_steps_ends_with_the_search_result(algo_type):
+    for seed in range(10):
+        start, end, walls, gates = random_grid(14, seed)
+        engine = GridEngine(14, walls, gates)
+        events = list(engine.search_steps(start, end, algo_type))
+        kind, result = events[-1]
+        assert kind == "done"
+        assert all(kind == "expand" for kind, _ in events[:-1])
+        path, cost, visited, _, count = engine.search(start, end, algo_type)
+        assert (result[0], result[1], result[4]) == (path, cost, count)
+        assert [pos for _, pos in events[:-1]] == visited
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import astar
+from grid_engine import WALL, ROAD_COST, SALIK_COST
+from hierarchical import HierarchicalPlanner
+from test_grid_engine import random_grid, path_cost
+
+
+def edges(graph):
+    return {u: e for u, e in graph.items() if e}
+
+
+def check(planner, start, end, walls, gates):
+    expected = astar.search_algorithm(start, end, walls, gates, planner.grid_size, "Dijkstra")
+    path, cost, _, _, _ = planner.search(start, end)
+    if not expected[0]:
+        assert path == [] and cost == 0
+        return cost
+    # Near-optimal: a real path, never cheaper than the optimum
+    assert path[0] == start and path[-1] == end
+    assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(path, path[1:]))
+    assert not walls.intersection(path)
+    assert path_cost(path, gates) == cost
+    assert cost >= expected[1]
+    return cost
+
+
+@pytest.mark.parametrize("cluster_size", [4, 8])
+def test_routes_are_valid_and_never_beat_the_optimum(cluster_size):
+    for seed in range(15):
+        start, end, walls, gates = random_grid(24, seed, walls=0.2)
+        check(HierarchicalPlanner(24, walls, gates, cluster_size), start, end, walls, gates)
+
+
+def test_incremental_updates_match_a_rebuilt_abstraction():
+    rng = random.Random(5)
+    start, end, walls, gates = random_grid(24, 5, walls=0.2)
+    planner = HierarchicalPlanner(24, walls, gates, cluster_size=6)
+    for step in range(30):
+        pos = (rng.randrange(24), rng.randrange(24))
+        if pos in (start, end):
+            continue
+        kind = rng.choice([WALL, SALIK_COST, ROAD_COST])
+        walls.discard(pos)
+        gates.discard(pos)
+        if kind == WALL:
+            walls.add(pos)
+        elif kind == SALIK_COST:
+            gates.add(pos)
+        planner.update_cell(pos, kind)
+
+        cost = check(planner, start, end, walls, gates)
+        fresh = HierarchicalPlanner(24, walls, gates, cluster_size=6)
+        assert fresh.search(start, end)[1] == cost, step
+        # Same abstraction (cells left without edges may keep an empty entry)
+        assert edges(planner.inter) == edges(fresh.inter)
+        assert edges(planner.intra) == edges(fresh.intra)
@@ -0,0 +1,43 @@
+import random
+
+import astar
+from grid_engine import WALL, ROAD_COST, SALIK_COST
+from incremental import IncrementalPlanner
+from test_grid_engine import random_grid, path_cost
+
+
+def test_plan_after_random_edits_matches_a_full_search():
+    for seed in range(12):
+        rng = random.Random(seed)
+        size = 12 + seed % 3 * 4
+        start, end, walls, gates = random_grid(size, seed)
+        planner = IncrementalPlanner(size, walls, gates, start, end, "A*" if seed % 2 else "Dijkstra")
+        planner.plan()
+        for step in range(25):
+            pos = (rng.randrange(size), rng.randrange(size))
+            kind = rng.choice([WALL, SALIK_COST, ROAD_COST])
+            if pos in (start, end):
+                continue
+            walls.discard(pos)
+            gates.discard(pos)
+            if kind == WALL:
+                walls.add(pos)
+            elif kind == SALIK_COST:
+                gates.add(pos)
+            planner.update_cell(pos, kind)
+            if step % 8 == 7:
+                # Moving the goal only re-keys the open list
+                end = rng.choice([(x, y) for y in range(size) for x in range(size) if (x, y) not in walls])
+                planner.move_goal(end)
+            if step % 10 == 9:
+                planner.set_algo("Dijkstra" if planner.algo_type == "A*" else "A*")
+
+            path, cost, _, _, _ = planner.plan()
+            expected = astar.search_algorithm(start, end, walls, gates, size, "Dijkstra")
+            assert cost == expected[1], (seed, step)
+            if expected[0]:
+                assert path[0] == start and path[-1] == end
+                assert not walls.intersection(path)
+                assert path_cost(path, gates) == cost
+            else:
+                assert path == []
@@ -0,0 +1,31 @@
+import threading
+
+import jobs
+
+
+def test_same_key_reuses_the_job_and_new_key_cancels_it():
+    runner = jobs.JobRunner(workers=1)
+    release = threading.Event()
+
+    def slow(job, value):
+        release.wait(5)
+        with job.stage("work"):
+            return value
+
+    first = runner.submit("a", 1, ("work",), slow, 1)
+    assert runner.submit("a", 1, ("work",), slow, 1) is first
+    second = runner.submit("a", 2, ("work",), slow, 2)
+    assert second is not first and first.cancelled
+    release.set()
+    assert second.wait(5) and second.result == 2
+
+
+def test_least_recently_used_slots_are_dropped():
+    runner = jobs.JobRunner(workers=1, max_slots=2)
+    done = lambda job, value: value
+    a = runner.submit("a", 1, (), done, 1)
+    runner.submit("b", 1, (), done, 1)
+    assert runner.submit("a", 1, (), done, 1) is a  # "a" is now the most recent
+    runner.submit("c", 1, (), done, 1)
+    assert runner.current("b") is None
+    assert runner.current("a") is a and runner.current("c") is not None
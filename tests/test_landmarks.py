@@ -0,0 +1,43 @@
+import random
+
+import networkx as nx
+import pytest
+
+import landmarks
+from csr_graph import CSRGraph
+from test_contraction import grid_graph, save
+
+
+@pytest.mark.parametrize("weight", ["length", "travel_time"])
+def test_road_routes_match_networkx_dijkstra(cache_dir, weight):
+    G = grid_graph()
+    key = save(G)
+    csr = CSRGraph.from_graph(G)
+    table = landmarks.load_or_build(key, csr, weight, count=6)
+    rng = random.Random(2)
+    nodes = sorted(G.nodes)
+    for _ in range(40):
+        s, t = rng.sample(nodes, 2)
+        route, cost, expanded = landmarks.road_route(csr, table, s, t)
+        if not nx.has_path(G, s, t):
+            assert route == []
+            continue
+        assert cost == pytest.approx(nx.shortest_path_length(G, s, t, weight=weight), rel=1e-5)
+        assert route[0] == s and route[-1] == t
+        assert sum(G.edges[u, v, 0][weight] for u, v in zip(route[:-1], route[1:])) == pytest.approx(cost, rel=1e-5)
+        assert 0 < expanded <= csr.n
+
+
+def test_potentials_are_feasible():
+    csr = CSRGraph.from_graph(grid_graph())
+    graph = csr.matrix("length")
+    table = landmarks.Landmarks.build(graph, 5)
+    rng = random.Random(8)
+    offsets, targets, weights = graph.indptr, graph.indices, graph.data
+    for _ in range(10):
+        s, t = rng.sample(range(csr.n), 2)
+        p = table.potential(s, t)
+        # No reduced edge cost w(u, v) - p(u) + p(v) may go negative (float32 tables)
+        for u in range(csr.n):
+            for i in range(offsets[u], offsets[u + 1]):
+                assert weights[i] - p(u) + p(int(targets[i])) >= -1e-2
@@ -0,0 +1,75 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import astar
+import od_matrix
+import tolls
+from csr_graph import CSRGraph
+from test_contraction import grid_graph
+from test_grid_engine import random_grid
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_road_matrix_matches_pairwise_searches(workers):
+    G = grid_graph()
+    csr = CSRGraph.from_graph(G)
+    rng = random.Random(4)
+    nodes = sorted(G.nodes)
+    origins, destinations = rng.sample(nodes, 5), rng.sample(nodes, 7)
+    arrays = od_matrix.road_arrays(csr)
+    del arrays["penalty"]
+    # Two origins per task, so workers=2 really goes through the shared-memory pool
+    result = od_matrix.od_matrix(arrays, csr.indices(origins), csr.indices(destinations), "travel_time",
+                                 ("length", "travel_time"), workers, chunk_size=2)
+    for i, o in enumerate(origins):
+        for j, d in enumerate(destinations):
+            if not nx.has_path(G, o, d):
+                assert np.isinf(result["cost"][i, j]) and np.isnan(result["length"][i, j])
+                continue
+            route, cost = csr.dijkstra(o, d, "travel_time")
+            assert result["cost"][i, j] == pytest.approx(cost, rel=1e-9)
+            assert result["travel_time"][i, j] == pytest.approx(cost, rel=1e-6)
+            # Random lengths leave no ties, so the layers follow the same route
+            length = sum(G.edges[u, v, 0]["length"] for u, v in zip(route[:-1], route[1:]))
+            assert result["length"][i, j] == pytest.approx(length, rel=1e-5)
+
+
+def test_avoid_tolls_matches_the_penalised_search():
+    G = grid_graph()
+    csr = CSRGraph.from_graph(G)
+    rng = random.Random(9)
+    gates = rng.sample(sorted(G.edges), 25)
+    penalties = tolls.gate_edge_penalties(G, gates)
+    extra = csr.penalty_array(penalties)
+    nodes = sorted(G.nodes)
+    origins, destinations = rng.sample(nodes, 4), rng.sample(nodes, 4)
+    result = od_matrix.road_od_matrix(csr, origins, destinations, "travel_time", layers=("tolls",),
+                                      penalties=penalties, avoid_tolls=True, workers=1)
+    for i, o in enumerate(origins):
+        for j, d in enumerate(destinations):
+            route, cost = csr.dijkstra(o, d, "travel_time", extra)
+            if not route:
+                continue
+            assert result["cost"][i, j] == pytest.approx(cost, rel=1e-9)
+            assert result["tolls"][i, j] == sum((u, v, 0) in penalties for u, v in zip(route[:-1], route[1:]))
+
+
+def test_grid_matrix_matches_search_algorithm():
+    for seed in range(4):
+        start, end, walls, gates = random_grid(14, seed)
+        rng = random.Random(seed)
+        free = [(x, y) for y in range(14) for x in range(14) if (x, y) not in walls]
+        origins, destinations = rng.sample(free, 4), rng.sample(free, 5)
+        result = od_matrix.grid_od_matrix(14, walls, gates, origins, destinations, layers=("steps", "tolls"))
+        for i, o in enumerate(origins):
+            for j, d in enumerate(destinations):
+                path, cost, *_ = astar.search_algorithm(o, d, walls, gates, 14, "Dijkstra")
+                if not path:
+                    assert np.isinf(result["cost"][i, j])
+                    continue
+                assert result["cost"][i, j] == cost
+                # steps / tolls describe one cheapest path, so they must add up to its cost
+                assert result["steps"][i, j] + 9 * result["tolls"][i, j] == cost
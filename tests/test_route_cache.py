@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+import graph_store
+import route_cache
+from csr_graph import CSRGraph
+from test_contraction import grid_graph, save
+
+
+def length_of(G, route):
+    return sum(G.edges[u, v, 0]["length"] for u, v in zip(route[:-1], route[1:]))
+
+
+def test_subpath_hits_match_a_fresh_search():
+    G = grid_graph()
+    csr = CSRGraph.from_graph(G)
+    cache = route_cache.RouteCache()
+    context = ("grid@1", "length", "dijkstra-csr", ())
+    rng = random.Random(3)
+    nodes = sorted(G.nodes)
+    fresh = lambda s, t: csr.dijkstra(s, t, "length")[0]
+
+    checked = 0
+    for _ in range(30):
+        s, t = rng.sample(nodes, 2)
+        route = cache.route(context, s, t, lambda: fresh(s, t))
+        if len(route) < 4:
+            continue
+        # Any ordered pair of nodes on a cached route is answered without a search
+        i, j = sorted(rng.sample(range(len(route)), 2))
+        misses = cache.misses
+        sub = cache.route(context, route[i], route[j], lambda: pytest.fail("searched a cached subpath"))
+        assert cache.misses == misses
+        assert sub == route[i:j + 1]
+        assert length_of(G, sub) == pytest.approx(length_of(G, fresh(route[i], route[j])), rel=1e-6)
+        checked += 1
+    assert checked > 10 and cache.subpath_hits > 0
+
+
+def test_context_and_direction_are_respected():
+    G = grid_graph()
+    csr = CSRGraph.from_graph(G)
+    cache = route_cache.RouteCache()
+    s, t = min(G.nodes), max(G.nodes)
+    context = ("grid@1", "length", "dijkstra-csr", ())
+    route = cache.route(context, s, t, lambda: csr.dijkstra(s, t, "length")[0])
+
+    calls = []
+    search = lambda a, b: lambda: calls.append((a, b)) or csr.dijkstra(a, b, "length")[0]
+    # Reversed endpoints are a different question on a graph with one-way streets
+    cache.route(context, route[-2], route[1], search(route[-2], route[1]))
+    # Another gate set must never see routes of the first one
+    cache.route(context[:3] + (route_cache.gate_key([(route[0], route[1], 0)]),), s, t, search(s, t))
+    assert calls == [(route[-2], route[1]), (s, t)]
+
+
+def test_disk_tier_survives_a_new_cache(cache_dir):
+    G = grid_graph()
+    key = save(G)
+    csr = CSRGraph.from_graph(G)
+    context = (graph_store.graph_version(key), "length", "dijkstra-csr", ())
+    s, t = min(G.nodes), max(G.nodes)
+    route = route_cache.RouteCache(disk=True).route(context, s, t, lambda: csr.dijkstra(s, t, "length")[0])
+
+    cache = route_cache.RouteCache(disk=True)
+    assert cache.route(context, s, t, lambda: pytest.fail("missed the disk tier")) == route
+    assert cache.disk_hits == 1
+
+    cache.invalidate(key)
+    calls = []
+    cache.route(context, s, t, lambda: calls.append(1) or route)
+    assert calls == [1]
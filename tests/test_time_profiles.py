@@ -0,0 +1,62 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import time_profiles
+from csr_graph import CSRGraph
+
+
+def road_grid(size=8, seed=3):
+    """ Street grid whose middle row and column are highways """
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    node = lambda x, y: 500 + y * size + x
+    for y in range(size):
+        for x in range(size):
+            G.add_node(node(x, y), x=55.20 + x * 0.004, y=25.15 + y * 0.004)
+    for y in range(size):
+        for x in range(size):
+            for nx_, ny in ((x + 1, y), (x, y + 1)):
+                if nx_ < size and ny < size:
+                    highway = (y == ny == size // 2) or (x == nx_ == size // 2)
+                    speed = 100.0 if highway else rng.choice([30.0, 40.0, 60.0])
+                    length = rng.uniform(350, 500)
+                    for a, b in ((node(x, y), node(nx_, ny)), (node(nx_, ny), node(x, y))):
+                        G.add_edge(a, b, 0, length=length, speed_kph=speed, travel_time=length / speed * 3.6)
+    return G
+
+
+@pytest.fixture
+def profiles():
+    return time_profiles.TravelTimeProfiles.default(CSRGraph.from_graph(road_grid()))
+
+
+def test_every_sweep_lane_matches_its_own_search(profiles):
+    rng = random.Random(2)
+    nodes = profiles.csr.node_osmid.tolist()
+    for _ in range(4):
+        s, t = rng.sample(nodes, 2)
+        # 96 departures: the vectorised sweep, including every rush-hour edge
+        departures, minutes, routes = profiles.sweep(s, t)
+        assert len(departures) == 96
+        for depart, lane, route in zip(departures.tolist(), minutes, routes):
+            assert lane == pytest.approx(profiles.route(s, t, depart)[1], rel=1e-9)
+            assert profiles.route_time(route, depart) == pytest.approx(lane, rel=1e-9)
+
+
+def test_travel_times_are_fifo():
+    csr = CSRGraph.from_graph(road_grid())
+    # A profile with a cliff at 9:00 that, taken as is, lets long edges overtake
+    factors = np.ones((1, time_profiles.HOURS))
+    factors[0, 8] = 100.0
+    profiles = time_profiles.TravelTimeProfiles(csr, np.zeros(len(csr.targets), dtype=np.uint16), factors)
+
+    osmid = csr.node_osmid
+    edges = [(int(osmid[u]), int(osmid[csr.targets[i]]))
+             for u in range(csr.n) for i in range(csr.offsets[u], csr.offsets[u + 1])]
+    times = np.arange(7 * 3600, 11 * 3600, 30.0)
+    for u, v in edges[:40]:
+        arrivals = np.array([t + 60 * profiles.route_time([u, v], t) for t in times])
+        assert (np.diff(arrivals) >= -1e-6).all()  # Leaving later never arrives earlier
@@ -0,0 +1,309 @@
+import argparse
+import csv
+import heapq
+import math
+import os
+
+import numpy as np
+
+import graph_store
+from csr_graph import CSRGraph, METERS_PER_DEGREE
+
+# --- TIME-DEPENDENT TRAVEL TIMES ---
+# Every CSR edge gets 24 hourly travel-time multipliers on top of its static
+# osmnx travel_time. Most edges share a handful of shapes, so they are stored
+# compactly as a profile id per edge plus a small (profiles x 24) factor
+# table, saved next to the cached graph:
+#   graph_cache/<region>/td_profile_ids.npy   uint16, one per CSR edge
+#   graph_cache/<region>/td_factors.npy       float32, (profiles, 24)
+#
+# Without observations every edge uses DEFAULT_PROFILES, picked by its static
+# speed. "python time_profiles.py import REGION speeds.csv" replaces them
+# with observed speeds (columns u, v, hour, speed_kph; osmids).
+#
+# A factor holds at the start of its hour and is interpolated linearly up to
+# the next hour's factor, looked up at the time a vehicle ENTERS each edge.
+# Travel times then change continuously, and no factor may drop faster than
+# FIFO allows (leaving later never arrives earlier), so time-dependent A* and
+# the sweep are exact. Steeper drops are raised to that limit on load.
+
+HOURS = 24
+FAST_ROAD_KPH = 80   # Static speed from which an edge counts as a highway
+SWEEP_STEP = 900     # Seconds between departures in a 24-hour sweep (15 min)
+SWEEP_MIN_LANES = 48 # Fewer departures are faster as separate TD-A* searches
+WINDOW_SLACK = 0.05  # A departure is in the best window within 5% of the best time
+
+# Rough Dubai weekday shape: multiplier of the free-flow travel time per hour
+DEFAULT_PROFILES = np.array([
+    # Urban roads
+    [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.1, 1.4, 1.6, 1.4, 1.2, 1.2,
+     1.2, 1.3, 1.3, 1.3, 1.4, 1.6, 1.7, 1.5, 1.3, 1.2, 1.1, 1.0],
+    # Highways (Sheikh Zayed Road and the like)
+    [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.2, 1.8, 2.2, 1.7, 1.3, 1.2,
+     1.2, 1.3, 1.4, 1.5, 1.8, 2.2, 2.4, 1.9, 1.4, 1.2, 1.1, 1.0],
+], dtype=np.float32)
+
+
+def hour_of(seconds):
+    """ Hour bucket (0-23) of a time in seconds after midnight (wraps past 24h) """
+    return int(seconds // 3600) % HOURS
+
+
+def fifo_factors(factors, profile_ids, base):
+    """ factors with every hour-to-hour drop limited so no edge breaks FIFO.
+
+    Over one hour an edge's travel time changes by base * (next - factor),
+    so a drop of more than 3600 / base would let a later departure overtake
+    an earlier one. The limit of each profile comes from its longest edge.
+    """
+    factors = np.array(factors, dtype=np.float64)
+    longest = np.zeros(len(factors))
+    np.maximum.at(longest, np.asarray(profile_ids, dtype=np.int64), base)
+    max_drop = 3600 / np.maximum(longest, 1e-9)
+    for _ in range(2):  # Twice round the clock, so a raise across midnight carries on
+        for hour in range(HOURS):
+            following = (hour + 1) % HOURS
+            factors[:, following] = np.maximum(factors[:, following], factors[:, hour] - max_drop)
+    return factors
+
+
+class TravelTimeProfiles:
+    """ Hourly travel times for one CSRGraph, with time-dependent searches """
+
+    def __init__(self, csr, profile_ids, factors):
+        self.csr = csr
+        self.profile_ids = np.asarray(profile_ids, dtype=np.uint16)
+        self.base = csr.weights["travel_time"].astype(np.float64)
+        self.factors = fifo_factors(factors, self.profile_ids, self.base)
+        # Change of each factor up to the next hour, for the interpolation
+        self.slopes = np.roll(self.factors, -1, axis=1) - self.factors
+        self._lists = None
+
+    # --- CONSTRUCTION ---
+    @classmethod
+    def default(cls, csr):
+        speed = csr.weights["length"] / np.maximum(csr.weights["travel_time"], 1e-6) * 3.6
+        return cls(csr, (speed >= FAST_ROAD_KPH).astype(np.uint16), DEFAULT_PROFILES)
+
+    @classmethod
+    def from_csv(cls, csr, path):
+        """ Observed speeds (u, v, hour, speed_kph) averaged per edge and hour.
+
+        Hours without an observation keep the edge's default multiplier.
+        """
+        default = cls.default(csr)
+        table = default.factors[default.profile_ids].astype(np.float64)  # (edges, 24)
+        total = np.zeros_like(table)
+        count = np.zeros_like(table)
+        static_kph = csr.weights["length"] / np.maximum(csr.weights["travel_time"], 1e-6) * 3.6
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                u, v = int(row["u"]), int(row["v"])
+                if u not in csr.index or v not in csr.index:
+                    continue
+                edge = int(csr.edge_ids([csr.index[u]], [csr.index[v]])[0])
+                if edge >= len(csr.edge_keys) or csr.edge_keys[edge] != csr.index[u] * csr.n + csr.index[v]:
+                    continue  # Not a road segment of this graph
+                speed = float(row["speed_kph"])
+                if speed > 0:
+                    hour = int(row["hour"]) % HOURS
+                    total[edge, hour] += static_kph[edge] / speed
+                    count[edge, hour] += 1
+        seen = count > 0
+        table[seen] = total[seen] / count[seen]
+        # Identical hourly shapes share one profile row
+        factors, ids = np.unique(np.round(table, 2).astype(np.float32), axis=0, return_inverse=True)
+        return cls(csr, ids.reshape(-1), factors)
+
+    def save(self, key):
+        folder = graph_store.region_dir(key)
+        np.save(os.path.join(folder, "td_profile_ids.npy"), self.profile_ids)
+        np.save(os.path.join(folder, "td_factors.npy"), self.factors.astype(np.float32))
+
+    @classmethod
+    def load(cls, csr, key):
+        """ Saved profiles of a cached region, or the defaults if none were imported """
+        folder = graph_store.region_dir(key)
+        ids_path = os.path.join(folder, "td_profile_ids.npy")
+        if not os.path.exists(ids_path):
+            return cls.default(csr)
+        return cls(csr, np.load(ids_path), np.load(os.path.join(folder, "td_factors.npy")))
+
+    # --- LOOKUPS ---
+    def edge_times(self, hour):
+        """ Travel time (s) of every edge entered at the start of one hour """
+        return self.base * self.factors[self.profile_ids, hour]
+
+    def route_time(self, route, depart):
+        """ Minutes to drive an osmid route leaving at depart (seconds after midnight) """
+        if len(route) < 2:
+            return 0.0
+        idx = np.array([self.csr.index[n] for n in route], dtype=np.int64)
+        edges = self.csr.edge_ids(idx[:-1], idx[1:]).tolist()
+        base, ids, factors, slopes = self.base, self.profile_ids, self.factors, self.slopes
+        now = depart
+        for e in edges:
+            hour, into = hour_of(now), now / 3600 % 1.0
+            now += base[e] * (factors[ids[e], hour] + slopes[ids[e], hour] * into)
+        return (now - depart) / 60
+
+    def edge_times_min(self):
+        """ Fastest travel time (s) of every edge over the day """
+        return self.base * self.factors.min(axis=1)[self.profile_ids]
+
+    def _lower_bounds(self, t):
+        # Straight-line meters at the top speed reachable in any hour
+        csr = self.csr
+        cos_lat = math.cos(math.radians(csr.node_y[t]))
+        dx = (csr.node_x - csr.node_x[t]) * cos_lat
+        dy = csr.node_y - csr.node_y[t]
+        fastest = float(np.max(csr.weights["length"] / np.maximum(self.edge_times_min(), 1e-6)))
+        return np.hypot(dx, dy) * METERS_PER_DEGREE * 0.99 / fastest
+
+    # --- SEARCH ---
+    def route(self, source, target, depart):
+        """ Time-dependent A* between two osmids leaving at depart (seconds after midnight).
+
+        Returns (route, minutes) or ([], inf).
+        """
+        csr = self.csr
+        if self._lists is None:
+            self._lists = (csr.offsets.tolist(), csr.targets.tolist(), self.base.tolist(),
+                           self.profile_ids.tolist(), self.factors.tolist(), self.slopes.tolist())
+        offsets, targets, base, ids, factors, slopes = self._lists
+        s, t = csr.index[source], csr.index[target]
+        h = self._lower_bounds(t).tolist()
+        arrival = {s: float(depart)}
+        parent = {s: -1}
+        heap = [(depart + h[s], s)]
+        closed = set()
+        while heap:
+            _, v = heapq.heappop(heap)
+            if v in closed:
+                continue
+            if v == t:
+                route = []
+                while v != -1:
+                    route.append(v)
+                    v = parent[v]
+                return csr.node_osmid[route[::-1]].tolist(), (arrival[t] - depart) / 60
+            closed.add(v)
+            now = arrival[v]
+            hour, into = hour_of(now), now / 3600 % 1.0
+            for i in range(offsets[v], offsets[v + 1]):
+                w = targets[i]
+                at = now + base[i] * (factors[ids[i]][hour] + slopes[ids[i]][hour] * into)
+                if at < arrival.get(w, math.inf):
+                    arrival[w] = at
+                    parent[w] = v
+                    heapq.heappush(heap, (at + h[w], w))
+        return [], math.inf
+
+    def sweep(self, source, target, departures=None):
+        """ Fastest travel time for many departure times in ONE search.
+
+        Every node carries a vector of arrival times, one lane per departure,
+        and each edge is relaxed for all lanes at once with NumPy. Nodes are
+        settled label-correcting style (a node is rescanned if any lane
+        improves), ordered by their fastest lane plus an A* bound. The search
+        stops once no queued node can improve any lane at the target.
+
+        The NumPy work per scanned node only pays off for many lanes: on the
+        cached graph the sweep breaks even with separate searches at about 48
+        departures. Below SWEEP_MIN_LANES every departure gets its own
+        route() instead.
+
+        Returns (departures, minutes, routes): seconds after midnight, travel
+        minutes (inf if unreachable) and an osmid route per departure.
+        """
+        csr = self.csr
+        if departures is None:
+            departures = np.arange(0, HOURS * 3600, SWEEP_STEP, dtype=np.float64)
+        departures = np.asarray(departures, dtype=np.float64)
+        if len(departures) < SWEEP_MIN_LANES:
+            found = [self.route(source, target, depart) for depart in departures.tolist()]
+            return departures, np.array([minutes for _, minutes in found]), [route for route, _ in found]
+        lanes = np.arange(len(departures))
+        s, t = csr.index[source], csr.index[target]
+        h = self._lower_bounds(t).tolist()
+        offsets, targets = csr.offsets, csr.targets
+        table = self.factors[self.profile_ids]  # (edges, 24)
+        slopes = self.slopes[self.profile_ids]
+
+        arrival = {s: departures.copy()}
+        parent = {s: np.full(len(departures), -1, dtype=np.int64)}
+        queued = {s: h[s]}  # Key of each node's live heap entry
+        heap = [(h[s], s)]
+        while heap:
+            key, v = heapq.heappop(heap)
+            if queued.get(v) != key:
+                continue  # Stale entry
+            del queued[v]
+            if t in arrival and key >= np.max(arrival[t] - departures):
+                break
+            lo, hi = offsets[v], offsets[v + 1]
+            if lo == hi:
+                continue
+            now = arrival[v]
+            hours = (now // 3600).astype(np.int64) % HOURS
+            into = now / 3600 % 1.0
+            # (out edges, lanes) arrival times at every neighbour
+            at = now + self.base[lo:hi, None] * (table[lo:hi][:, hours] + slopes[lo:hi][:, hours] * into)
+            for row, w in enumerate(targets[lo:hi].tolist()):
+                cand = at[row]
+                best = arrival.get(w)
+                if best is None:
+                    arrival[w] = cand
+                    parent[w] = np.full(len(departures), v, dtype=np.int64)
+                else:
+                    better = cand < best
+                    if not better.any():
+                        continue
+                    best[better] = cand[better]
+                    parent[w][better] = v
+                new_key = float(np.min(arrival[w] - departures)) + h[w]
+                if new_key < queued.get(w, math.inf):
+                    queued[w] = new_key
+                    heapq.heappush(heap, (new_key, w))
+
+        if t not in arrival:
+            return departures, np.full(len(departures), math.inf), [[] for _ in lanes]
+        routes = []
+        for lane in lanes:
+            route = [t]
+            while route[-1] != s:
+                route.append(int(parent[route[-1]][lane]))
+            routes.append(csr.node_osmid[route[::-1]].tolist())
+        return departures, (arrival[t] - departures) / 60, routes
+
+
+def best_window(departures, minutes, slack=WINDOW_SLACK):
+    """ (first, last) departure (seconds) of the contiguous window around the
+    fastest departure where the trip stays within slack of the best time """
+    minutes = np.asarray(minutes)
+    best = int(np.argmin(minutes))
+    ok = minutes <= minutes[best] * (1 + slack)
+    first = last = best
+    while first > 0 and ok[first - 1]:
+        first -= 1
+    while last < len(ok) - 1 and ok[last + 1]:
+        last += 1
+    return float(departures[first]), float(departures[last])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hourly travel-time profiles for a cached road graph")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="build profiles from observed speeds (u, v, hour, speed_kph)")
+    imp.add_argument("region", help="graph_cache key")
+    imp.add_argument("csv")
+    args = parser.parse_args()
+
+    csr = CSRGraph.from_arrays(graph_store.load_arrays(args.region))
+    profiles = TravelTimeProfiles.from_csv(csr, args.csv)
+    profiles.save(args.region)
+    print(f"{len(profiles.factors)} distinct hourly profiles for {len(profiles.profile_ids)} road segments")
+
+
+if __name__ == "__main__":
+    main()
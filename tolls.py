@@ -0,0 +1,98 @@
+import numpy as np
+
+# --- SALIK GATE PENALTY OVERLAY ---
+# Instead of copying the graph and adding a penalty to every edge next to a
+# gate, the penalties live in a small dict keyed by (u, v, key) and are added
+# on the fly by a weight function. The base graph is never modified.
+
+GATE_PENALTY = 3600  # seconds (1 hour) - makes a gate "impossible" unless there is no other way
+
+
+def penalized_weight(weight, penalties):
+    """ networkx weight callable: base attribute plus any gate penalty.
+
+    For a MultiDiGraph networkx passes all parallel edges as {key: data}; the
+    cheapest one wins, exactly like weight='travel_time' does.
+    """
+    touched = {(u, v) for u, v, _ in penalties}
+
+    def cost(u, v, edges):
+        if (u, v) not in touched:
+            return min(data.get(weight, 1) for data in edges.values())
+        return min(data.get(weight, 1) + penalties.get((u, v, k), 0) for k, data in edges.items())
+
+    return cost
+
+
+# --- GATES SNAPPED TO ROAD SEGMENTS ---
+# A gate clicked on a long highway segment belongs to that segment, not to
+# whichever intersection happens to be closest. Both driving directions of
+# the segment are tolled.
+
+def gate_edge_penalties(G, gate_edges, penalty=GATE_PENALTY):
+    """ Sparse {(u, v, key): extra cost} for the segments gates were snapped to """
+    penalties = {}
+    for u, v, _ in gate_edges:
+        for a, b in {(u, v), (v, u)}:
+            if G.has_edge(a, b):
+                for k in G[a][b]:
+                    penalties[(a, b, k)] = penalties.get((a, b, k), 0) + penalty
+    return penalties
+
+
+def count_gate_hits(route, gate_edges):
+    """ How many gates a route drives through (in either direction) """
+    driven = set(zip(route[:-1], route[1:]))
+    return sum(1 for u, v, _ in gate_edges if (u, v) in driven or (v, u) in driven)
+
+
+# --- LOGISTICS COST MODEL ---
+# The "pay Salik vs avoid Salik" rule of thumb from the Logistics mode. Plain
+# arithmetic, so every price may also be a numpy array: one call then sweeps
+# a whole parameter range for the same two routes.
+
+SALIK_PRICE = 4.0   # AED per gate
+FUEL_PRICE = 3.0    # AED per litre
+EFFICIENCY = 10.0   # km per litre
+HOURLY_WAGE = 60.0  # AED per hour of the driver's time
+
+
+def trip_cost(dist_km, salik_hits, salik_price=SALIK_PRICE, fuel_price=FUEL_PRICE, efficiency=EFFICIENCY):
+    """ Fuel plus Salik for one route, in AED """
+    return dist_km * (fuel_price / efficiency) + salik_hits * salik_price
+
+
+def full_cost(dist_km, time_min, salik_hits, salik_price=SALIK_PRICE, fuel_price=FUEL_PRICE,
+              efficiency=EFFICIENCY, hourly_wage=HOURLY_WAGE):
+    """ Fuel plus Salik plus the value of the driver's time, in AED """
+    return trip_cost(dist_km, salik_hits, salik_price, fuel_price, efficiency) + (time_min / 60) * hourly_wage
+
+
+def salik_tradeoff(pay, avoid, salik_price=SALIK_PRICE, fuel_price=FUEL_PRICE,
+                   efficiency=EFFICIENCY, hourly_wage=HOURLY_WAGE):
+    """ Compare two routes given as (dist km, time min, salik hits).
+
+    Avoiding Salik is worth it when the money saved beats the value of the
+    time lost.
+    """
+    pay_cost = trip_cost(pay[0], pay[2], salik_price, fuel_price, efficiency)
+    avoid_cost = trip_cost(avoid[0], avoid[2], salik_price, fuel_price, efficiency)
+    money_saved = pay_cost - avoid_cost
+    time_lost = avoid[1] - pay[1]
+    value_lost = (time_lost / 60) * hourly_wage
+    return {"pay_cost": pay_cost, "avoid_cost": avoid_cost, "money_saved": money_saved,
+            "time_lost": time_lost, "value_lost": value_lost, "avoid": money_saved > value_lost}
+
+
+def break_even_wage(pay, avoid, salik_price=SALIK_PRICE, fuel_price=FUEL_PRICE, efficiency=EFFICIENCY):
+    """ Hourly wage at which both routes are worth the same.
+
+    Below it avoiding Salik wins, above it paying does. NaN when the avoid
+    route is no slower, since there is then no time to trade.
+    """
+    money_saved = (trip_cost(pay[0], pay[2], salik_price, fuel_price, efficiency)
+                   - trip_cost(avoid[0], avoid[2], salik_price, fuel_price, efficiency))
+    time_lost = avoid[1] - pay[1]
+    if time_lost <= 0:
+        return np.full(np.shape(money_saved), np.nan)
+    return np.asarray(money_saved, dtype=np.float64) * 60 / time_lost